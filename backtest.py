@@ -0,0 +1,282 @@
+import argparse
+import json
+import os
+import struct
+import sys
+import time
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from game_tracker import GameStateTracker
+from message_parser import parse_game_message
+from prediction_rules import (
+    BANQUIER, JOUEUR, LAUNCH_DECISIONS, BANQUIER_MAX_POINT, JOUEUR_MIN_POINT, T_THRESHOLD, VERIFICATION_EMOJIS,
+    launch_decision
+)
+from recorder import iter_records, list_segments
+
+# Fichier de colonnes: en-tête (magie, version, nombre de parties) puis les colonnes brutes
+COLUMNS_MAGIC = b"XGAM"
+COLUMNS_VERSION = 2
+COLUMNS_HEADER = struct.Struct("<4sHI")
+
+NO_FIRST_TOTAL = -1      # Point du premier groupe absent
+JOUEUR_CODE = LAUNCH_DECISIONS.index(JOUEUR)
+BANQUIER_CODE = LAUNCH_DECISIONS.index(BANQUIER)
+
+class GameColumns:
+    """
+    Parties finalisées d'un flux enregistré, en colonnes (array): numéro de jeu, point du
+    premier groupe, décision de lancement (indice dans LAUNCH_DECISIONS), #T.
+    La décision JOUEUR/BANQUIER est celle du seuil par défaut: run_backtest la recalcule
+    depuis la colonne #T quand un autre seuil est demandé.
+
+    Le flux est analysé une seule fois; chaque backtest (et chaque combinaison de
+    paramètres) relit ensuite les colonnes sans toucher au texte des messages.
+    """
+
+    def __init__(self):
+        self.games = array("l")
+        self.first_total = array("b")
+        self.decision = array("b")
+        self.t_value = array("d")
+
+    def __len__(self) -> int:
+        return len(self.games)
+
+    def _columns(self):
+        return (self.games, self.first_total, self.decision, self.t_value)
+
+    def save(self, path: str):
+        with open(path, "wb") as f:
+            f.write(COLUMNS_HEADER.pack(COLUMNS_MAGIC, COLUMNS_VERSION, len(self)))
+            for column in self._columns():
+                column.tofile(f)
+
+    @classmethod
+    def load(cls, path: str) -> "GameColumns":
+        columns = cls()
+        with open(path, "rb") as f:
+            magic, version, count = COLUMNS_HEADER.unpack(f.read(COLUMNS_HEADER.size))
+            if magic != COLUMNS_MAGIC or version != COLUMNS_VERSION:
+                raise ValueError(f"fichier de colonnes invalide: {path}")
+            for column in columns._columns():
+                column.fromfile(f, count)
+        return columns
+
+
+def iter_stream(path: str, chat_id: Optional[int] = None) -> Iterator[str]:
+    """
+    Textes des messages d'un flux enregistré: une ligne JSON par message ({"text": ...})
+    ou un message brut par ligne. Un fichier .gz ou un répertoire d'enregistrements
+    (SourceRecorder) est relu segment par segment, filtré sur chat_id si donné.
+    """
+    if os.path.isdir(path) or path.endswith(".gz"):
+        for entry in iter_records(path, chat_id):
+            yield entry.get("text") or ""
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if not line:
+                continue
+            if line.startswith("{"):
+                yield json.loads(line).get("text") or ""
+            else:
+                yield line
+
+
+def build_columns(texts: Iterable[str]) -> GameColumns:
+    """
+    Analyse le flux avec le même suivi de finalisation que le bot (GameStateTracker):
+    seule la première finalisation de chaque partie devient une ligne des colonnes.
+    """
+    columns = GameColumns()
+    tracker = GameStateTracker()
+    games, first_total, decision, t_value = columns._columns()
+    for text in texts:
+        record = parse_game_message(text)
+        if not record or not record.game_number or not tracker.observe(record):
+            continue
+        games.append(record.game_number)
+        first_total.append(record.first_total if record.first_total is not None else NO_FIRST_TOTAL)
+        decision.append(LAUNCH_DECISIONS.index(launch_decision(record)))
+        t_value.append(record.t_value if record.t_value is not None else -1.0)
+        tracker.mark_consumed(record.game_number)
+    return columns
+
+
+def run_backtest(columns: GameColumns, a_offset: int = 1, r_offset: int = 2,
+                 t_threshold: float = T_THRESHOLD, joueur_min_point: float = JOUEUR_MIN_POINT,
+                 banquier_max_point: float = BANQUIER_MAX_POINT,
+                 decisions: bool = False) -> Dict[str, Any]:
+    """
+    Rejoue la vérification puis le lancement de ChannelPair.process_finalized_game sur
+    chaque partie, sans client Telegram: fenêtre [N - r_offset, N] des prédictions en
+    attente, essais comptés dans "attempts", numéro déjà en attente ou déjà dans
+    l'historique non relancé (PredictionStore.__contains__). Les seuils (#T, points)
+    sont ceux de prediction_rules par défaut.
+    """
+    started = time.perf_counter()
+    pending: List[int] = []             # Numéros en attente, triés (comme PredictionStore._pending)
+    expected: Dict[int, int] = {}       # {numero: code JOUEUR/BANQUIER}
+    attempts: Dict[int, int] = {}       # {numero: essais effectués}
+    verified = set()                    # Numéros vérifiés (PredictionHistory.numeros)
+    wins_by_offset = [0] * (r_offset + 1)
+    losses = expired = launched = duplicates = 0
+    skipped = [0] * len(LAUNCH_DECISIONS)
+    log = [] if decisions else None
+
+    def resolve(numero: int, status: str):
+        # Retrait par l'index trié, comme PredictionStore.mark_verified
+        del pending[bisect_left(pending, numero)]
+        del expected[numero]
+        del attempts[numero]
+        verified.add(numero)
+        if log is not None:
+            resolved.append((numero, status))
+
+    games, first_totals, launch_codes, t_values = columns.games, columns.first_total, columns.decision, columns.t_value
+    default_split = t_threshold == T_THRESHOLD
+    for index in range(len(games)):
+        game_number = games[index]
+        first_total = first_totals[index]
+        resolved = []
+
+        # --- Vérification (verify_active_predictions) ---
+        if pending:
+            low = bisect_left(pending, game_number - r_offset)
+            high = bisect_right(pending, game_number, lo=low)
+            overdue, due = pending[:low], pending[low:high]
+            for numero in overdue:
+                expired += 1
+                losses += 1
+                resolve(numero, "❌")
+            for numero in due:
+                current_offset = game_number - numero
+                if current_offset <= attempts[numero] or first_total == NO_FIRST_TOTAL:
+                    continue
+                attempts[numero] = current_offset
+                code = expected[numero]
+                if (first_total > joueur_min_point) if code == JOUEUR_CODE else (first_total < banquier_max_point):
+                    wins_by_offset[current_offset] += 1
+                    resolve(numero, VERIFICATION_EMOJIS.get(current_offset, f"✅{current_offset}"))
+                elif current_offset >= r_offset:
+                    losses += 1
+                    resolve(numero, "❌")
+
+        # --- Lancement (process_finalized_game) ---
+        code = launch_codes[index]
+        predicted = None
+        if code == JOUEUR_CODE or code == BANQUIER_CODE:
+            if not default_split:
+                code = JOUEUR_CODE if t_values[index] > t_threshold else BANQUIER_CODE
+            predicted = game_number + a_offset
+            if predicted in expected or predicted in verified:
+                duplicates += 1
+                predicted = None
+            else:
+                insort(pending, predicted)
+                expected[predicted] = code
+                attempts[predicted] = 0
+                launched += 1
+        else:
+            skipped[code] += 1
+
+        if log is not None:
+            log.append({
+                "game": game_number,
+                "decision": LAUNCH_DECISIONS[code],
+                "predicted": predicted,
+                "resolved": resolved
+            })
+
+    duration = time.perf_counter() - started
+    wins = sum(wins_by_offset)
+    result = {
+        "a_offset": a_offset,
+        "r_offset": r_offset,
+        "t_threshold": t_threshold,
+        "joueur_min_point": joueur_min_point,
+        "banquier_max_point": banquier_max_point,
+        "games": len(games),
+        "launched": launched,
+        "duplicates": duplicates,
+        "skipped": {LAUNCH_DECISIONS[code]: count for code, count in enumerate(skipped) if count},
+        "wins": wins,
+        "losses": losses,
+        "expired": expired,
+        "win_rate": round(wins / (wins + losses), 4) if wins + losses else 0.0,
+        "wins_by_offset": {offset: count for offset, count in enumerate(wins_by_offset)},
+        "pending": len(pending),
+        "pending_numbers": list(pending),
+        "duration": round(duration, 3),
+        "games_per_sec": round(len(games) / duration) if duration > 0 else 0
+    }
+    if log is not None:
+        result["decisions"] = log
+    return result
+
+
+def stream_mtime(path: str) -> float:
+    """Date de modification d'un flux (du segment le plus récent pour un répertoire)"""
+    if os.path.isdir(path):
+        return max((os.path.getmtime(segment) for segment in list_segments(path)), default=0.0)
+    return os.path.getmtime(path)
+
+
+def load_columns(path: str, columns_cache: Optional[str] = None, chat_id: Optional[int] = None) -> GameColumns:
+    """Colonnes d'un flux: depuis le cache si à jour, sinon analyse (et mise en cache)"""
+    if columns_cache and os.path.exists(columns_cache) and os.path.getmtime(columns_cache) >= stream_mtime(path):
+        return GameColumns.load(columns_cache)
+    columns = build_columns(iter_stream(path, chat_id))
+    if columns_cache:
+        columns.save(columns_cache)
+    return columns
+
+
+def format_report(result: Dict[str, Any]) -> str:
+    lines = [
+        f"📊 Backtest a={result['a_offset']}, r={result['r_offset']}: {result['games']} parties "
+        f"({result['games_per_sec']} parties/s)",
+        f"• Prédictions lancées: {result['launched']} (doublons ignorés: {result['duplicates']})",
+        f"• Réussites: {result['wins']} | Échecs: {result['losses']} (dont expirées: {result['expired']}) "
+        f"| Taux: {result['win_rate'] * 100:.2f}%",
+        f"• En attente à la fin: {result['pending']}",
+    ]
+    for offset, count in result["wins_by_offset"].items():
+        lines.append(f"  - N+{offset}: {count} réussites")
+    for reason, count in result["skipped"].items():
+        lines.append(f"  - Pas de prédiction ({reason}): {count}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    # Backtest hors ligne d'un flux enregistré du canal source:
+    #   python backtest.py flux.jsonl[.gz]|recordings/ [-a 1] [-r 2] [--columns flux.cols] [--decisions decisions.jsonl]
+    parser = argparse.ArgumentParser(description="Backtest hors ligne des règles de prédiction")
+    parser.add_argument("stream")
+    parser.add_argument("-a", "--a-offset", type=int, default=1)
+    parser.add_argument("-r", "--r-offset", type=int, default=2)
+    parser.add_argument("--columns", help="cache des colonnes analysées (réutilisé si plus récent que le flux)")
+    parser.add_argument("--chat", type=int, help="canal source à rejouer (répertoire d'enregistrements)")
+    parser.add_argument("--decisions", help="écrit la décision de chaque partie (JSONL)")
+    parser.add_argument("--json", action="store_true", help="résultat complet en JSON")
+    args = parser.parse_args()
+
+    if not 0 <= args.r_offset <= 10:
+        sys.exit("❌ r doit être entre 0 et 10")
+    parse_started = time.perf_counter()
+    game_columns = load_columns(args.stream, args.columns, args.chat)
+    print(f"📥 {len(game_columns)} parties finalisées chargées en {time.perf_counter() - parse_started:.2f}s", file=sys.stderr)
+    backtest = run_backtest(game_columns, args.a_offset, args.r_offset, decisions=bool(args.decisions))
+    if args.decisions:
+        with open(args.decisions, "w", encoding="utf-8") as out:
+            for entry in backtest.pop("decisions"):
+                out.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    if args.json:
+        backtest.pop("pending_numbers")
+        print(json.dumps(backtest, ensure_ascii=False, indent=2))
+    else:
+        print(format_report(backtest))
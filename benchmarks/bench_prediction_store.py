@@ -0,0 +1,66 @@
+"""
+Coût de vérification par message selon la taille de l'historique des prédictions.
+
+Compare l'ancien parcours complet de active_predictions à la fenêtre indexée de
+PredictionStore. Usage: python benchmarks/bench_prediction_store.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from prediction_store import PredictionStore
+
+R_OFFSET = 2
+PENDING = 5
+MESSAGES = 2000
+
+
+def build_store(history_size: int) -> PredictionStore:
+    store = PredictionStore()
+    predictions = {}
+    for numero in range(history_size):
+        predictions[str(numero)] = {"message_id": numero, "channel_id": -1, "expected": "joueur",
+                                    "verified": True, "status": "❌"}
+    for numero in range(history_size, history_size + PENDING):
+        predictions[str(numero)] = {"message_id": numero, "channel_id": -1, "expected": "joueur",
+                                    "verified": False}
+    store.load(predictions)
+    return store
+
+
+def full_scan(predictions: dict, game_number: int) -> int:
+    """Ancien parcours: toutes les clés, int() sur chacune"""
+    visited = 0
+    for numero_str in list(predictions.keys()):
+        numero = int(numero_str)
+        data = predictions[numero_str]
+        if data.get("verified", False) or game_number < numero:
+            continue
+        visited += 1
+    return visited
+
+
+def bench(history_size: int):
+    store = build_store(history_size)
+    game_number = history_size + PENDING // 2
+
+    scan_rounds = max(10, min(MESSAGES, 200_000 // history_size))
+    start = time.perf_counter()
+    for _ in range(scan_rounds):
+        full_scan(store.predictions, game_number)
+    scan_us = (time.perf_counter() - start) / scan_rounds * 1e6
+
+    start = time.perf_counter()
+    for _ in range(MESSAGES):
+        store.window(game_number, R_OFFSET)
+    window_us = (time.perf_counter() - start) / MESSAGES * 1e6
+    return scan_us, window_us
+
+
+if __name__ == '__main__':
+    print(f"{'historique':>12} {'parcours complet (µs)':>22} {'fenêtre indexée (µs)':>22}")
+    for size in (100, 1_000, 10_000, 100_000):
+        scan_us, window_us = bench(size)
+        print(f"{size:>12} {scan_us:>22.1f} {window_us:>22.2f}")
@@ -0,0 +1,329 @@
+"""
+Suite de benchmarks des chemins chauds, avec baselines JSON.
+
+Chaque benchmark mesure le coût par opération (médiane et meilleur de plusieurs
+répétitions). Les résultats peuvent être enregistrés comme baseline puis comparés
+à une exécution ultérieure: une hausse du meilleur temps au-delà de la tolérance est
+signalée comme régression (code de sortie 1). Une baseline n'a de sens que sur la
+machine qui l'a produite: la réécrire (--save) avant de comparer ailleurs.
+
+Usage:
+    python benchmarks/suite.py                          # exécute et affiche
+    python benchmarks/suite.py --save                   # écrit benchmarks/baseline.json
+    python benchmarks/suite.py --compare                # compare à benchmarks/baseline.json
+    python benchmarks/suite.py --only parse,verify --quick --compare autre.json
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from channel_pair import ChannelPair
+from excel_importer import ExcelPredictionManager
+from message_parser import extract_t_value, has_six_in_first_group, parse_game_message, should_skip_prediction
+from plan_cache import PlanCache
+from prediction_journal import PredictionJournal
+from predictor import CardPredictor
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+DEFAULT_TOLERANCE = 0.25
+
+# Messages représentatifs du canal source (finalisés, en cours, match nul)
+SAMPLE_MESSAGES = [
+    "#N125. ✅8(Q♣️6♥️) - 5(3♣️9♦️3♠️) #T13",
+    "#N126. 3(6♠️7♦️) - ✅9(K♥️9♣️) #T8",
+    "#N127. ⏰2(A♠️A♦️) - 1(J♣️A♥️) #T4",
+    "#N128. 🔰7(6♦️A♣️) - 7(4♠️3♥️) 🟣#X #T14",
+    "#N129. ✅9(4♥️5♠️) - 2(10♦️2♣️) #T9.5",
+]
+
+
+def _timeit(run: Callable[[], Any], ops: int, repeat: int, setup: Optional[Callable[[], Any]] = None) -> Dict[str, Any]:
+    """
+    Exécute run() `repeat` fois (setup() avant chaque répétition, hors mesure) et
+    retourne le coût par opération en µs. La sortie standard est muette pendant la
+    mesure (les fonctions du bot journalisent avec print).
+    """
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        with contextlib.redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - started)
+    per_op = [elapsed / ops * 1e6 for elapsed in timings]
+    return {
+        "ops": ops,
+        "repeat": repeat,
+        "median_us": round(statistics.median(per_op), 3),
+        "best_us": round(min(per_op), 3),
+    }
+
+
+# --- Analyse des messages ---
+
+def bench_parse(quick: bool) -> Dict[str, Dict[str, Any]]:
+    rounds = 2_000 if quick else 20_000
+    messages = SAMPLE_MESSAGES * (rounds // len(SAMPLE_MESSAGES))
+    records = [parse_game_message(text) for text in messages]
+    predictor = CardPredictor()
+    groups = [group for text in messages for group in predictor.extract_symbols_from_parentheses(text)]
+
+    def each(fn, items):
+        return lambda: [fn(item) for item in items]
+
+    return {
+        "parse_game_message": _timeit(each(parse_game_message, messages), len(messages), 5),
+        "should_skip_prediction": _timeit(each(should_skip_prediction, records), len(records), 5),
+        "has_six_in_first_group": _timeit(each(has_six_in_first_group, records), len(records), 5),
+        "extract_t_value": _timeit(each(extract_t_value, records), len(records), 5),
+        "extract_game_number": _timeit(each(predictor.extract_game_number, messages), len(messages), 5),
+        "count_total_cards": _timeit(each(predictor.count_total_cards, groups), len(groups), 5),
+    }
+
+
+# --- Vérification des prédictions actives ---
+
+class FakeOutbound:
+    """File d'envoi factice: chaque envoi/édition est immédiatement réussi"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def _done(self):
+        self.calls += 1
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(None)
+        return future
+
+    def send(self, chat_id, text, key=None, on_sent=None):
+        return self._done()
+
+    def edit(self, chat_id, text, message_id=None, key=None):
+        return self._done()
+
+
+def bench_verify(quick: bool, workdir: str) -> Dict[str, Dict[str, Any]]:
+    """
+    verify_active_predictions avec 10k prédictions en attente: les parties suivantes
+    défilent une à une et vérifient chacune leur fenêtre [N - r, N].
+    """
+    pending = 1_000 if quick else 10_000
+    first = 100_000
+    records = [parse_game_message(f"#N{first + i}. ✅{(i * 7) % 10}(6♠️{i % 9 + 1}♥️) - 5(3♣️9♦️) #T{i % 20}")
+               for i in range(pending)]
+    with contextlib.redirect_stdout(io.StringIO()):
+        pair = ChannelPair("bench", display_id=-100, outbound=FakeOutbound())
+    predictions = {
+        str(first + i): {"message_id": i, "channel_id": -100, "expected": "joueur" if i % 2 else "banquier",
+                         "base_text": f"🔵{first + i}:🅿️+6,5🔵statut :⏳", "verified": False}
+        for i in range(pending)
+    }
+    loop = asyncio.new_event_loop()
+
+    async def walk():
+        for record in records:
+            await pair.verify_active_predictions(record)
+        # Les tâches de mesure de latence (dispatch_status_edits) font partie du coût
+        await asyncio.gather(*(task for task in asyncio.all_tasks() if task is not asyncio.current_task()))
+
+    try:
+        result = _timeit(lambda: loop.run_until_complete(walk()), len(records), 3,
+                         setup=lambda: pair.store.load({key: dict(data) for key, data in predictions.items()}))
+    finally:
+        pair.close()
+        loop.close()
+    result["pending"] = pending
+    return {"verify_active_predictions": result}
+
+
+# --- Persistance des prédictions (ancien save_config avec active_predictions) ---
+
+def bench_persistence(quick: bool, workdir: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Les prédictions actives ne sont plus écrites dans bot_config.json (save_config) mais
+    dans le journal: on mesure le snapshot complet et l'ajout d'une transition.
+    """
+    size = 1_000 if quick else 10_000
+    state = {"live": {str(n): {"message_id": n, "channel_id": -100, "expected": "joueur", "verified": False,
+                               "base_text": f"🔵{n}:🅿️+6,5🔵statut :⏳", "source_game": n - 1, "t_value": 11.0}
+                      for n in range(size)}}
+    journal = PredictionJournal(os.path.join(workdir, "bench.journal"), os.path.join(workdir, "bench_snapshot.json"))
+    journal.snapshot_every = 10 ** 9
+    appends = 10_000
+    try:
+        results = {
+            "journal_snapshot": _timeit(lambda: journal.snapshot(state), 1, 5),
+            "journal_append": _timeit(
+                lambda: [journal.append("live", "update", str(n), {"attempts": 1}) for n in range(appends)], appends, 3
+            ),
+        }
+    finally:
+        journal.close()
+    results["journal_snapshot"]["predictions"] = size
+    return results
+
+
+# --- Import Excel et plan ---
+
+def generate_workbook(path: str, rows: int, seed: int = 7):
+    """Classeur de plan (date_heure, numero, victoire) avec des numéros croissants espacés"""
+    from openpyxl import Workbook
+
+    rng = random.Random(seed)
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(["date_heure", "numero", "victoire"])
+    numero = 1
+    started = datetime(2025, 1, 1)
+    for index in range(rows):
+        numero += rng.choice((1, 2, 3, 4))
+        sheet.append([started.replace(minute=index % 60), numero, rng.choice(("Joueur", "Banquier"))])
+    workbook.save(path)
+
+
+def bench_excel(quick: bool, workdir: str) -> Dict[str, Dict[str, Any]]:
+    rows = 10_000 if quick else 100_000
+    workbook_path = os.path.join(workdir, f"plan_{rows}.xlsx")
+    generate_workbook(workbook_path, rows)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        cold = ExcelPredictionManager(predictions_file=os.path.join(workdir, "cold.yaml"))
+        cache = PlanCache(os.path.join(workdir, "plan_cache"))
+        cached = ExcelPredictionManager(plan_cache=cache, predictions_file=os.path.join(workdir, "cached.yaml"))
+    try:
+        results = {
+            "import_excel": _timeit(lambda: cold.import_excel(workbook_path), rows, 1),
+        }
+        with contextlib.redirect_stdout(io.StringIO()):
+            cached.import_excel(workbook_path)  # Remplit le cache compilé
+        results["import_excel_cached"] = _timeit(lambda: cached.import_excel(workbook_path), rows, 3,
+                                                 setup=lambda: cache.set_current(None))
+        results["import_excel"]["rows"] = results["import_excel_cached"]["rows"] = rows
+
+        # find_close_prediction: numéros source défilant sur tout le plan (index non modifié)
+        numeros = [pred["numero"] for pred in cold.predictions.values()]
+        probes = [numero - offset for numero in numeros[:20_000] for offset in (0, 2, 5)]
+        cold.last_launched_numero = None
+        results["find_close_prediction"] = _timeit(
+            lambda: [cold.find_close_prediction(number) for number in probes], len(probes), 5
+        )
+        results["find_close_prediction"]["plan_size"] = len(cold.predictions)
+    finally:
+        cold.shutdown_executor()
+        cached.shutdown_executor()
+    return results
+
+
+BENCHMARKS = {
+    "parse": bench_parse,
+    "verify": bench_verify,
+    "persistence": bench_persistence,
+    "excel": bench_excel,
+}
+
+
+def run(only=None, quick: bool = False) -> Dict[str, Any]:
+    results = {}
+    workdir = tempfile.mkdtemp(prefix="bench_")
+    cwd = os.getcwd()
+    try:
+        # Les fichiers créés par le bot (paires, historiques, sauvegardes) restent dans workdir
+        os.chdir(workdir)
+        for group, bench in BENCHMARKS.items():
+            if only and group not in only:
+                continue
+            started = time.perf_counter()
+            results.update(bench(quick) if group == "parse" else bench(quick, workdir))
+            print(f"⏱️ {group}: {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+    return {
+        "meta": {
+            "date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "quick": quick,
+        },
+        "results": results,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> Dict[str, float]:
+    """Variation relative du meilleur temps (le moins bruité) par benchmark commun: {nom: ratio - 1}"""
+    deltas = {}
+    for name, result in current["results"].items():
+        reference = baseline["results"].get(name)
+        if reference and reference["best_us"] > 0:
+            deltas[name] = result["best_us"] / reference["best_us"] - 1
+    return deltas
+
+
+def format_table(current: Dict[str, Any], deltas: Dict[str, float], baseline: Optional[Dict[str, Any]],
+                 tolerance: float) -> str:
+    header = f"{'benchmark':<26} {'médiane (µs)':>13} {'meilleur (µs)':>14} {'baseline (µs)':>14} {'écart':>8}"
+    lines = [header, "-" * len(header)]
+    for name, result in current["results"].items():
+        reference = baseline["results"].get(name) if baseline else None
+        line = f"{name:<26} {result['median_us']:>13.3f} {result['best_us']:>14.3f}"
+        if reference:
+            delta = deltas.get(name, 0.0)
+            flag = " ⚠️" if delta > tolerance else ""
+            line += f" {reference['best_us']:>14.3f} {delta * 100:>+7.1f}%{flag}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmarks des chemins chauds")
+    parser.add_argument("--only", help=f"groupes à exécuter ({', '.join(BENCHMARKS)})")
+    parser.add_argument("--quick", action="store_true", help="tailles réduites (10x)")
+    parser.add_argument("--save", nargs="?", const=DEFAULT_BASELINE, help="écrit les résultats comme baseline")
+    parser.add_argument("--compare", nargs="?", const=DEFAULT_BASELINE, help="compare à une baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="hausse relative tolérée avant régression (0.25 = +25%%)")
+    args = parser.parse_args()
+
+    only = set(args.only.split(",")) if args.only else None
+    if only and not only <= set(BENCHMARKS):
+        sys.exit(f"❌ Groupes inconnus: {', '.join(sorted(only - set(BENCHMARKS)))}")
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline["meta"].get("quick") != args.quick:
+            print("⚠️ Baseline mesurée avec d'autres tailles (--quick): écarts non significatifs", file=sys.stderr)
+        if baseline["meta"].get("platform") != platform.platform():
+            print(f"⚠️ Baseline d'une autre machine ({baseline['meta'].get('platform')})", file=sys.stderr)
+
+    current = run(only, args.quick)
+    deltas = compare(current, baseline, args.tolerance) if baseline else {}
+    print(format_table(current, deltas, baseline, args.tolerance))
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(current, f, ensure_ascii=False, indent=2)
+        print(f"💾 Baseline écrite: {args.save}", file=sys.stderr)
+
+    regressions = [name for name, delta in deltas.items() if delta > args.tolerance]
+    if regressions:
+        print(f"❌ Régressions (> +{args.tolerance * 100:.0f}%): {', '.join(regressions)}", file=sys.stderr)
+        sys.exit(1)
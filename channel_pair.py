@@ -0,0 +1,456 @@
+import asyncio
+import os
+import re
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+from excel_importer import ExcelPredictionManager
+from game_tracker import GameStateTracker
+from history_store import PredictionHistory
+from ingest import IngestQueue
+from message_parser import GameRecord, ParseCache, extract_t_value
+from metrics import registry, stage
+from persistence import WriteBehind
+from plan_cache import PlanCache
+from prediction_journal import PredictionJournal
+from prediction_rules import (
+    BANQUIER, JOUEUR, NO_SIX, NO_T, SKIPPED, VERIFICATION_EMOJIS, is_success, launch_decision, prediction_text
+)
+from prediction_store import PredictionStore
+
+# Paire historique: configurée par les clés de premier niveau de bot_config.json,
+# fichiers à la racine comme avant
+DEFAULT_PAIR = "main"
+
+# Nom de paire utilisable dans les commandes et les noms de fichiers
+PAIR_NAME_RE = re.compile(r"^[A-Za-z][\w-]{0,31}$")
+
+# Répertoire des fichiers des paires supplémentaires (un sous-répertoire par paire)
+PAIRS_DIR = "pairs"
+
+# Latence des étapes du pipeline (voir metrics.py), résolues une fois au chargement
+PARSE_STAGE = stage("parse")
+SKIP_FILTER_STAGE = stage("skip_filter")
+VERIFY_STAGE = stage("verify")
+VERIFY_EXCEL_STAGE = stage("verify_excel")
+LAUNCH_DECISIONS_TOTAL = registry.counter("bot_launch_decisions_total",
+                                          "Décisions de lancement par partie finalisée", ("pair", "decision"))
+
+
+class ChannelPair:
+    """
+    Une table suivie: un canal source et son canal de diffusion, avec un état isolé.
+
+    Chaque paire possède son cache d'analyse, son suivi de parties, son index de
+    prédictions (journal + historique), son plan Excel (et son cache compilé) et sa
+    file d'entrée, dont les workers sont les tâches asyncio de la paire. Les paires
+    partagent uniquement le client Telegram, la file d'envoi et la persistance
+    différée (une cible par paire, préfixée par son nom).
+
+    La paire DEFAULT_PAIR garde les fichiers historiques à la racine; les autres
+    écrivent dans pairs/<nom>/.
+    """
+
+    def __init__(self, name: str, source_id: Optional[int] = None, display_id: Optional[int] = None,
+                 a_offset: int = 1, r_offset: int = 2, outbound=None,
+                 persistence: Optional[WriteBehind] = None,
+                 on_posted: Optional[Callable[["ChannelPair", int], None]] = None):
+        self.name = name
+        self.source_id = source_id
+        self.display_id = display_id
+        self.a_offset = a_offset
+        self.r_offset = r_offset
+        self.outbound = outbound
+        self.on_posted = on_posted  # Appelé quand Telegram a accepté le message de prédiction
+        # Préfixe des logs et des cibles de persistance (vide pour la paire historique)
+        self.tag = "" if name == DEFAULT_PAIR else f"[{name}] "
+        self.data_dir = "." if name == DEFAULT_PAIR else os.path.join(PAIRS_DIR, name)
+        os.makedirs(self.data_dir, exist_ok=True)
+        prefix = "" if name == DEFAULT_PAIR else f"{name}:"
+        self.persistence = persistence
+
+        self.history = PredictionHistory(self.path("predictions_history.jsonl"))
+        self.journal = PredictionJournal(self.path("predictions.journal"), self.path("predictions_snapshot.json"),
+                                         persistence=persistence, persistence_key=f"{prefix}journal")
+        self.store = PredictionStore(self.history, self.journal)
+        self.excel_manager = ExcelPredictionManager(
+            persistence=persistence, journal=self.journal, plan_cache=PlanCache(self.path("plan_cache")),
+            predictions_file=self.path("excel_predictions.yaml"), persistence_key=f"{prefix}excel_predictions"
+        )
+        # Contenu des snapshots du journal: prédictions en attente + transitions du plan Excel
+        self.journal.state_provider = lambda: {
+            "live": self.store.predictions,
+            "excel": self.excel_manager.overlay
+        }
+        self.parse_cache = ParseCache()
+        self.game_tracker = GameStateTracker()
+        self.ingest = IngestQueue(self.process_source_message)
+        # Délai entre un message résultat et la dernière mise à jour de statut qu'il déclenche
+        self.verification_latency = {"batches": 0, "edits": 0, "last_ms": 0.0, "max_ms": 0.0}
+        self.launched = 0
+
+    def path(self, file_name: str) -> str:
+        return os.path.join(self.data_dir, file_name) if self.data_dir != "." else file_name
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], **kwargs) -> "ChannelPair":
+        return cls(config["name"], config.get("stat_channel"), config.get("display_channel"),
+                   config.get("a_offset", 1), config.get("r_offset", 2), **kwargs)
+
+    def to_config(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "stat_channel": self.source_id,
+            "display_channel": self.display_id,
+            "a_offset": self.a_offset,
+            "r_offset": self.r_offset
+        }
+
+    def recover(self):
+        """Restaure les prédictions depuis le dernier snapshot + la fin du journal"""
+        if self.journal.exists():
+            state = self.journal.recover()
+            self.store.load(state.get("live", {}))
+            self.excel_manager.apply_overlay(state.get("excel", {}))
+        print(f"✅ {self.tag}Prédictions en attente: {self.store.pending_count()}")
+        # Snapshot de départ: le journal repart vide, la prochaine reprise sera immédiate
+        self.journal.snapshot()
+
+    def start(self):
+        self.ingest.start()
+
+    async def stop(self):
+        await self.ingest.stop()
+
+    def close(self):
+        """Dernières écritures et libération des fichiers (arrêt, ou paire retirée)"""
+        if self.persistence is not None:
+            self.persistence.unregister(self.excel_manager.persistence_key)
+            self.persistence.unregister(self.journal.persistence_key)
+        self.journal.close()
+        self.excel_manager.shutdown_executor()
+
+    async def submit(self, chat_id: int, message_id: int, text: str):
+        """Dépôt dans la file d'entrée de la paire: traitement sérialisé par partie"""
+        await self.ingest.submit(chat_id, message_id, text)
+
+    async def process_source_message(self, chat_id: int, message_id: int, text: str):
+        """Traitement d'un message du canal source (appelé par la file d'entrée, sous le verrou de sa partie)"""
+        # Analyse unique du message: toutes les étapes suivantes lisent cet enregistrement.
+        # Une édition qui ne change aucun champ utile est ignorée sans nouvelle vérification.
+        started = time.perf_counter()
+        record, changed = self.parse_cache.parse(chat_id, message_id, text)
+        PARSE_STAGE.observe(time.perf_counter() - started)
+
+        if not changed or not record or not record.game_number:
+            return
+
+        # Vérification et lancement uniquement à la transition en cours → finalisé (✅ ou 🔰).
+        # Les éditions intermédiaires (⏰/🕐) et celles d'une partie déjà traitée s'arrêtent ici.
+        if not self.game_tracker.observe(record):
+            if not record.is_finalized:
+                print(f"⏳ {self.tag}Message #{record.game_number} pas encore finalisé - en attente")
+            return
+
+        try:
+            await self.process_finalized_game(record)
+        finally:
+            self.game_tracker.mark_consumed(record.game_number)
+
+    async def process_finalized_game(self, record: GameRecord):
+        """Vérifie les prédictions actives puis lance une nouvelle prédiction pour une partie finalisée"""
+        game_number = record.game_number
+        print(f"📨 {self.tag}Message finalisé du canal source - Jeu #{game_number}")
+
+        # --- ÉTAPE 1: VÉRIFICATION DES PRÉDICTIONS ACTIVES ---
+        await self.verify_active_predictions(record)
+
+        # --- ÉTAPE 2: NOUVELLE PRÉDICTION BASÉE SUR LA DÉTECTION DU 6 ---
+        if not self.display_id:
+            print(f"⚠️ {self.tag}Canal de diffusion non configuré - impossible de lancer des prédictions")
+            return
+
+        # Règle de lancement (prediction_rules.py, partagée avec le backtest)
+        started = time.perf_counter()
+        decision = launch_decision(record)
+        SKIP_FILTER_STAGE.observe(time.perf_counter() - started)
+        LAUNCH_DECISIONS_TOTAL.labels(self.name, decision).inc()
+        if decision == SKIPPED:
+            print(f"⏭️ {self.tag}Message #{game_number} ignoré (match nul ou total=6 avec carte 6)")
+            return
+        if decision == NO_SIX:
+            print(f"ℹ️ {self.tag}Pas de 6 dans le premier groupe du jeu #{game_number} - pas de prédiction")
+            return
+        if decision == NO_T:
+            print(f"⚠️ {self.tag}Impossible d'extraire #T du jeu #{game_number}")
+            return
+        t_value = extract_t_value(record)
+
+        # Calculer le numéro de prédiction: N + a
+        predicted_numero = game_number + self.a_offset
+
+        # Vérifier si une prédiction existe déjà pour ce numéro
+        if predicted_numero in self.store:
+            print(f"ℹ️ {self.tag}Prédiction #{predicted_numero} déjà existante - ignorée")
+            return
+
+        # Type de prédiction
+        prediction_type = decision
+        text = prediction_text(predicted_numero, prediction_type)
+        if prediction_type == JOUEUR:
+            print(f"🎯 {self.tag}#T={t_value} > 10.5 → Prédiction JOUEUR pour #{predicted_numero}")
+        else:
+            print(f"🎯 {self.tag}#T={t_value} <= 10.5 → Prédiction BANQUIER pour #{predicted_numero}")
+
+        # Enregistrer la prédiction active (message_id renseigné une fois le message envoyé)
+        self.store.add(predicted_numero, {
+            "message_id": None,
+            "channel_id": self.display_id,
+            "expected": prediction_type,
+            "base_text": text,
+            "source_game": game_number,
+            "t_value": t_value,
+            "verified": False,
+            "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        })
+
+        # Envoyer la prédiction (mise en file: le traitement du canal source n'attend pas Telegram)
+        sent = self.outbound.send(
+            self.display_id, text, key=self.live_key(predicted_numero),
+            on_sent=lambda message: self._on_posted(predicted_numero, message)
+        )
+        sent.add_done_callback(lambda future: self._on_send_done(future, predicted_numero))
+        self.launched += 1
+        print(f"✅ {self.tag}Prédiction lancée: {text} (source: #{game_number}, #T={t_value})")
+
+    def live_key(self, numero: int) -> tuple:
+        """Clé d'envoi d'une prédiction (unique entre paires pour la file d'envoi partagée)"""
+        return (self.name, "live", numero)
+
+    def _on_posted(self, predicted_numero: int, message):
+        """Prédiction publiée: message_id enregistré pour les éditions de vérification"""
+        self.store.update(predicted_numero, message_id=message.id)
+        if self.on_posted is not None:
+            self.on_posted(self, predicted_numero)
+
+    def _on_send_done(self, future: asyncio.Future, predicted_numero: int):
+        """Envoi abandonné après tous les essais: la prédiction n'a jamais été publiée"""
+        if future.cancelled() or future.exception() is None:
+            return
+        print(f"❌ {self.tag}Erreur envoi prédiction #{predicted_numero}: {future.exception()}")
+        self.store.discard(predicted_numero)
+
+    async def verify_active_predictions(self, record: GameRecord):
+        """
+        Vérifie les prédictions actives basées sur les messages du canal source.
+
+        Logique de vérification séquentielle:
+        1. Vérifie d'abord à N+0 (numéro exact prédit)
+        2. Si échec et r ≥ 1, continue à N+1
+        3. Si échec et r ≥ 2, continue à N+2
+        4. Marque ❌ si échec après tous les essais autorisés par r_offset
+
+        Appelée une seule fois par partie, à sa finalisation (voir GameStateTracker).
+        Seules les prédictions non vérifiées de la fenêtre [N - r_offset, N] (et les
+        expirées avant elle) sont visitées, via l'index du store.
+        """
+        game_number = record.game_number
+        r_offset = self.r_offset
+        started = time.perf_counter()
+        expired, due = self.store.window(game_number, r_offset)
+        # Changements de statut collectés puis envoyés ensemble (voir dispatch_status_edits)
+        edits = []
+
+        for pred_numero, pred_data in expired + due:
+            # Récupérer le nombre d'essais déjà effectués
+            attempts_done = pred_data.get("attempts", 0)
+
+            # Calculer l'offset actuel (combien de jeux après la prédiction)
+            current_offset = game_number - pred_numero
+
+            # Si on a dépassé le nombre maximum d'essais autorisés, marquer comme échec
+            if current_offset > r_offset:
+                msg_id = pred_data.get("message_id")
+                channel_id = pred_data.get("channel_id")
+                base_text = pred_data.get("base_text", "")
+
+                if channel_id:
+                    new_text = base_text.replace("statut :⏳", "statut :❌")
+                    edits.append((channel_id, new_text, msg_id, self.live_key(pred_numero)))
+                    print(f"❌ {self.tag}Prédiction #{pred_numero} expirée après offset {r_offset}")
+
+                self.store.update(pred_numero, attempts=r_offset + 1)
+                self.store.mark_verified(pred_numero, "❌")
+                continue
+
+            # Vérifier seulement si c'est un offset qu'on n'a pas encore testé
+            if current_offset > attempts_done:
+                msg_id = pred_data.get("message_id")
+                channel_id = pred_data.get("channel_id")
+                expected = pred_data.get("expected", "")
+
+                if not channel_id:
+                    continue
+
+                # Point du premier groupe
+                premier_groupe_point = record.first_total
+
+                if premier_groupe_point is None:
+                    print(f"⚠️ {self.tag}Impossible d'extraire le point du premier groupe du jeu #{game_number}")
+                    continue
+
+                # Vérifier si la prédiction est réussie (P+6,5: point > 6.5, M-4,5: point < 4.5)
+                success = is_success(expected, premier_groupe_point)
+                if success and expected == JOUEUR:
+                    print(f"✅ {self.tag}Prédiction #{pred_numero} JOUEUR (P+6,5) réussie à N+{current_offset}: point={premier_groupe_point} > 6.5")
+                elif success and expected == BANQUIER:
+                    print(f"✅ {self.tag}Prédiction #{pred_numero} BANQUIER (M-4,5) réussie à N+{current_offset}: point={premier_groupe_point} < 4.5")
+
+                # Mettre à jour le nombre d'essais
+                self.store.update(pred_numero, attempts=current_offset)
+
+                if success:
+                    # Succès: marquer avec l'emoji approprié et arrêter
+                    status_emoji = VERIFICATION_EMOJIS.get(current_offset, f"✅{current_offset}")
+                    base_text = pred_data.get("base_text", "")
+                    new_text = base_text.replace("statut :⏳", f"statut :{status_emoji}")
+
+                    edits.append((channel_id, new_text, msg_id, self.live_key(pred_numero)))
+                    self.store.mark_verified(pred_numero, status_emoji)
+                    print(f"✅ {self.tag}Prédiction #{pred_numero} validée: {status_emoji} (N+{current_offset})")
+                else:
+                    # Échec sur cet essai
+                    print(f"⏳ {self.tag}Prédiction #{pred_numero} échec à N+{current_offset} (essai {current_offset + 1}/{r_offset + 1})")
+
+                    # Si c'est le dernier essai autorisé, marquer comme échec définitif
+                    if current_offset >= r_offset:
+                        base_text = pred_data.get("base_text", "")
+                        new_text = base_text.replace("statut :⏳", "statut :❌")
+
+                        edits.append((channel_id, new_text, msg_id, self.live_key(pred_numero)))
+                        self.store.mark_verified(pred_numero, "❌")
+                        print(f"❌ {self.tag}Prédiction #{pred_numero} échouée après tous les essais (N+0 à N+{r_offset})")
+
+        VERIFY_STAGE.observe(time.perf_counter() - started)
+        self.dispatch_status_edits(edits, started)
+
+    def dispatch_status_edits(self, edits: list, started: float):
+        """
+        Envoie en une fois les éditions de statut d'un message résultat.
+
+        Les éditions (chat, texte, message_id, clé) partent en parallèle via outbound
+        (parallélisme borné par chat); le délai entre le résultat et la dernière mise à
+        jour est mesuré dans verification_latency.
+        """
+        if not edits:
+            return
+        futures = [
+            self.outbound.edit(channel_id, text, message_id=message_id, key=key)
+            for channel_id, text, message_id, key in edits
+        ]
+        asyncio.create_task(self._record_verification_latency(futures, started))
+
+    async def _record_verification_latency(self, futures: list, started: float):
+        await asyncio.gather(*futures, return_exceptions=True)
+        elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+        self.verification_latency["batches"] += 1
+        self.verification_latency["edits"] += len(futures)
+        self.verification_latency["last_ms"] = elapsed_ms
+        self.verification_latency["max_ms"] = max(self.verification_latency["max_ms"], elapsed_ms)
+
+    async def verify_excel_predictions(self, record: GameRecord):
+        """Fonction consolidée pour vérifier toutes les prédictions Excel en attente"""
+        game_number = record.game_number
+        started = time.perf_counter()
+        # Transitions et éditions collectées, appliquées en une fois à la fin
+        updates = {}
+        edits = []
+        for key, pred in list(self.excel_manager.predictions.items()):
+            # Ignorer si pas lancée ou déjà vérifiée
+            if not pred["launched"] or pred.get("verified", False):
+                continue
+
+            pred_numero = pred["numero"]
+            expected_winner = pred["victoire"]
+            current_offset = pred.get("current_offset", 0)
+            target_number = pred_numero + current_offset
+
+            # DÉTECTION DE SAUT DE NUMÉRO
+            if game_number > target_number:
+                print(f"⚠️ {self.tag}Numéro sauté: #{pred_numero} attendait #{target_number}, reçu #{game_number}")
+
+                while current_offset <= 2 and game_number > pred_numero + current_offset:
+                    current_offset += 1
+                    print(f"⏭️ {self.tag}Prédiction #{pred_numero}: saut à offset {current_offset}")
+
+                # Note: excel_manager.verify_excel_prediction gère maintenant la vérification d'échec > 2
+                if current_offset > 2:
+                    # Marquer comme échec si l'offset dépasse 2
+                    self.update_prediction_status(pred, pred_numero, expected_winner, "❌", True, updates, edits)
+                    continue
+                else:
+                    updates.setdefault(key, {})["current_offset"] = current_offset
+
+            # Vérification séquentielle
+            status, should_continue = self.excel_manager.verify_excel_prediction(
+                game_number, record, pred_numero, expected_winner, current_offset
+            )
+
+            if status:
+                self.update_prediction_status(pred, pred_numero, expected_winner, status, True, updates, edits)
+            elif should_continue and game_number == pred_numero + current_offset:
+                new_offset = current_offset + 1
+                if new_offset <= 2:
+                    updates.setdefault(key, {})["current_offset"] = new_offset
+                    print(f"⏭️ {self.tag}Prédiction #{pred_numero}: offset {new_offset}")
+                else:
+                    # Échec définitif après offset 2 non réussi
+                    self.update_prediction_status(pred, pred_numero, expected_winner, "❌", True, updates, edits)
+
+        # Une seule sauvegarde pour toutes les transitions, puis les éditions en parallèle
+        self.excel_manager.update_predictions(updates)
+        VERIFY_EXCEL_STAGE.observe(time.perf_counter() - started)
+        self.dispatch_status_edits(edits, started)
+
+    def update_prediction_status(self, pred: dict, numero: int, winner: str, status: str, verified: bool,
+                                 updates: dict, edits: list):
+        """Mise à jour unifiée du statut de prédiction (ajoutée aux transitions et éditions collectées)"""
+        msg_id = pred.get("message_id")
+        channel_id = pred.get("channel_id")
+
+        if msg_id and channel_id:
+            # Format complet (🔵{numero}:🅿️+6,5🔵statut :⏳): seule la fin :⏳ est remplacée par :{status}
+            full_base_text_with_placeholder = self.excel_manager.get_prediction_format(numero, winner)
+            base_format = full_base_text_with_placeholder.rsplit("statut :⏳", 1)[0]
+            new_text = f"{base_format}statut :{status}"
+
+            edits.append((channel_id, new_text, msg_id, None))
+            updates.setdefault(str(pred["numero"]), {})["verified"] = verified
+            print(f"✅ {self.tag}Prédiction #{numero} mise à jour: {status}")
+
+    def describe(self) -> str:
+        """Résumé d'une ligne pour les commandes admin"""
+        return (f"• **{self.name}**: source {self.source_id or '❌'} → diffusion {self.display_id or '❌'} "
+                f"(a={self.a_offset}, r={self.r_offset}, en attente: {self.store.pending_count()}, "
+                f"file: {self.ingest.depth()})")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "stat_channel": self.source_id,
+            "display_channel": self.display_id,
+            "a_offset": self.a_offset,
+            "r_offset": self.r_offset,
+            "launched": self.launched,
+            "predictions": {
+                "pending": self.store.pending_count(),
+                "history": self.history.get_stats()
+            },
+            "excel_predictions": self.excel_manager.get_stats(),
+            "plan_cache": self.excel_manager.plan_cache.get_stats(),
+            "parse_cache": self.parse_cache.get_stats(),
+            "games": self.game_tracker.get_stats(),
+            "journal": self.journal.get_stats(),
+            "ingest": self.ingest.get_stats(),
+            "verification_latency": self.verification_latency
+        }
@@ -0,0 +1,67 @@
+import re
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+# Nom de commande: /nom ou /nom@NomDuBot, suivi des arguments
+COMMAND_RE = re.compile(r"^/([A-Za-z_]+)(?:@\w+)?")
+
+Handler = Callable[..., Awaitable[None]]
+
+
+class CommandRouter:
+    """
+    Aiguillage des commandes par table de correspondance exacte.
+
+    Le nom de la commande (/sta, /start, /status, /r, /reset...) est extrait puis
+    cherché tel quel dans la table: une commande n'en déclenche jamais une autre qui
+    partage son préfixe. Le motif optionnel porte sur les arguments uniquement
+    (fullmatch); son résultat est exposé comme event.pattern_match, comme avec
+    events.NewMessage(pattern=...). Des arguments invalides reçoivent l'usage de la
+    commande en réponse.
+    """
+
+    def __init__(self):
+        self.commands: Dict[str, Tuple[Handler, Optional[re.Pattern], str]] = {}
+        self.dispatched = 0
+        self.unknown = 0
+        self.invalid = 0
+
+    def command(self, name: str, args_pattern: Optional[str] = None, usage: Optional[str] = None):
+        """Décorateur: enregistre un handler pour /name (arguments optionnels, usage affiché si invalides)"""
+        compiled = re.compile(args_pattern) if args_pattern is not None else None
+
+        def register(handler: Handler) -> Handler:
+            self.commands[name.lower()] = (handler, compiled, usage or f"/{name}")
+            return handler
+        return register
+
+    async def dispatch(self, event) -> bool:
+        """Exécute la commande du message; retourne False si ce n'est pas une commande connue"""
+        text = event.raw_text or ""
+        match = COMMAND_RE.match(text)
+        if not match:
+            return False
+        entry = self.commands.get(match.group(1).lower())
+        if entry is None:
+            self.unknown += 1
+            return False
+        handler, args_pattern, usage = entry
+        args = text[match.end():].strip()
+        if args_pattern is not None:
+            event.pattern_match = args_pattern.fullmatch(args)
+            if event.pattern_match is None:
+                self.invalid += 1
+                await event.respond(f"❌ Arguments invalides\n\n💡 Usage: `{usage}`")
+                return True
+        else:
+            event.pattern_match = None
+        self.dispatched += 1
+        await handler(event)
+        return True
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            "commands": len(self.commands),
+            "dispatched": self.dispatched,
+            "unknown": self.unknown,
+            "invalid": self.invalid
+        }
@@ -0,0 +1,88 @@
+from typing import Any, Dict, Iterable, Optional, Union
+
+from telethon import utils
+
+
+class EntityCache:
+    """
+    Cache de l'identité du bot et des InputPeer des canaux configurés.
+
+    get_me() et la résolution des canaux ne coûtent un appel RPC qu'à la première
+    utilisation (ou après invalidate()); ensuite, les handlers et la file d'envoi
+    utilisent directement l'InputPeer mis en cache. warm() précharge le tout au
+    démarrage.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.me = None
+        self._peers: Dict[int, Any] = {}   # {chat_id: InputPeer}
+        self._titles: Dict[int, str] = {}  # {chat_id: titre}
+        self.hits = 0
+        self.rpcs = 0
+
+    async def get_me(self):
+        if self.me is None:
+            self.rpcs += 1
+            self.me = await self.client.get_me()
+        else:
+            self.hits += 1
+        return self.me
+
+    @property
+    def me_id(self) -> Optional[int]:
+        return getattr(self.me, "id", None)
+
+    async def fetch(self, chat_id: int):
+        """Récupère l'entité (RPC) et met en cache son InputPeer et son titre"""
+        self.rpcs += 1
+        entity = await self.client.get_entity(chat_id)
+        self._peers[chat_id] = utils.get_input_peer(entity)
+        self._titles[chat_id] = getattr(entity, "title", None) or f"Canal {chat_id}"
+        return entity
+
+    async def get_title(self, chat_id: int) -> str:
+        if chat_id in self._titles:
+            self.hits += 1
+            return self._titles[chat_id]
+        try:
+            await self.fetch(chat_id)
+        except Exception:
+            return f"Canal {chat_id}"
+        return self._titles[chat_id]
+
+    def peer(self, chat_id: int) -> Union[Any, int]:
+        """InputPeer en cache, sinon l'identifiant brut (résolu par Telethon)"""
+        peer = self._peers.get(chat_id)
+        if peer is None:
+            return chat_id
+        self.hits += 1
+        return peer
+
+    async def warm(self, chat_ids: Iterable[Optional[int]]):
+        """Préchargement au démarrage: identité du bot et canaux configurés"""
+        await self.get_me()
+        for chat_id in chat_ids:
+            if chat_id and chat_id not in self._peers:
+                try:
+                    await self.fetch(chat_id)
+                except Exception as e:
+                    print(f"⚠️ Impossible de résoudre le canal {chat_id}: {e}")
+        print(f"✅ Cache d'entités prêt: {len(self._peers)} canaux ({self.rpcs} appels)")
+
+    def invalidate(self, chat_id: Optional[int] = None):
+        """Oublie un canal (ou tout le cache si chat_id est None)"""
+        if chat_id is None:
+            self._peers.clear()
+            self._titles.clear()
+            self.me = None
+            return
+        self._peers.pop(chat_id, None)
+        self._titles.pop(chat_id, None)
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            "peers": len(self._peers),
+            "hits": self.hits,
+            "rpcs": self.rpcs
+        }
@@ -1,22 +1,254 @@
 import os
+import pickle
+import sys
+import time
 import yaml
-import re
+from bisect import bisect_left
 from datetime import datetime
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Iterable, Callable, Awaitable
+import asyncio
 from openpyxl import load_workbook
+from message_parser import GameRecord, GROUP_RE
+from metrics import stage
+from persistence import WriteBehind, atomic_write_yaml
+from plan_cache import PlanCache, compile_plan, decode_plan, file_sha256
+from prediction_journal import PredictionJournal, OP_UPDATE, OP_RESET
+
+JOURNAL_NAMESPACE = "excel"
+
+# Nombre maximum d'erreurs détaillées conservées dans le rapport d'import
+MAX_REPORTED_ERRORS = 200
+
+# Durée d'un import complet hors de la boucle (voir metrics.py)
+EXCEL_IMPORT_STAGE = stage("excel_import")
+
+
+async def _measure_loop_lag(interval: float = 0.05) -> float:
+    """Mesure le retard maximal de la boucle d'événements jusqu'à annulation"""
+    loop = asyncio.get_running_loop()
+    worst = 0.0
+    try:
+        while True:
+            expected = loop.time() + interval
+            await asyncio.sleep(interval)
+            worst = max(worst, loop.time() - expected)
+    except asyncio.CancelledError:
+        return worst
+
+
+def build_excel_plan(file_path: str, launched_keys: Iterable[str] = (), serialize: bool = False) -> Dict[str, Any]:
+    """
+    Lit un fichier Excel en streaming (openpyxl read_only) et construit le plan ligne par ligne.
+
+    Une ligne invalide n'interrompt pas l'import: elle est ajoutée au rapport d'erreurs
+    (ligne, colonne, raison), limité à MAX_REPORTED_ERRORS entrées détaillées.
+    Fonction pure (aucun état partagé): elle peut tourner dans un processus séparé.
+    Avec serialize=True (mode remplacement), le plan est aussi compilé (plan_cache.py).
+    """
+    launched_keys = frozenset(launched_keys)
+    start = time.perf_counter()
+    imported_count = 0
+    skipped_count = 0
+    consecutive_skipped = 0
+    empty_rows = 0
+    error_count = 0
+    errors = []
+    predictions = {}
+    last_numero = None
+    rows_read = 0
+    imported_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    def report(row_index: int, column: str, reason: str):
+        nonlocal error_count
+        error_count += 1
+        if len(errors) < MAX_REPORTED_ERRORS:
+            errors.append({"row": row_index, "column": column, "reason": reason})
+
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        sheet = workbook.active
+        for row_index, row in enumerate(sheet.iter_rows(min_row=2, values_only=True), start=2):
+            rows_read += 1
+            if len(row) < 3:
+                if any(cell is not None for cell in row):
+                    report(row_index, "C", "colonnes manquantes (date_heure, numero, victoire)")
+                else:
+                    empty_rows += 1
+                continue
+            if not row[0] or not row[1] or not row[2]:
+                empty_rows += 1
+                continue
+
+            date_heure = row[0]
+            numero = row[1]
+            victoire = row[2]
+
+            if isinstance(date_heure, datetime):
+                date_str = date_heure.strftime("%Y-%m-%d %H:%M:%S")
+            else:
+                date_str = str(date_heure)
+
+            try:
+                if isinstance(numero, float) and not numero.is_integer():
+                    raise ValueError
+                numero_int = int(numero)
+            except (TypeError, ValueError):
+                report(row_index, "B", f"numero non entier: {numero!r}")
+                continue
+            if numero_int <= 0:
+                report(row_index, "B", f"numero invalide: {numero_int}")
+                continue
+
+            victoire_type = str(victoire).strip()
+            if not victoire_type:
+                report(row_index, "C", "victoire vide")
+                continue
+
+            prediction_key = f"{numero_int}"
+
+            # Vérifier si déjà lancé (seulement en mode fusion)
+            if prediction_key in launched_keys:
+                skipped_count += 1
+                continue
+
+            # FILTRE CONSÉCUTIFS: Vérifier si numéro actuel = précédent + 1
+            # Ex: Si on a 56, on ignore 57, mais on garde 59
+            if last_numero is not None and numero_int == last_numero + 1:
+                consecutive_skipped += 1
+                # NE PAS mémoriser ce numéro comme last_numero
+                # On continue avec l'ancien last_numero pour détecter le prochain consécutif
+                continue
+
+            predictions[prediction_key] = {
+                "numero": numero_int,
+                "date_heure": date_str,
+                "victoire": victoire_type,
+                "launched": False,
+                "message_id": None,
+                "chat_id": None,
+                "imported_at": imported_at
+            }
+            imported_count += 1
+            last_numero = numero_int  # Mémoriser UNIQUEMENT les numéros NON consécutifs
+    finally:
+        workbook.close()
+
+    duration = time.perf_counter() - start
+    rows_per_sec = rows_read / duration if duration > 0 else 0.0
+    if consecutive_skipped:
+        print(f"⚠️ {consecutive_skipped} numéros consécutifs IGNORÉS À L'IMPORT")
+    if error_count:
+        print(f"⚠️ {error_count} lignes invalides ignorées dans {os.path.basename(file_path)}")
+    print(f"📊 Lecture Excel: {rows_read} lignes en {duration:.2f}s ({rows_per_sec:.0f} lignes/s)")
+
+    return {
+        "predictions": predictions,
+        "imported": imported_count,
+        "skipped": skipped_count,
+        "consecutive_skipped": consecutive_skipped,
+        "empty_rows": empty_rows,
+        "rows_read": rows_read,
+        "error_count": error_count,
+        "errors": errors,
+        "duration": duration,
+        "rows_per_sec": rows_per_sec,
+        # Plan compilé (mode remplacement): seule copie renvoyée par le processus de lecture
+        "compiled": compile_plan(predictions) if serialize else None
+    }
+
+
+def load_excel_plan(file_path: str, launched_keys: Iterable[str] = (), serialize: bool = False,
+                    cache_dir: Optional[str] = None, current_digest: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Plan d'un classeur, via le cache compilé si son contenu (SHA-256) est déjà connu.
+
+    Si le classeur est identique au plan actif (current_digest), retourne
+    {"unchanged": True}: le réimport est sans effet. Le cache n'est utilisé qu'en
+    mode remplacement (serialize=True), seul cas où le plan est exactement celui du fichier.
+    """
+    digest = file_sha256(file_path)
+    if serialize and digest == current_digest:
+        return {"unchanged": True, "sha256": digest}
+    cached = PlanCache(cache_dir).load(digest) if cache_dir and serialize else None
+    if cached is not None:
+        print(f"⚡ Plan compilé trouvé pour {os.path.basename(file_path)}: {len(cached)} prédictions sans relecture")
+        plan = {
+            "predictions": cached,
+            "imported": len(cached),
+            "skipped": 0,
+            "consecutive_skipped": 0,
+            "empty_rows": 0,
+            "rows_read": 0,
+            "error_count": 0,
+            "errors": [],
+            "duration": 0.0,
+            "rows_per_sec": 0.0,
+            "compiled": None,
+            "from_cache": True
+        }
+    else:
+        plan = build_excel_plan(file_path, launched_keys, serialize)
+    plan["sha256"] = digest
+    return plan
+
+
+def _plan_worker_main():
+    """
+    Point d'entrée du processus de lecture (python excel_importer.py): arguments de
+    load_excel_plan sur stdin, plan sur stdout (pickle). Un interpréteur neuf n'hérite
+    d'aucun verrou ni thread du bot (contrairement à fork) et n'importe pas main.py.
+    Le plan ne traverse qu'en un exemplaire: compilé si possible, sinon le dictionnaire.
+    Un classeur illisible renvoie {"error": ...} avec le code de sortie 1.
+    """
+    out = sys.stdout.buffer
+    sys.stdout = sys.stderr  # Les print() du worker ne doivent pas se mêler au résultat
+    file_path, plan_args = pickle.load(sys.stdin.buffer)
+    try:
+        plan = load_excel_plan(file_path, *plan_args)
+    except Exception as e:
+        pickle.dump({"error": str(e)}, out, protocol=pickle.HIGHEST_PROTOCOL)
+        out.flush()
+        sys.exit(1)
+    if plan.get("predictions") is not None and plan_args[1]:
+        if plan.get("compiled") is None:
+            plan["compiled"] = compile_plan(plan["predictions"])
+        plan["predictions"] = None
+    pickle.dump(plan, out, protocol=pickle.HIGHEST_PROTOCOL)
+    out.flush()
+
 
 class ExcelPredictionManager:
-    def __init__(self):
-        self.predictions_file = "excel_predictions.yaml"
+    def __init__(self, persistence: Optional[WriteBehind] = None, journal: Optional[PredictionJournal] = None,
+                 plan_cache: Optional[PlanCache] = None, predictions_file: str = "excel_predictions.yaml",
+                 persistence_key: str = "excel_predictions"):
+        self.predictions_file = predictions_file
         self.predictions = {}  # {key: {numero, date_heure, victoire, launched, message_id, channel_id}}
         self.last_launched_numero = None  # Dernier numéro lancé pour éviter les consécutifs
+        # Champs modifiés depuis l'import ({key: {champ: valeur}}), journalisés à chaque transition
+        self.journal = journal
+        self.overlay = {}
+        # Index de déclenchement: numéros non lancés triés et {numero: clé}
+        self._unlaunched = []
+        self._key_by_numero = {}
+        # Import hors boucle: processus de lecture en cours (voir _read_plan_in_worker)
+        self._worker = None
+        self._plan_generation = 0
+        self._mutations_since_plan = 0
+        # Plans compilés adressés par SHA-256 du classeur (démarrage sans relire le YAML)
+        self.plan_cache = plan_cache
+        # Écriture différée: save_predictions() marque l'état sale, write_predictions() écrit
+        self.persistence = persistence
+        self.persistence_key = persistence_key
+        if persistence is not None:
+            persistence.register(persistence_key, self.write_predictions)
         self.load_predictions()
 
     def backup_predictions(self) -> bool:
         """Create a backup of current predictions before replacing"""
         try:
             if os.path.exists(self.predictions_file):
-                backup_name = f"excel_predictions_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.yaml"
+                stem = os.path.splitext(self.predictions_file)[0]
+                backup_name = f"{stem}_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.yaml"
                 import shutil
                 shutil.copy2(self.predictions_file, backup_name)
                 print(f"✅ Backup créé: {backup_name}")
@@ -26,104 +258,236 @@ class ExcelPredictionManager:
             print(f"❌ Erreur création backup: {e}")
             return False
 
-    def import_excel(self, file_path: str, replace_mode: bool = True) -> Dict[str, Any]:
+    def read_excel_plan(self, file_path: str, replace_mode: bool = True) -> Dict[str, Any]:
+        """Construit le plan d'un fichier Excel sans modifier self.predictions (voir apply_excel_plan)"""
+        return load_excel_plan(file_path, *self._plan_args(replace_mode))
+
+    def _plan_args(self, replace_mode: bool) -> tuple:
+        """Arguments de load_excel_plan (transmissibles à un processus de travail)"""
+        if self.plan_cache is None:
+            return self._launched_keys(replace_mode), replace_mode, None, None
+        return (self._launched_keys(replace_mode), replace_mode,
+                self.plan_cache.cache_dir, self.plan_cache.current_digest())
+
+    def _launched_keys(self, replace_mode: bool) -> List[str]:
+        """Clés déjà lancées à conserver (mode fusion uniquement)"""
+        if replace_mode:
+            return []
+        return [key for key, pred in self.predictions.items() if pred.get("launched")]
+
+    def apply_excel_plan(self, plan: Dict[str, Any], replace_mode: bool = True, backup: bool = True,
+                         write: bool = True) -> Dict[str, Any]:
         """
-        Importer un fichier Excel avec option de remplacement automatique
+        Installe un plan lu par read_excel_plan et retourne le résultat de l'import.
 
-        Args:
-            file_path: Chemin vers le fichier Excel
-            replace_mode: Si True, remplace toutes les prédictions (avec backup automatique)
-                         Si False, fusionne avec les prédictions existantes
+        Le remplacement est un simple échange de référence: aucun message n'observe un
+        plan à moitié installé. import_excel_async() fait la sauvegarde et l'écriture du
+        fichier hors de la boucle (backup=False, write=False).
         """
-        try:
-            workbook = load_workbook(file_path, data_only=True)
-            sheet = workbook.active
+        predictions = plan["predictions"]
+        imported_count = plan["imported"]
+
+        # MODE REMPLACEMENT : Créer backup puis remplacer
+        old_count = 0
+        if replace_mode:
+            old_count = len(self.predictions)
+            if old_count > 0:
+                if backup:
+                    self.backup_predictions()
+                print(f"🔄 REMPLACEMENT: {old_count} anciennes prédictions → {imported_count} nouvelles prédictions")
+            self.predictions = predictions  # REMPLACER complètement
+            self.overlay = {}
+            if self.journal is not None:
+                self.journal.append(JOURNAL_NAMESPACE, OP_RESET)
+        else:
+            # MODE FUSION : Ajouter aux prédictions existantes
+            self.predictions.update(predictions)
+            print(f"➕ FUSION: {imported_count} prédictions ajoutées")
 
-            imported_count = 0
-            skipped_count = 0
-            consecutive_skipped = 0
-            predictions = {}
-            last_numero = None
+        self.rebuild_trigger_index()
 
-            for row in sheet.iter_rows(min_row=2, values_only=True):
-                if not row[0] or not row[1] or not row[2]:
-                    continue
+        self._plan_generation += 1
+        self._mutations_since_plan = 0
 
-                date_heure = row[0]
-                numero = row[1]
-                victoire = row[2]
+        # Écriture immédiate: le nouveau plan doit être sur disque avant toute transition journalisée
+        if write:
+            self._write_plan(plan, replace_mode)
 
-                if isinstance(date_heure, datetime):
-                    date_str = date_heure.strftime("%Y-%m-%d %H:%M:%S")
-                else:
-                    date_str = str(date_heure)
+        return {
+            "success": True,
+            "imported": imported_count,
+            "skipped": plan["skipped"],
+            "consecutive_skipped": plan["consecutive_skipped"],
+            "total": len(self.predictions),
+            "mode": "remplacement" if replace_mode else "fusion",
+            "old_count": old_count if replace_mode else None,
+            "rows_read": plan["rows_read"],
+            "error_count": plan["error_count"],
+            "errors": plan["errors"],
+            "duration": plan["duration"],
+            "rows_per_sec": plan["rows_per_sec"],
+            "from_cache": plan.get("from_cache", False)
+        }
 
-                numero_int = int(numero)
-                victoire_type = str(victoire).strip()
-
-                prediction_key = f"{numero_int}"
-
-                # Vérifier si déjà lancé (seulement en mode fusion)
-                if not replace_mode and prediction_key in self.predictions and self.predictions[prediction_key].get("launched"):
-                    skipped_count += 1
-                    continue
-
-                # FILTRE CONSÉCUTIFS: Vérifier si numéro actuel = précédent + 1
-                # Ex: Si on a 56, on ignore 57, mais on garde 59
-                if last_numero is not None and numero_int == last_numero + 1:
-                    consecutive_skipped += 1
-                    print(f"⚠️ Numéro {numero_int} IGNORÉ À L'IMPORT (consécutif à {last_numero})")
-                    # NE PAS mémoriser ce numéro comme last_numero
-                    # On continue avec l'ancien last_numero pour détecter le prochain consécutif
-                    continue
-
-                predictions[prediction_key] = {
-                    "numero": numero_int,
-                    "date_heure": date_str,
-                    "victoire": victoire_type,
-                    "launched": False,
-                    "message_id": None,
-                    "chat_id": None,
-                    "imported_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                }
-                imported_count += 1
-                last_numero = numero_int  # Mémoriser UNIQUEMENT les numéros NON consécutifs
-
-            # MODE REMPLACEMENT : Créer backup puis remplacer
-            old_count = 0
-            if replace_mode:
-                old_count = len(self.predictions)
-                if old_count > 0:
-                    self.backup_predictions()
-                    print(f"🔄 REMPLACEMENT: {old_count} anciennes prédictions → {imported_count} nouvelles prédictions")
-                self.predictions = predictions  # REMPLACER complètement
-            else:
-                # MODE FUSION : Ajouter aux prédictions existantes
-                self.predictions.update(predictions)
-                print(f"➕ FUSION: {imported_count} prédictions ajoutées")
+    def _unchanged_result(self, plan: Dict[str, Any]) -> Dict[str, Any]:
+        print(f"♻️ Classeur identique au plan actif ({plan['sha256'][:12]}): import ignoré")
+        return {
+            "success": True,
+            "unchanged": True,
+            "imported": 0,
+            "skipped": 0,
+            "consecutive_skipped": 0,
+            "total": len(self.predictions)
+        }
 
-            self.save_predictions()
+    def import_excel(self, file_path: str, replace_mode: bool = True) -> Dict[str, Any]:
+        """
+        Importer un fichier Excel avec option de remplacement automatique
 
+        Args:
+            file_path: Chemin vers le fichier Excel
+            replace_mode: Si True, remplace toutes les prédictions (avec backup automatique)
+                         Si False, fusionne avec les prédictions existantes
+        """
+        try:
+            plan = self.read_excel_plan(file_path, replace_mode)
+            if plan.get("unchanged"):
+                return self._unchanged_result(plan)
+            return self.apply_excel_plan(plan, replace_mode)
+        except Exception as e:
             return {
-                "success": True,
-                "imported": imported_count,
-                "skipped": skipped_count,
-                "consecutive_skipped": consecutive_skipped,
-                "total": len(self.predictions),
-                "mode": "remplacement" if replace_mode else "fusion",
-                "old_count": old_count if replace_mode else None
+                "success": False,
+                "error": str(e)
             }
 
+    async def import_excel_async(self, file_path: str, replace_mode: bool = True,
+                                 progress: Optional[Callable[[str], Awaitable[Any]]] = None) -> Dict[str, Any]:
+        """
+        Import Excel hors de la boucle d'événements.
+
+        La lecture du classeur tourne dans un processus de travail (CPU, voir
+        _plan_worker_main), le décodage du plan, la sauvegarde et l'écriture du fichier
+        dans un thread (E/S).
+        Seul l'échange du plan se fait dans la boucle. progress(texte) est appelé à
+        chaque étape; le retard maximal de la boucle pendant l'import est mesuré.
+        """
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        lag_monitor = asyncio.create_task(_measure_loop_lag())
+        try:
+            plan_args = self._plan_args(replace_mode)
+            current_digest = plan_args[3]
+            if replace_mode and current_digest:
+                # Classeur identique au plan actif: aucun message de progression
+                digest = await loop.run_in_executor(None, file_sha256, file_path)
+                if digest == current_digest:
+                    return self._unchanged_result({"sha256": digest})
+            if progress:
+                await progress("📖 Lecture du fichier Excel...")
+            try:
+                plan = await self._read_plan_in_worker(file_path, plan_args)
+            except OSError as e:
+                # Processus de lecture impossible à lancer ou tué (mémoire...): nouvel essai
+                # dans un thread. Une erreur de lecture du classeur remonte telle quelle.
+                print(f"⚠️ Processus de lecture Excel en échec ({e}): lecture dans un thread")
+                plan = await loop.run_in_executor(None, load_excel_plan, file_path, *plan_args)
+            if plan.get("unchanged"):
+                return self._unchanged_result(plan)
+            if plan["predictions"] is None:
+                plan["predictions"] = await loop.run_in_executor(None, decode_plan, plan["compiled"])
+
+            if progress:
+                await progress(f"⚙️ {plan['imported']} prédictions lues ({plan['rows_per_sec']:.0f} lignes/s), installation...")
+            if replace_mode and self.predictions:
+                await loop.run_in_executor(None, self.backup_predictions)
+
+            result = self.apply_excel_plan(plan, replace_mode, backup=False, write=False)
+            generation = self._plan_generation
+            await loop.run_in_executor(None, self._write_plan, plan, replace_mode)
+            if generation == self._plan_generation and self._mutations_since_plan:
+                # Transitions arrivées pendant l'écriture: le plan écrit est déjà dépassé
+                self.save_predictions()
         except Exception as e:
-            return {
+            result = {
                 "success": False,
                 "error": str(e)
             }
+        finally:
+            lag_monitor.cancel()
+            try:
+                result_lag = await lag_monitor
+            except asyncio.CancelledError:
+                result_lag = None
+        if result_lag is not None:
+            result["loop_lag_max_ms"] = round(result_lag * 1000, 2)
+        if not result.get("unchanged"):
+            EXCEL_IMPORT_STAGE.observe(time.perf_counter() - started)
+        return result
+
+    async def _read_plan_in_worker(self, file_path: str, plan_args: tuple) -> Dict[str, Any]:
+        """Exécute load_excel_plan dans un interpréteur séparé (voir _plan_worker_main)"""
+        self._worker = await asyncio.create_subprocess_exec(
+            sys.executable, os.path.abspath(__file__),
+            stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE
+        )
+        try:
+            output, _ = await self._worker.communicate(pickle.dumps((file_path, plan_args)))
+        finally:
+            if self._worker.returncode is None:
+                self._worker.kill()
+            returncode, self._worker = self._worker.returncode, None
+        if returncode < 0:
+            raise ChildProcessError(f"processus de lecture tué (signal {-returncode})")
+        if returncode != 0:
+            try:
+                error = pickle.loads(output)["error"]
+            except Exception:
+                error = f"processus de lecture en échec (code de sortie {returncode})"
+            raise ValueError(error)
+        return pickle.loads(output)
+
+    def shutdown_executor(self):
+        """Arrête une lecture de classeur en cours (arrêt du bot ou paire retirée)"""
+        if self._worker is not None and self._worker.returncode is None:
+            self._worker.kill()
+
+    def _write_plan(self, plan: Dict[str, Any], replace_mode: bool):
+        """Écrit le plan installé (YAML produit depuis le plan compilé si disponible)"""
+        compiled = plan.get("compiled") if replace_mode else None
+        if compiled is None:
+            self.write_predictions()
+        else:
+            try:
+                # Copie indépendante du plan installé: sérialisée hors de la boucle sans
+                # risque de modification concurrente par les transitions
+                atomic_write_yaml(self.predictions_file, decode_plan(compiled))
+                print(f"✅ Prédictions Excel sauvegardées: {len(self.predictions)} entrées")
+            except Exception as e:
+                print(f"❌ Erreur sauvegarde prédictions: {e}")
+        if self.plan_cache is None:
+            return
+        try:
+            if replace_mode:
+                if compiled is not None and not plan.get("from_cache"):
+                    self.plan_cache.store(plan["sha256"], compiled)
+                self.plan_cache.set_current(plan["sha256"])
+            else:
+                # Plan fusionné: ne correspond plus à un classeur unique
+                self.plan_cache.set_current(None)
+        except Exception as e:
+            print(f"❌ Erreur écriture du plan compilé: {e}")
 
     def save_predictions(self):
+        """Demande une sauvegarde (différée si une persistance WriteBehind est attachée)"""
+        if self.persistence is not None:
+            self.persistence.mark_dirty(self.persistence_key)
+        else:
+            self.write_predictions()
+
+    def write_predictions(self):
+        """Écrit réellement le fichier YAML (fichier temporaire + renommage atomique)"""
         try:
-            with open(self.predictions_file, "w", encoding="utf-8") as f:
-                yaml.dump(self.predictions, f, allow_unicode=True, default_flow_style=False)
+            atomic_write_yaml(self.predictions_file, self.predictions)
             print(f"✅ Prédictions Excel sauvegardées: {len(self.predictions)} entrées")
         except Exception as e:
             print(f"❌ Erreur sauvegarde prédictions: {e}")
@@ -133,6 +497,9 @@ class ExcelPredictionManager:
         self.save_predictions()
 
     def load_predictions(self):
+        if self._load_compiled_plan():
+            self.rebuild_trigger_index()
+            return
         try:
             if os.path.exists(self.predictions_file):
                 with open(self.predictions_file, "r", encoding="utf-8") as f:
@@ -144,6 +511,46 @@ class ExcelPredictionManager:
         except Exception as e:
             print(f"❌ Erreur chargement prédictions: {e}")
             self.predictions = {}
+        self.rebuild_trigger_index()
+
+    def _load_compiled_plan(self) -> bool:
+        """
+        Charge le plan actif depuis le cache compilé. Les champs d'exécution (lancement,
+        vérification) n'y figurent pas: ils viennent du journal (apply_overlay), d'où
+        l'exigence d'un journal existant.
+        """
+        if self.plan_cache is None or self.journal is None or not self.journal.exists():
+            return False
+        digest = self.plan_cache.current_digest()
+        if not digest:
+            return False
+        predictions = self.plan_cache.load(digest)
+        if predictions is None:
+            return False
+        self.predictions = predictions
+        print(f"⚡ Prédictions chargées depuis le plan compilé {digest[:12]}: {len(predictions)} entrées")
+        return True
+
+    def rebuild_trigger_index(self):
+        """
+        Reconstruit l'index de déclenchement: numéros NON lancés triés + {numero: clé}.
+        Appelé après chargement, import, restauration du journal ou effacement.
+        """
+        self._key_by_numero = {pred["numero"]: key for key, pred in self.predictions.items() if not pred.get("launched")}
+        self._unlaunched = sorted(self._key_by_numero)
+
+    def _unindex(self, key: str):
+        """Retire une entrée lancée (ou ignorée) de l'index de déclenchement"""
+        pred = self.predictions.get(key)
+        if pred is None:
+            return
+        numero = pred["numero"]
+        if self._key_by_numero.get(numero) != key:
+            return
+        del self._key_by_numero[numero]
+        index = bisect_left(self._unlaunched, numero)
+        if index < len(self._unlaunched) and self._unlaunched[index] == numero:
+            del self._unlaunched[index]
 
     def find_close_prediction(self, current_number: int, tolerance: int = 4):
         """
@@ -151,38 +558,32 @@ class ExcelPredictionManager:
         Exemple: Excel #881, Canal source #879 → Lance #881 (diff = +2)
         Tolérance: 0 à 4 parties d'écart
         IMPORTANT: Ignore les numéros consécutifs (ex: 56→57 ignoré, on passe directement à 59)
+
+        Recherche par bisection dans l'index des numéros non lancés: le coût ne dépend
+        pas de la taille du plan importé.
         """
         try:
-            closest_pred = None
-            min_diff = float('inf')
-
-            for key, pred in self.predictions.items():
-                if pred["launched"]:
-                    continue
-
-                pred_numero = pred["numero"]
-                # Calculer la différence: pred_numero - current_number
-                # Si canal=879 et pred=881, diff=+2 (canal est 2 parties AVANT)
+            window_end = current_number + tolerance
+
+            # FILTRE PRINCIPAL: le numéro consécutif au dernier prédit est ignoré définitivement
+            if self.last_launched_numero:
+                consecutive = self.last_launched_numero + 1
+                key = self._key_by_numero.get(consecutive)
+                if key is not None and current_number <= consecutive <= window_end:
+                    print(f"⚠️ Numéro {consecutive} IGNORÉ AU LANCEMENT (consécutif à {self.last_launched_numero})")
+                    # Marquer comme lancé pour éviter de le relancer plus tard (une seule sauvegarde)
+                    self.update_predictions({key: {"launched": True, "skipped_consecutive": True}})
+
+            # Garder la prédiction la plus proche (priorité au plus petit écart)
+            index = bisect_left(self._unlaunched, current_number)
+            if index < len(self._unlaunched) and self._unlaunched[index] <= window_end:
+                pred_numero = self._unlaunched[index]
+                key = self._key_by_numero[pred_numero]
                 diff = pred_numero - current_number
+                print(f"✅ Prédiction trouvée: #{pred_numero} (canal #{current_number}, écart +{diff})")
+                return {"key": key, "prediction": self.predictions[key]}
 
-                # Vérifier si le canal source est entre 0 et 4 parties AVANT le numéro cible
-                if 0 <= diff <= tolerance:
-                    # FILTRE PRINCIPAL: Vérifier si ce n'est pas un numéro consécutif du dernier prédit
-                    if self.last_launched_numero and pred_numero == self.last_launched_numero + 1:
-                        print(f"⚠️ Numéro {pred_numero} IGNORÉ AU LANCEMENT (consécutif à {self.last_launched_numero})")
-                        # Marquer comme lancé pour éviter de le relancer plus tard
-                        pred["launched"] = True
-                        pred["skipped_consecutive"] = True
-                        self.save_predictions()
-                        continue
-
-                    # Garder la prédiction la plus proche (priorité au plus petit écart)
-                    if diff < min_diff:
-                        min_diff = diff
-                        closest_pred = {"key": key, "prediction": pred}
-                        print(f"✅ Prédiction trouvée: #{pred_numero} (canal #{current_number}, écart +{diff})")
-
-            return closest_pred
+            return None
         except Exception as e:
             print(f"Erreur find_close_prediction: {e}")
             return None
@@ -190,13 +591,46 @@ class ExcelPredictionManager:
     def mark_as_launched(self, key: str, message_id: int, channel_id: int):
         """Marque une prédiction comme lancée"""
         if key in self.predictions:
-            self.predictions[key]["launched"] = True
-            self.predictions[key]["message_id"] = message_id
-            self.predictions[key]["channel_id"] = channel_id
-            self.predictions[key]["current_offset"] = 0  # Commence avec offset 0
+            # Commence avec offset 0
+            self.update_prediction(key, launched=True, message_id=message_id, channel_id=channel_id, current_offset=0)
             self.last_launched_numero = self.predictions[key]["numero"]
+
+    def update_prediction(self, key: str, **fields):
+        """Met à jour des champs d'une prédiction, journalise la transition et planifie la sauvegarde"""
+        self.update_predictions({key: fields})
+
+    def update_predictions(self, updates: Dict[str, Dict[str, Any]]):
+        """Applique plusieurs mises à jour {clé: champs} avec une seule sauvegarde"""
+        changed = False
+        for key, fields in updates.items():
+            if key not in self.predictions:
+                continue
+            if fields.get("launched"):
+                self._unindex(key)
+            self.predictions[key].update(fields)
+            self.overlay.setdefault(key, {}).update(fields)
+            self._mutations_since_plan += 1
+            if self.journal is not None:
+                self.journal.append(JOURNAL_NAMESPACE, OP_UPDATE, key, fields)
+            changed = True
+        if changed:
             self.save_predictions()
 
+    def apply_overlay(self, overlay: Dict[str, Dict[str, Any]]):
+        """Réapplique les transitions récupérées du journal sur le plan chargé"""
+        applied = 0
+        for key, fields in (overlay or {}).items():
+            if key in self.predictions:
+                self.predictions[key].update(fields)
+                applied += 1
+        self.overlay = {key: dict(fields) for key, fields in (overlay or {}).items() if key in self.predictions}
+        self.rebuild_trigger_index()
+        launched = [self.predictions[key]["numero"] for key, fields in self.overlay.items() if fields.get("message_id")]
+        if launched:
+            self.last_launched_numero = max(launched)
+        if applied:
+            print(f"✅ {applied} prédictions Excel restaurées depuis le journal")
+
     def extract_points_and_winner(self, message_text: str):
         """
         Extrait le point du PREMIER GROUPE uniquement (celui qui détermine la victoire).
@@ -207,10 +641,8 @@ class ExcelPredictionManager:
         Retourne: (premier_groupe_point, None) pour compatibilité avec le code existant
         """
         try:
-            # Pattern pour extraire le point du PREMIER groupe (avant la première parenthèse)
-            # Peut avoir ✅ ou 🔰 avant le nombre
-            pattern = r'[✅🔰]?(\d+)\('
-            match = re.search(pattern, message_text)
+            # Motif précompilé: point du PREMIER groupe (avant la première parenthèse)
+            match = GROUP_RE.search(message_text)
 
             if match:
                 premier_groupe_point = int(match.group(1))
@@ -225,13 +657,13 @@ class ExcelPredictionManager:
             print(f"❌ Erreur extraction point premier groupe: {e}")
             return None, None
 
-    def verify_excel_prediction(self, game_number: int, message_text: str, predicted_numero: int, expected_winner: str, current_offset: int):
+    def verify_excel_prediction(self, game_number: int, record: GameRecord, predicted_numero: int, expected_winner: str, current_offset: int):
         """
         Vérifie une prédiction Excel avec la nouvelle logique basée sur les seuils de points du joueur (6.5 ou 4.5).
 
         Args:
             game_number: Numéro du jeu actuel
-            message_text: Texte du message de résultat
+            record: Message de résultat déjà analysé (message_parser.parse_game_message)
             predicted_numero: Numéro prédit
             expected_winner: Gagnant attendu (joueur/banquier)
             current_offset: Offset interne de vérification (0, 1, 2)
@@ -270,30 +702,24 @@ class ExcelPredictionManager:
             # C'est notre numéro cible, vérifier le résultat
             print(f"🔍 Vérification Excel #{predicted_numero} sur offset interne {current_offset} (numéro {game_number})")
 
-            # ATTENTE DES MESSAGES EN ÉDITION: Ne pas ignorer, mais ATTENDRE la finalisation
-            # Le bot recevra un événement MessageEdited quand le message passera de ⏰/🕐 à ✅/🔰
-            if "⏰" in message_text or "🕐" in message_text:
-                print(f"⏰ Message #{game_number} en cours d'édition - ATTENTE de finalisation (✅ ou 🔰)")
-                return None, True  # None = pas de décision, True = continuer à surveiller ce message
-
-            # Vérifier si le message est finalisé (🔰 ou ✅ uniquement)
-            if not any(tag in message_text for tag in ["✅", "🔰"]):
-                print(f"⚠️ Message sans tag de finalisation (ni ✅ ni 🔰) - ignoré")
+            # Seuls les messages finalisés (✅ ou 🔰) arrivent ici: main.py ne vérifie qu'à la
+            # transition en cours → finalisé (GameStateTracker). Garde défensive uniquement.
+            if not record.is_finalized:
                 return None, True
 
-            # Extraire les points
-            joueur_point, banquier_point = self.extract_points_and_winner(message_text)
+            # Point du premier groupe, déjà extrait lors de l'analyse du message
+            joueur_point = record.first_total
 
             # --- NOUVELLE LOGIQUE DE VÉRIFICATION BASÉE SUR LES SEUILS DE POINTS DU JOUEUR (premier groupe) ---
 
             if joueur_point is None: # banquier_point n'est plus utilisé
                 # Si c'est une incohérence critique (✅ mal placé), marquer comme échec
-                if '✅' in message_text and not '🔰' in message_text:
+                if record.final_tag == '✅':
                     print(f"❌ CRITIQUE: Message avec ✅ incohérent - échec de la prédiction #{predicted_numero}")
                     return '❌', False # MODIFIÉ : ⭕✍🏻 -> ❌
                 else:
                     # Sinon, continuer à attendre (peut-être un message incomplet)
-                    print(f"⚠️ Impossible d'extraire les points, on continue")
+                    print("⚠️ Impossible d'extraire les points, on continue")
                     return None, True
 
             # Déterminer le gagnant attendu à partir de la chaîne de caractères
@@ -385,8 +811,8 @@ class ExcelPredictionManager:
 
     def get_stats(self) -> Dict[str, int]:
         total = len(self.predictions)
-        launched = sum(1 for p in self.predictions.values() if p["launched"])
-        pending = total - launched
+        pending = len(self._unlaunched)
+        launched = total - pending
 
         return {
             "total": total,
@@ -396,5 +822,15 @@ class ExcelPredictionManager:
 
     def clear_predictions(self):
         self.predictions = {}
+        self.overlay = {}
+        if self.plan_cache is not None:
+            self.plan_cache.set_current(None)
+        self.rebuild_trigger_index()
+        if self.journal is not None:
+            self.journal.append(JOURNAL_NAMESPACE, OP_RESET)
         self.save_predictions()
-        print("🗑️ Toutes les prédictions Excel ont été effacées")
\ No newline at end of file
+        print("🗑️ Toutes les prédictions Excel ont été effacées")
+
+
+if __name__ == "__main__":
+    _plan_worker_main()
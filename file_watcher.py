@@ -0,0 +1,261 @@
+import asyncio
+import ctypes
+import ctypes.util
+import json
+import os
+import struct
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from persistence import atomic_write_json
+
+# Constantes inotify (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len
+
+
+class _Inotify:
+    """Accès minimal à inotify via ctypes (Linux uniquement)"""
+
+    def __init__(self, directory: str):
+        libc_name = ctypes.util.find_library("c")
+        if not libc_name:
+            raise OSError("libc introuvable")
+        libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError("inotify non disponible")
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1")
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"inotify_add_watch {directory}")
+
+    def read_events(self):
+        """Retourne [(masque, nom)] des événements disponibles (lecture non bloquante)"""
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            _, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0").decode("utf-8", "replace")
+            offset += length
+            events.append((mask, name))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+class ExcelWatcher:
+    """
+    Surveillance d'un répertoire pour les nouveaux fichiers Excel.
+
+    Sous Linux, inotify réveille la boucle dès qu'un fichier est créé, écrit, fermé ou
+    renommé dans le répertoire; sinon, un parcours os.scandir() compare (taille, mtime)
+    toutes les poll_interval secondes. Un fichier n'est importé qu'une fois stable
+    (taille et mtime inchangés pendant settle_ms) pour ne jamais lire un classeur en
+    cours d'écriture.
+
+    L'index des fichiers traités ({nom: signature}) est borné à max_index entrées
+    (les plus anciennes sont oubliées) et les fichiers supprimés en sont retirés.
+    """
+
+    def __init__(self, directory: str, on_file: Callable[[str], Awaitable[None]],
+                 extensions: Tuple[str, ...] = (".xlsx", ".xls"), settle_ms: int = 250,
+                 index_file: str = "processed_excel_files.json", max_index: int = 256,
+                 poll_interval: float = 1.0):
+        self.directory = directory
+        self.on_file = on_file
+        self.extensions = extensions
+        self.settle = settle_ms / 1000
+        self.index_file = index_file
+        self.max_index = max_index
+        self.poll_interval = poll_interval
+        self.processed = OrderedDict()  # {nom: "taille:mtime_ns"}
+        self._legacy_keys = set()
+        self._pending: Dict[str, asyncio.Task] = {}
+        self._importing = set()
+        self._import_lock = asyncio.Lock()
+        self._inotify: Optional[_Inotify] = None
+        self.backend = None
+        self.events = 0
+        self.imports = 0
+
+    def load_index(self):
+        try:
+            if os.path.exists(self.index_file):
+                with open(self.index_file, "r") as f:
+                    files = json.load(f).get("files", {})
+                if isinstance(files, dict):
+                    self.processed = OrderedDict(files)
+                else:
+                    # Ancien format: liste de "nom_mtime", convertie au premier parcours
+                    self._legacy_keys = set(files)
+        except Exception as e:
+            print(f"⚠️ Erreur chargement fichiers traités: {e}")
+
+    def save_index(self):
+        try:
+            atomic_write_json(self.index_file, {"files": self.processed}, indent=None)
+        except Exception as e:
+            print(f"⚠️ Erreur sauvegarde fichiers traités: {e}")
+
+    def _is_excel(self, name: str) -> bool:
+        return name.lower().endswith(self.extensions) and not name.startswith(("~$", "."))
+
+    @staticmethod
+    def _signature(stat: os.stat_result) -> str:
+        return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+    def _remember(self, name: str, signature: str):
+        self.processed[name] = signature
+        self.processed.move_to_end(name)
+        while len(self.processed) > self.max_index:
+            self.processed.popitem(last=False)
+
+    def _forget(self, name: str):
+        if self.processed.pop(name, None) is not None:
+            self.save_index()
+
+    def scan(self):
+        """Parcours unique du répertoire: planifie les fichiers nouveaux ou modifiés"""
+        try:
+            entries = list(os.scandir(self.directory))
+        except OSError as e:
+            print(f"⚠️ Erreur parcours {self.directory}: {e}")
+            return
+        converted = False
+        present = set()
+        for entry in entries:
+            if not entry.is_file() or not self._is_excel(entry.name):
+                continue
+            present.add(entry.name)
+            stat = entry.stat()
+            signature = self._signature(stat)
+            if self._legacy_keys and f"{entry.name}_{stat.st_mtime}" in self._legacy_keys:
+                self._remember(entry.name, signature)
+                converted = True
+                continue
+            if self.processed.get(entry.name) != signature and not self._is_pending(entry.name):
+                self.schedule(entry.name)
+        # Fichiers supprimés (sans inotify pour le signaler): retirés de l'index
+        removed = [name for name in self.processed if name not in present]
+        for name in removed:
+            del self.processed[name]
+        if converted:
+            self._legacy_keys = set()
+        if converted or removed:
+            self.save_index()
+
+    def _is_pending(self, name: str) -> bool:
+        task = self._pending.get(name)
+        return task is not None and not task.done()
+
+    def schedule(self, name: str):
+        """(Re)programme l'import d'un fichier: chaque nouvel événement repousse l'attente"""
+        if name in self._importing:
+            # Import en cours: le fichier est re-vérifié à la fin de l'import
+            return
+        if self._is_pending(name):
+            self._pending[name].cancel()
+        self._pending[name] = asyncio.create_task(self._settle_and_import(name))
+
+    async def _settle_and_import(self, name: str):
+        path = os.path.join(self.directory, name)
+        previous = None
+        # Attendre que taille et mtime ne bougent plus (fichier entièrement écrit)
+        while True:
+            await asyncio.sleep(self.settle)
+            try:
+                current = self._signature(os.stat(path))
+            except FileNotFoundError:
+                return
+            if current == previous and not current.startswith("0:"):
+                break
+            previous = current
+        if self.processed.get(name) == current:
+            return
+        self._importing.add(name)
+        try:
+            async with self._import_lock:
+                print(f"📥 Nouveau fichier Excel détecté: {name}")
+                try:
+                    await self.on_file(path)
+                finally:
+                    self.imports += 1
+                    self._remember(name, current)
+                    self.save_index()
+        finally:
+            self._importing.discard(name)
+        # Fichier réécrit pendant l'import: nouvel import
+        try:
+            if self._signature(os.stat(path)) != current:
+                self.schedule(name)
+        except FileNotFoundError:
+            pass
+
+    def _on_inotify(self):
+        for mask, name in self._inotify.read_events():
+            if not name or not self._is_excel(name):
+                continue
+            self.events += 1
+            if mask & (IN_DELETE | IN_MOVED_FROM):
+                self._forget(name)
+            else:
+                self.schedule(name)
+
+    async def run(self):
+        """Boucle de surveillance (inotify si disponible, sinon parcours périodique)"""
+        self.load_index()
+        loop = asyncio.get_running_loop()
+        try:
+            self._inotify = _Inotify(self.directory)
+            loop.add_reader(self._inotify.fd, self._on_inotify)
+            self.backend = "inotify"
+        except (OSError, AttributeError, NotImplementedError) as e:
+            self._inotify = None
+            self.backend = "scandir"
+            print(f"ℹ️ inotify indisponible ({e}), parcours toutes les {self.poll_interval}s")
+        print(f"👀 Surveillance des fichiers Excel activée ({self.backend}, {os.path.abspath(self.directory)})")
+
+        # Fichiers déjà présents au démarrage
+        self.scan()
+        try:
+            if self._inotify is not None:
+                # Aucun parcours: les événements arrivent par add_reader
+                await asyncio.Event().wait()
+            else:
+                while True:
+                    await asyncio.sleep(self.poll_interval)
+                    self.scan()
+        finally:
+            if self._inotify is not None:
+                loop.remove_reader(self._inotify.fd)
+                self._inotify.close()
+                self._inotify = None
+            for task in self._pending.values():
+                task.cancel()
+
+    def get_stats(self) -> Dict[str, object]:
+        return {
+            "backend": self.backend,
+            "events": self.events,
+            "imports": self.imports,
+            "indexed": len(self.processed),
+            "pending": sum(1 for task in self._pending.values() if not task.done())
+        }
@@ -0,0 +1,93 @@
+from collections import OrderedDict
+from typing import Dict
+
+from message_parser import GameRecord
+
+# États d'une partie du canal source
+SEEN = "seen"                # Message reçu, sans marqueur
+IN_PROGRESS = "in_progress"  # ⏰/🕐: le message est encore en cours d'édition
+FINALIZED = "finalized"      # ✅/🔰 reçu: vérification et lancement en cours
+CONSUMED = "consumed"        # Traitement terminé, les éditions suivantes sont ignorées
+
+
+class GameStateTracker:
+    """
+    Suit l'état de finalisation de chaque partie, indexé par numéro de jeu.
+
+    observe() ne retourne True qu'une seule fois par partie, à la transition vers
+    FINALIZED: c'est le seul moment où la vérification et le lancement doivent tourner.
+    """
+
+    def __init__(self, max_games: int = 256, new_cycle_gap: int = 100):
+        self.max_games = max_games
+        self.new_cycle_gap = new_cycle_gap  # Recul au-delà duquel on considère un nouveau cycle de numéros
+        self.states = OrderedDict()  # {numero_jeu: état}
+        self.highest_seen = None
+        self.highest_finalized = None
+        self.finalized_count = 0
+        self.ignored_after_final = 0
+        self.late_finalizations = 0
+        self.out_of_order = 0
+        self.cycle_resets = 0
+
+    def observe(self, record: GameRecord) -> bool:
+        """Enregistre un message; retourne True uniquement à la transition vers FINALIZED"""
+        game_number = record.game_number
+        state = self.states.get(game_number)
+
+        if state == FINALIZED or state == CONSUMED:
+            self.ignored_after_final += 1
+            return False
+
+        if state is None:
+            if self.highest_seen is not None and game_number < self.highest_seen - self.new_cycle_gap:
+                # Les numéros sont repartis de zéro (nouvelle journée)
+                print(f"🔄 Nouveau cycle de jeux détecté (#{self.highest_seen} → #{game_number})")
+                self.reset()
+                self.cycle_resets += 1
+            elif self.highest_seen is not None and game_number < self.highest_seen:
+                self.out_of_order += 1
+            if self.highest_seen is None or game_number > self.highest_seen:
+                self.highest_seen = game_number
+            self._prune()
+
+        if not record.is_finalized:
+            self.states[game_number] = IN_PROGRESS if record.editing else SEEN
+            return False
+
+        if self.highest_finalized is not None and game_number < self.highest_finalized:
+            self.late_finalizations += 1
+            print(f"⚠️ Finalisation tardive du jeu #{game_number} (dernier finalisé: #{self.highest_finalized})")
+        else:
+            self.highest_finalized = game_number
+
+        self.states[game_number] = FINALIZED
+        self.finalized_count += 1
+        return True
+
+    def mark_consumed(self, game_number: int):
+        """Marque la partie comme entièrement traitée"""
+        if game_number in self.states:
+            self.states[game_number] = CONSUMED
+
+    def get_state(self, game_number: int):
+        return self.states.get(game_number)
+
+    def _prune(self):
+        while len(self.states) > self.max_games:
+            self.states.popitem(last=False)
+
+    def reset(self):
+        self.states.clear()
+        self.highest_seen = None
+        self.highest_finalized = None
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            "tracked": len(self.states),
+            "finalized": self.finalized_count,
+            "ignored_after_final": self.ignored_after_final,
+            "late_finalizations": self.late_finalizations,
+            "out_of_order": self.out_of_order,
+            "cycle_resets": self.cycle_resets
+        }
@@ -0,0 +1,174 @@
+import json
+import os
+import re
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+# Numéro d'une ligne d'historique, lu sans décoder tout le JSON (chargement de l'index)
+NUMERO_RE = re.compile(r'"numero":(\d+)')
+
+
+class PredictionHistory:
+    """
+    Historique append-only des prédictions vérifiées (une ligne JSON par prédiction).
+
+    bot_config.json ne garde plus que les réglages et les prédictions en attente; chaque
+    prédiction vérifiée est ajoutée ici en une seule écriture. Rotation: au-delà de
+    max_bytes, le fichier courant devient .1 (puis .2, ...) et seuls keep_files fichiers
+    sont conservés. Les dernières entrées restent en mémoire pour les requêtes rapides,
+    et l'ensemble des numéros de tout l'historique conservé sert aux contrôles de doublon.
+    """
+
+    def __init__(self, history_file: str = "predictions_history.jsonl",
+                 max_bytes: int = 5 * 1024 * 1024, keep_files: int = 5, recent_size: int = 500):
+        self.history_file = history_file
+        self.max_bytes = max_bytes
+        self.keep_files = keep_files
+        self.recent_size = recent_size
+        self.recent = OrderedDict()  # {numero: enregistrement} des dernières prédictions vérifiées
+        self.numeros = set()         # Tous les numéros de l'historique (fichiers tournés compris)
+        self.load_recent()
+
+    def load_recent(self):
+        """Recharge les dernières entrées du fichier courant et l'index complet des numéros"""
+        self.recent.clear()
+        self.numeros.clear()
+        try:
+            for path in self._rotated_files():
+                with open(path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        match = NUMERO_RE.search(line)
+                        if match:
+                            self.numeros.add(int(match.group(1)))
+            for entry in self._read_file(self.history_file):
+                self._remember(entry)
+            if self.recent:
+                print(f"✅ Historique chargé: {len(self.recent)} prédictions récentes, {len(self.numeros)} numéros indexés")
+        except Exception as e:
+            print(f"⚠️ Erreur chargement historique: {e}")
+
+    def append(self, numero: int, data: Dict[str, Any]):
+        """Ajoute une prédiction vérifiée à l'historique"""
+        entry = dict(data)
+        entry["numero"] = int(numero)
+        entry.setdefault("archived_at", datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+        try:
+            self._rotate_if_needed()
+            with open(self.history_file, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n")
+        except Exception as e:
+            print(f"❌ Erreur écriture historique #{numero}: {e}")
+        self._remember(entry)
+
+    def extend(self, entries: Dict[str, Dict[str, Any]]):
+        """Ajoute plusieurs prédictions vérifiées en une seule écriture (migration)"""
+        if not entries:
+            return
+        try:
+            self._rotate_if_needed()
+            with open(self.history_file, "a", encoding="utf-8") as f:
+                for numero, data in entries.items():
+                    entry = dict(data)
+                    entry["numero"] = int(numero)
+                    f.write(json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n")
+                    self._remember(entry)
+        except Exception as e:
+            print(f"❌ Erreur écriture historique: {e}")
+
+    def contains(self, numero: int) -> bool:
+        """Vrai si la prédiction figure dans l'historique (contrôle de doublon complet)"""
+        return int(numero) in self.numeros
+
+    def get(self, numero: int) -> Optional[Dict[str, Any]]:
+        found = self.recent.get(int(numero))
+        if found is not None:
+            return found
+        for entry in self.iter_entries():
+            if entry.get("numero") == int(numero):
+                found = entry
+        return found
+
+    def iter_entries(self) -> Iterator[Dict[str, Any]]:
+        """Parcourt tout l'historique, du plus ancien fichier au plus récent"""
+        for path in reversed(self._rotated_files()):
+            yield from self._read_file(path)
+        yield from self._read_file(self.history_file)
+
+    def query(self, status: Optional[str] = None, since: Optional[str] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Recherche dans l'historique.
+
+        Args:
+            status: Filtre sur le statut (ex: '❌' ou '✅' pour tous les succès)
+            since: Date minimale 'YYYY-MM-DD HH:MM:SS' (comparée à created_at)
+            limit: Nombre maximum de résultats (les plus récents)
+        """
+        results = []
+        for entry in self.iter_entries():
+            if status and status not in entry.get("status", ""):
+                continue
+            if since and entry.get("created_at", "") < since:
+                continue
+            results.append(entry)
+        if limit is not None:
+            results = results[-limit:]
+        return results
+
+    def get_stats(self) -> Dict[str, Any]:
+        wins = sum(1 for entry in self.recent.values() if "✅" in entry.get("status", ""))
+        size = os.path.getsize(self.history_file) if os.path.exists(self.history_file) else 0
+        return {
+            "recent": len(self.recent),
+            "indexed": len(self.numeros),
+            "recent_wins": wins,
+            "recent_losses": len(self.recent) - wins,
+            "file_bytes": size,
+            "rotated_files": len(self._rotated_files())
+        }
+
+    def _remember(self, entry: Dict[str, Any]):
+        numero = entry.get("numero")
+        if numero is None:
+            return
+        self.numeros.add(numero)
+        self.recent[numero] = entry
+        self.recent.move_to_end(numero)
+        while len(self.recent) > self.recent_size:
+            self.recent.popitem(last=False)
+
+    def _rotated_files(self) -> List[str]:
+        files = []
+        for index in range(1, self.keep_files + 1):
+            path = f"{self.history_file}.{index}"
+            if os.path.exists(path):
+                files.append(path)
+        return files
+
+    def _rotate_if_needed(self):
+        if not os.path.exists(self.history_file) or os.path.getsize(self.history_file) < self.max_bytes:
+            return
+        oldest = f"{self.history_file}.{self.keep_files}"
+        if os.path.exists(oldest):
+            os.remove(oldest)
+        for index in range(self.keep_files - 1, 0, -1):
+            path = f"{self.history_file}.{index}"
+            if os.path.exists(path):
+                os.replace(path, f"{self.history_file}.{index + 1}")
+        os.replace(self.history_file, f"{self.history_file}.1")
+        print(f"🔄 Rotation de l'historique des prédictions ({self.history_file})")
+
+    @staticmethod
+    def _read_file(path: str) -> Iterator[Dict[str, Any]]:
+        if not os.path.exists(path):
+            return
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # Ligne tronquée (arrêt brutal pendant l'écriture): ignorée
+                    continue
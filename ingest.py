@@ -0,0 +1,121 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+from message_parser import find_game_number
+
+Handler = Callable[[int, int, str], Awaitable[None]]
+
+
+class _GameLock:
+    __slots__ = ("lock", "users")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.users = 0
+
+
+class IngestQueue:
+    """
+    File d'entrée bornée des messages du canal source.
+
+    Les handlers Telethon déposent (chat_id, message_id, texte) et reviennent; des
+    workers consomment la file. Plusieurs éditions en attente du même message sont
+    fusionnées (seul le dernier texte est traité). Le traitement est sérialisé par
+    numéro de jeu (verrou par partie): deux événements d'une même partie ne
+    s'entrelacent jamais, tandis que des parties différentes avancent en parallèle.
+    """
+
+    def __init__(self, handler: Handler, maxsize: int = 1000, workers: int = 4):
+        self.handler = handler
+        self.maxsize = maxsize
+        self.worker_count = workers
+        self._queue: Optional[asyncio.Queue] = None
+        self._pending: Dict[Tuple[int, int], Tuple[str, float]] = {}  # {(chat, message): (texte, déposé à)}
+        self._locks: Dict[Hashable, _GameLock] = {}
+        self._workers: List[asyncio.Task] = []
+        self.stats = {"received": 0, "processed": 0, "coalesced": 0, "errors": 0, "max_depth": 0}
+        self.wait_last_ms = 0.0
+        self.wait_max_ms = 0.0
+        self._wait_total = 0.0
+        self._wait_count = 0
+
+    def start(self):
+        if not self._workers:
+            self._queue = asyncio.Queue(self.maxsize)
+            self._workers = [asyncio.create_task(self._run()) for _ in range(self.worker_count)]
+            print(f"📥 File d'entrée activée ({self.worker_count} workers, {self.maxsize} messages max)")
+
+    async def submit(self, chat_id: int, message_id: int, text: str):
+        """Dépose un message (nouveau ou édité); attend seulement si la file est pleine"""
+        self.stats["received"] += 1
+        key = (chat_id, message_id)
+        if key in self._pending:
+            # Déjà en file: seule la dernière version sera traitée, à sa place d'origine
+            self._pending[key] = (text, self._pending[key][1])
+            self.stats["coalesced"] += 1
+            return
+        if self._queue is None:
+            # File pas encore démarrée (démarrage, scripts): traitement direct
+            await self._process(chat_id, message_id, text)
+            return
+        self._pending[key] = (text, time.perf_counter())
+        await self._queue.put(key)
+        self.stats["max_depth"] = max(self.stats["max_depth"], self._queue.qsize())
+
+    async def _run(self):
+        while True:
+            key = await self._queue.get()
+            try:
+                text, queued_at = self._pending.pop(key)
+                waited = (time.perf_counter() - queued_at) * 1000
+                self.wait_last_ms = waited
+                self.wait_max_ms = max(self.wait_max_ms, waited)
+                self._wait_total += waited
+                self._wait_count += 1
+                await self._process(key[0], key[1], text)
+            finally:
+                self._queue.task_done()
+
+    async def _process(self, chat_id: int, message_id: int, text: str):
+        game = find_game_number(text)
+        game_lock = self._locks.get(game)
+        if game_lock is None:
+            game_lock = self._locks[game] = _GameLock()
+        game_lock.users += 1
+        try:
+            async with game_lock.lock:
+                await self.handler(chat_id, message_id, text)
+            self.stats["processed"] += 1
+        except Exception as e:
+            self.stats["errors"] += 1
+            print(f"❌ Erreur traitement message {message_id} (jeu #{game}): {e}")
+        finally:
+            game_lock.users -= 1
+            if game_lock.users == 0:
+                del self._locks[game]
+
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def stop(self, timeout: float = 5.0):
+        """Traite ce qui reste en file (délai borné) puis arrête les workers"""
+        if self._queue is not None and self._workers:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout)
+            except asyncio.TimeoutError:
+                print(f"⚠️ {self.depth()} messages source non traités à l'arrêt")
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queue = None
+
+    def get_stats(self) -> Dict[str, float]:
+        stats = dict(self.stats)
+        stats["depth"] = self.depth()
+        stats["active_games"] = len(self._locks)
+        stats["wait_last_ms"] = round(self.wait_last_ms, 2)
+        stats["wait_max_ms"] = round(self.wait_max_ms, 2)
+        stats["wait_avg_ms"] = round(self._wait_total / self._wait_count, 2) if self._wait_count else 0.0
+        return stats
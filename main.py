@@ -1,20 +1,32 @@
 import os
 import asyncio
-import re
+import signal
 import json
 import zipfile
 import tempfile
 import shutil
-import glob
 from datetime import datetime, timedelta
 from telethon import TelegramClient, events
 from telethon.events import ChatAction
 from dotenv import load_dotenv
 from predictor import CardPredictor
-from yaml_manager import init_database, db
-from excel_importer import ExcelPredictionManager
+from yaml_manager import init_database
+from channel_pair import ChannelPair, DEFAULT_PAIR, PAIR_NAME_RE
+from prediction_rules import VERIFICATION_EMOJIS
+from file_watcher import ExcelWatcher
+from outbound import OutboundScheduler
+from telegram_session import build_session, cleanup_orphan_sessions, session_exists
+from entity_cache import EntityCache
+from command_router import CommandRouter
+from persistence import WriteBehind, atomic_write_json
+from recorder import SourceRecorder
+from metrics import COUNTER, GAUGE, LoopLagMonitor, registry
 from aiohttp import web
 import threading
+from time import perf_counter
+
+# Début du processus (mesure du temps jusqu'à la première prédiction)
+PROCESS_STARTED = perf_counter()
 
 # Load environment variables
 load_dotenv()
@@ -27,6 +39,9 @@ try:
     ADMIN_ID = int(os.getenv('ADMIN_ID') or '0') if os.getenv('ADMIN_ID') else None
     PORT = int(os.getenv('PORT') or '5000')
     DISPLAY_CHANNEL = int(os.getenv('DISPLAY_CHANNEL') or '-1002999811353')
+    # Session stable: chaîne StringSession (disque éphémère) ou fichier <nom>.session réutilisé
+    TELEGRAM_SESSION = os.getenv('TELEGRAM_SESSION') or ''
+    SESSION_NAME = os.getenv('SESSION_NAME') or 'bot_session'
 
     # Validation des variables requises
     if not API_ID or API_ID == 0:
@@ -45,142 +60,216 @@ except Exception as e:
 # Fichier de configuration persistante
 CONFIG_FILE = 'bot_config.json'
 
+# Persistance différée: au plus une écriture par fichier toutes les PERSIST_INTERVAL_MS
+PERSIST_INTERVAL_MS = int(os.getenv('PERSIST_INTERVAL_MS') or '1000')
+write_behind = WriteBehind(PERSIST_INTERVAL_MS)
+
+# Enregistrement compressé du trafic brut des canaux source (rejeu, backtest.py, incidents).
+# RECORD_SOURCE=0 désactive; segments dans RECORDINGS_DIR, rotation à RECORDING_MAX_MB
+RECORD_SOURCE = (os.getenv('RECORD_SOURCE') or '1') != '0'
+RECORDINGS_DIR = os.getenv('RECORDINGS_DIR') or 'recordings'
+RECORDING_MAX_MB = int(os.getenv('RECORDING_MAX_MB') or '16')
+source_recorder = SourceRecorder(RECORDINGS_DIR, max_bytes=RECORDING_MAX_MB * 1024 * 1024) if RECORD_SOURCE else None
+
 # Variables d'état
-detected_stat_channel = None
-detected_display_channel = None
 confirmation_pending = {}
 prediction_interval = 5  # Intervalle en minutes
 
-# Variable pour le décalage de prédiction (N+a)
-a_offset = 1  # Valeur par défaut, modifiable avec /a
-
-# Variable pour l'offset de vérification (r)
-# Définit le nombre d'essais pour vérifier une prédiction (2-10)
-r_offset = 2  # Valeur par défaut, modifiable avec /r
-
-# Emojis de vérification selon l'offset (N+0, N+1, N+2, etc.)
-# L'index correspond au nombre d'essais: 0 = 1er essai, 1 = 2ème essai, etc.
-VERIFICATION_EMOJIS = {
-    0: "✅0️⃣",  # 1er essai (N+0)
-    1: "✅1️⃣",  # 2ème essai (N+1)
-    2: "✅2️⃣",  # 3ème essai (N+2)
-    3: "✅3️⃣",  # 4ème essai (N+3)
-    4: "✅4️⃣",  # 5ème essai (N+4)
-    5: "✅5️⃣",  # 6ème essai (N+5)
-    6: "✅6️⃣",  # 7ème essai (N+6)
-    7: "✅7️⃣",  # 8ème essai (N+7)
-    8: "✅8️⃣",  # 9ème essai (N+8)
-    9: "✅9️⃣",  # 10ème essai (N+9)
-    10: "✅🔟"  # 11ème essai (N+10)
-}
+# Paires canal source → canal de diffusion, chacune avec son état isolé (voir channel_pair.py).
+# La paire DEFAULT_PAIR reprend stat_channel/display_channel/a_offset/r_offset de bot_config.json;
+# les autres sont décrites dans la liste "pairs".
+# a_offset: décalage de prédiction (N+a), modifiable avec /a
+# r_offset: nombre d'essais pour vérifier une prédiction (0-10), modifiable avec /r
+channel_pairs = {}
 
-# Dictionnaire pour stocker les prédictions actives et leur statut
-active_predictions = {}  # {numero_predit: {"message_id": id, "channel_id": id, "expected": "joueur/banquier", "attempts": 0}}
+# Routage des messages source: {canal source: paire}, reconstruit par register_source_handlers
+source_routes = {}
 
 # Variables pour la détection automatique des fichiers Excel
 EXCEL_WATCH_DIR = "."  # Répertoire à surveiller
-processed_excel_files = set()  # Fichiers déjà traités
-last_excel_check = None  # Dernière vérification
 
 def load_config():
-    """Load configuration with priority: JSON > Database > Environment"""
-    global detected_stat_channel, detected_display_channel, prediction_interval, a_offset, r_offset, active_predictions
+    """
+    Load configuration with priority: JSON > Database > Environment
+
+    Appelée une seule fois, au démarrage: les paires décrites dans le fichier sont créées
+    ici, avant leur recover()/start(). Ensuite la mémoire fait foi (le fichier peut être
+    en retard de PERSIST_INTERVAL_MS): ne pas la relire pendant l'exécution.
+    """
+    global prediction_interval
     try:
         # Toujours essayer JSON en premier (source de vérité)
         if os.path.exists(CONFIG_FILE):
             with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
                 config = json.load(f)
-                detected_stat_channel = config.get('stat_channel')
-                detected_display_channel = config.get('display_channel', DISPLAY_CHANNEL)
+                default_pair.source_id = config.get('stat_channel')
+                default_pair.display_id = config.get('display_channel', DISPLAY_CHANNEL)
                 prediction_interval = config.get('prediction_interval', 1)
-                a_offset = config.get('a_offset', 1)
-                r_offset = config.get('r_offset', 2)
-                active_predictions = config.get('active_predictions', {})
-                print(f"✅ Configuration chargée depuis JSON: Stats={detected_stat_channel}, Display={detected_display_channel}, a_offset={a_offset}, r_offset={r_offset}")
+                default_pair.a_offset = config.get('a_offset', 1)
+                default_pair.r_offset = config.get('r_offset', 2)
+                for pair_config in config.get('pairs', []):
+                    pair = channel_pairs.get(pair_config.get('name'))
+                    if pair is None:
+                        add_pair(pair_config)
+                    else:
+                        pair.source_id = pair_config.get('stat_channel')
+                        pair.display_id = pair_config.get('display_channel')
+                        pair.a_offset = pair_config.get('a_offset', 1)
+                        pair.r_offset = pair_config.get('r_offset', 2)
+                if 'active_predictions' in config and not default_pair.journal.exists():
+                    # Ancien format: prédictions stockées dans bot_config.json, reprises une
+                    # seule fois puis conservées dans le journal (voir recover_prediction_state)
+                    default_pair.store.load(config['active_predictions'])
+                print(f"✅ Configuration chargée depuis JSON: Stats={default_pair.source_id}, Display={default_pair.display_id}, a_offset={default_pair.a_offset}, r_offset={default_pair.r_offset}, paires={len(channel_pairs)}")
                 return
 
         # Fallback sur base de données si JSON n'existe pas
         if db:
-            detected_stat_channel = db.get_config('stat_channel')
-            detected_display_channel = db.get_config('display_channel') or DISPLAY_CHANNEL
+            default_pair.source_id = db.get_config('stat_channel')
+            default_pair.display_id = db.get_config('display_channel') or DISPLAY_CHANNEL
             interval_config = db.get_config('prediction_interval')
-            if detected_stat_channel:
-                detected_stat_channel = int(detected_stat_channel)
-            if detected_display_channel:
-                detected_display_channel = int(detected_display_channel)
+            if default_pair.source_id:
+                default_pair.source_id = int(default_pair.source_id)
+            if default_pair.display_id:
+                default_pair.display_id = int(default_pair.display_id)
             if interval_config:
                 prediction_interval = int(interval_config)
-            print(f"✅ Configuration chargée depuis la DB: Stats={detected_stat_channel}, Display={detected_display_channel}, Intervalle={prediction_interval}min")
+            print(f"✅ Configuration chargée depuis la DB: Stats={default_pair.source_id}, Display={default_pair.display_id}, Intervalle={prediction_interval}min")
         else:
             # Utiliser le canal de display par défaut depuis les variables d'environnement
-            detected_display_channel = DISPLAY_CHANNEL
+            default_pair.display_id = DISPLAY_CHANNEL
             prediction_interval = 1
-            print(f"ℹ️ Configuration par défaut: Display={detected_display_channel}, Intervalle={prediction_interval}min")
+            print(f"ℹ️ Configuration par défaut: Display={default_pair.display_id}, Intervalle={prediction_interval}min")
     except Exception as e:
         print(f"⚠️ Erreur chargement configuration: {e}")
         # Valeurs par défaut en cas d'erreur
-        detected_stat_channel = None
-        detected_display_channel = DISPLAY_CHANNEL
+        default_pair.source_id = None
+        default_pair.display_id = DISPLAY_CHANNEL
         prediction_interval = 1
 
 def save_config():
+    """Marque la configuration à sauvegarder (écriture différée, voir write_config)"""
+    write_behind.mark_dirty('config')
+
+def write_config():
     """Save configuration to database and JSON backup"""
     try:
         if db:
-            # Sauvegarde en base de données
-            db.set_config('stat_channel', detected_stat_channel)
-            db.set_config('display_channel', detected_display_channel)
-            db.set_config('prediction_interval', prediction_interval)
-            db.set_config('a_offset', a_offset)
+            # Sauvegarde en base de données (une seule écriture pour toutes les clés)
+            db.set_configs({
+                'stat_channel': default_pair.source_id,
+                'display_channel': default_pair.display_id,
+                'prediction_interval': prediction_interval,
+                'a_offset': default_pair.a_offset
+            })
             print("💾 Configuration sauvegardée en base de données")
 
         # Sauvegarde JSON de secours
         config = {
-            'stat_channel': detected_stat_channel,
-            'display_channel': detected_display_channel,
+            'stat_channel': default_pair.source_id,
+            'display_channel': default_pair.display_id,
             'prediction_interval': prediction_interval,
-            'a_offset': a_offset,
-            'r_offset': r_offset,
-            'active_predictions': active_predictions
+            'a_offset': default_pair.a_offset,
+            'r_offset': default_pair.r_offset,
+            'pairs': [pair.to_config() for name, pair in channel_pairs.items() if name != DEFAULT_PAIR]
         }
-        with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
-            json.dump(config, f, indent=2)
-        print(f"💾 Configuration sauvegardée: Stats={detected_stat_channel}, Display={detected_display_channel}, a_offset={a_offset}, r_offset={r_offset}")
+        atomic_write_json(CONFIG_FILE, config)
+        print(f"💾 Configuration sauvegardée: Stats={default_pair.source_id}, Display={default_pair.display_id}, a_offset={default_pair.a_offset}, r_offset={default_pair.r_offset}, paires={len(channel_pairs)}")
     except Exception as e:
         print(f"❌ Erreur sauvegarde configuration: {e}")
 
-def update_channel_config(source_id: int, target_id: int):
+write_behind.register('config', write_config)
+
+def recover_prediction_state():
+    """Restaure les prédictions de chaque paire depuis son dernier snapshot + la fin de son journal"""
+    for pair in channel_pairs.values():
+        pair.recover()
+    # bot_config.json ne contient plus que les réglages
+    save_config()
+
+def update_channel_config(source_id: int, target_id: int, pair_name: str = DEFAULT_PAIR):
     """Update channel configuration"""
-    global detected_stat_channel, detected_display_channel
-    detected_stat_channel = source_id
-    detected_display_channel = target_id
+    pair = channel_pairs[pair_name]
+    pair.source_id = source_id
+    pair.display_id = target_id
+    entity_cache.invalidate(source_id)
+    entity_cache.invalidate(target_id)
+    register_source_handlers()
     save_config()
 
-# Initialize database
-database = init_database()
+# Initialize database (DB_BACKEND=sqlite par défaut, ou yaml)
+DB_BACKEND = os.getenv('DB_BACKEND') or 'sqlite'
+db = init_database(backend=DB_BACKEND)
 
 # Gestionnaire de prédictions
 predictor = CardPredictor()
 
-# Gestionnaire d'importation Excel
-excel_manager = ExcelPredictionManager()
+# Initialize Telegram client with a stable session (reused across restarts)
+cleanup_orphan_sessions()
+warm_session = session_exists(TELEGRAM_SESSION, SESSION_NAME)
+client = TelegramClient(build_session(TELEGRAM_SESSION, SESSION_NAME), API_ID, API_HASH)
+
+# Mesures de démarrage (depuis le lancement du processus)
+startup_timings = {
+    'session': 'string' if TELEGRAM_SESSION else 'file',
+    'warm_session': warm_session,
+    'login_ms': None,
+    'ready_ms': None,
+    'first_prediction_ms': None
+}
+
+def record_startup_timing(name: str):
+    """Enregistre une étape du démarrage (une seule fois)"""
+    if startup_timings[name] is None:
+        startup_timings[name] = round((perf_counter() - PROCESS_STARTED) * 1000, 1)
+        print(f"⏱️ Démarrage: {name} = {startup_timings[name]} ms (session {'existante' if warm_session else 'nouvelle'})")
+
+# Identité du bot et InputPeer des canaux configurés (résolus une seule fois)
+entity_cache = EntityCache(client)
+
+# File d'envoi vers Telegram, partagée par toutes les paires (les chats sont résolus via entity_cache)
+outbound = OutboundScheduler(client, peers=entity_cache)
+
+# Commandes: table de correspondance exacte (/sta ne déclenche plus /start ni /status)
+commands = CommandRouter()
 
-# Initialize Telegram client with unique session name
-import time
-session_name = f'bot_session_{int(time.time())}'
-client = TelegramClient(session_name, API_ID, API_HASH)
+def add_pair(config: dict) -> ChannelPair:
+    """Crée une paire (fichiers, plan Excel, file d'entrée) et l'ajoute au registre"""
+    pair = ChannelPair.from_config(
+        config, outbound=outbound, persistence=write_behind,
+        on_posted=lambda pair, numero: record_startup_timing('first_prediction_ms')
+    )
+    channel_pairs[pair.name] = pair
+    return pair
+
+# Paire historique (canaux de premier niveau de bot_config.json, fichiers à la racine)
+default_pair = add_pair({'name': DEFAULT_PAIR, 'display_channel': DISPLAY_CHANNEL})
+
+# Préfixe optionnel des commandes admin: nom de la paire visée (paire historique si absent)
+PAIR_PREFIX = r'(?:([A-Za-z][\w-]*)\s+)?'
+
+def resolve_pair(name: str = None):
+    """Paire désignée par son nom dans une commande (paire historique si absent)"""
+    return channel_pairs.get(name or DEFAULT_PAIR)
+
+async def respond_unknown_pair(event, name: str):
+    await event.respond(f"❌ Paire inconnue: **{name}**\n\n📋 Paires: {', '.join(channel_pairs)}\n💡 Voir `/pairs`")
 
 async def start_bot():
     """Start the bot with proper error handling"""
     try:
         # Load saved configuration first
         load_config()
+        recover_prediction_state()
+        register_source_handlers()
 
         await client.start(bot_token=BOT_TOKEN)
+        record_startup_timing('login_ms')
         print("Bot démarré avec succès...")
 
-        # Get bot info
-        me = await client.get_me()
+        # Get bot info (mise en cache) et résolution des canaux configurés
+        me = await entity_cache.get_me()
+        await entity_cache.warm([chat_id for pair in channel_pairs.values() for chat_id in (pair.source_id, pair.display_id)])
         username = getattr(me, 'username', 'Unknown') or f"ID:{getattr(me, 'id', 'Unknown')}"
         print(f"Bot connecté: @{username}")
 
@@ -210,19 +299,15 @@ async def handler_join(event):
         print(f"user_id: {event.user_id}, chat_id: {event.chat_id}")
 
         if event.user_joined or event.user_added:
-            me = await client.get_me()
-            me_id = getattr(me, 'id', None)
+            await entity_cache.get_me()
+            me_id = entity_cache.me_id
             print(f"Mon ID: {me_id}, Event user_id: {event.user_id}")
 
             if event.user_id == me_id:
                 confirmation_pending[event.chat_id] = 'waiting_confirmation'
 
                 # Get channel info
-                try:
-                    chat = await client.get_entity(event.chat_id)
-                    chat_title = getattr(chat, 'title', f'Canal {event.chat_id}')
-                except:
-                    chat_title = f'Canal {event.chat_id}'
+                chat_title = await entity_cache.get_title(event.chat_id)
 
                 # Send private invitation to admin
                 invitation_msg = f"""🔔 **Nouveau canal détecté**
@@ -247,10 +332,10 @@ Envoyez votre choix en réponse à ce message."""
     except Exception as e:
         print(f"Erreur dans handler_join: {e}")
 
-@client.on(events.NewMessage(pattern=r'/set_stat (-?\d+)'))
+@commands.command('set_stat', PAIR_PREFIX + r'(-?\d+)', usage='/set_stat [paire] [ID]')
 async def set_stat_channel(event):
     """Set statistics channel (only admin in private)"""
-    global detected_stat_channel, confirmation_pending
+    global confirmation_pending
 
     try:
         # Only allow in private chat with admin
@@ -261,70 +346,82 @@ async def set_stat_channel(event):
             await event.respond("❌ Seul l'administrateur peut configurer les canaux")
             return
 
-        # Extract channel ID from command
+        # Extract pair name and channel ID from command
         match = event.pattern_match
-        channel_id = int(match.group(1))
+        pair = resolve_pair(match.group(1))
+        if pair is None:
+            await respond_unknown_pair(event, match.group(1))
+            return
+        channel_id = int(match.group(2))
 
         # Check if channel is waiting for confirmation
         if channel_id not in confirmation_pending:
             await event.respond("❌ Ce canal n'est pas en attente de configuration")
             return
 
-        detected_stat_channel = channel_id
+        owner = source_routes.get(channel_id)
+        if owner is not None and owner is not pair:
+            await event.respond(f"❌ Ce canal est déjà la source de la paire **{owner.name}**")
+            return
+
+        pair.source_id = channel_id
+        entity_cache.invalidate(channel_id)
+        register_source_handlers()
         confirmation_pending[channel_id] = 'configured_stat'
 
         # Save configuration
         save_config()
 
-        try:
-            chat = await client.get_entity(channel_id)
-            chat_title = getattr(chat, 'title', f'Canal {channel_id}')
-        except:
-            chat_title = f'Canal {channel_id}'
+        chat_title = await entity_cache.get_title(channel_id)
 
-        await event.respond(f"✅ **Canal de statistiques configuré**\n📋 {chat_title}\n\n✨ Le bot surveillera ce canal pour les prédictions - développé par Sossou Kouamé Appolinaire\n💾 Configuration sauvegardée automatiquement")
-        print(f"Canal de statistiques configuré: {channel_id}")
+        await event.respond(f"✅ **Canal de statistiques configuré**\n🔗 Paire: {pair.name}\n📋 {chat_title}\n\n✨ Le bot surveillera ce canal pour les prédictions - développé par Sossou Kouamé Appolinaire\n💾 Configuration sauvegardée automatiquement")
+        print(f"{pair.tag}Canal de statistiques configuré: {channel_id}")
 
     except Exception as e:
         print(f"Erreur dans set_stat_channel: {e}")
 
-@client.on(events.NewMessage(pattern=r'/force_set_stat (-?\d+)'))
+@commands.command('force_set_stat', PAIR_PREFIX + r'(-?\d+)', usage='/force_set_stat [paire] [ID]')
 async def force_set_stat_channel(event):
     """Force set statistics channel without waiting for invitation (admin only)"""
-    global detected_stat_channel
-
     try:
         # Only allow admin
         if ADMIN_ID and event.sender_id != ADMIN_ID:
             await event.respond("❌ Seul l'administrateur peut configurer les canaux")
             return
 
-        # Extract channel ID from command
+        # Extract pair name and channel ID from command
         match = event.pattern_match
-        channel_id = int(match.group(1))
+        pair = resolve_pair(match.group(1))
+        if pair is None:
+            await respond_unknown_pair(event, match.group(1))
+            return
+        channel_id = int(match.group(2))
+
+        owner = source_routes.get(channel_id)
+        if owner is not None and owner is not pair:
+            await event.respond(f"❌ Ce canal est déjà la source de la paire **{owner.name}**")
+            return
 
-        detected_stat_channel = channel_id
+        pair.source_id = channel_id
+        entity_cache.invalidate(channel_id)
+        register_source_handlers()
 
         # Save configuration
         save_config()
 
-        try:
-            chat = await client.get_entity(channel_id)
-            chat_title = getattr(chat, 'title', f'Canal {channel_id}')
-        except:
-            chat_title = f'Canal {channel_id}'
+        chat_title = await entity_cache.get_title(channel_id)
 
-        await event.respond(f"✅ **Canal de statistiques configuré (force)**\n📋 {chat_title}\n🆔 ID: {channel_id}\n\n✨ Le bot surveillera ce canal pour les prédictions\n💾 Configuration sauvegardée automatiquement")
-        print(f"Canal de statistiques configuré (force): {channel_id}")
+        await event.respond(f"✅ **Canal de statistiques configuré (force)**\n🔗 Paire: {pair.name}\n📋 {chat_title}\n🆔 ID: {channel_id}\n\n✨ Le bot surveillera ce canal pour les prédictions\n💾 Configuration sauvegardée automatiquement")
+        print(f"{pair.tag}Canal de statistiques configuré (force): {channel_id}")
 
     except Exception as e:
         print(f"Erreur dans force_set_stat_channel: {e}")
         await event.respond(f"❌ Erreur: {e}")
 
-@client.on(events.NewMessage(pattern=r'/set_display (-?\d+)'))
+@commands.command('set_display', PAIR_PREFIX + r'(-?\d+)', usage='/set_display [paire] [ID]')
 async def set_display_channel(event):
     """Set display channel (only admin in private)"""
-    global detected_display_channel, confirmation_pending
+    global confirmation_pending
 
     try:
         # Only allow in private chat with admin
@@ -335,70 +432,69 @@ async def set_display_channel(event):
             await event.respond("❌ Seul l'administrateur peut configurer les canaux")
             return
 
-        # Extract channel ID from command
+        # Extract pair name and channel ID from command
         match = event.pattern_match
-        channel_id = int(match.group(1))
+        pair = resolve_pair(match.group(1))
+        if pair is None:
+            await respond_unknown_pair(event, match.group(1))
+            return
+        channel_id = int(match.group(2))
 
         # Check if channel is waiting for confirmation
         if channel_id not in confirmation_pending:
             await event.respond("❌ Ce canal n'est pas en attente de configuration")
             return
 
-        detected_display_channel = channel_id
+        pair.display_id = channel_id
+        entity_cache.invalidate(channel_id)
         confirmation_pending[channel_id] = 'configured_display'
 
         # Save configuration
         save_config()
 
-        try:
-            chat = await client.get_entity(channel_id)
-            chat_title = getattr(chat, 'title', f'Canal {channel_id}')
-        except:
-            chat_title = f'Canal {channel_id}'
+        chat_title = await entity_cache.get_title(channel_id)
 
-        await event.respond(f"✅ **Canal de diffusion configuré**\n📋 {chat_title}\n\n🚀 Le bot publiera les prédictions dans ce canal - développé par Sossou Kouamé Appolinaire\n💾 Configuration sauvegardée automatiquement")
-        print(f"Canal de diffusion configuré: {channel_id}")
+        await event.respond(f"✅ **Canal de diffusion configuré**\n🔗 Paire: {pair.name}\n📋 {chat_title}\n\n🚀 Le bot publiera les prédictions dans ce canal - développé par Sossou Kouamé Appolinaire\n💾 Configuration sauvegardée automatiquement")
+        print(f"{pair.tag}Canal de diffusion configuré: {channel_id}")
 
     except Exception as e:
         print(f"Erreur dans set_display_channel: {e}")
 
-@client.on(events.NewMessage(pattern=r'/force_set_display (-?\d+)'))
+@commands.command('force_set_display', PAIR_PREFIX + r'(-?\d+)', usage='/force_set_display [paire] [ID]')
 async def force_set_display_channel(event):
     """Force set display channel without waiting for invitation (admin only)"""
-    global detected_display_channel
-
     try:
         # Only allow admin
         if ADMIN_ID and event.sender_id != ADMIN_ID:
             await event.respond("❌ Seul l'administrateur peut configurer les canaux")
             return
 
-        # Extract channel ID from command
+        # Extract pair name and channel ID from command
         match = event.pattern_match
-        channel_id = int(match.group(1))
+        pair = resolve_pair(match.group(1))
+        if pair is None:
+            await respond_unknown_pair(event, match.group(1))
+            return
+        channel_id = int(match.group(2))
 
-        detected_display_channel = channel_id
+        pair.display_id = channel_id
+        entity_cache.invalidate(channel_id)
 
         # Save configuration
         save_config()
 
-        try:
-            chat = await client.get_entity(channel_id)
-            chat_title = getattr(chat, 'title', f'Canal {channel_id}')
-        except:
-            chat_title = f'Canal {channel_id}'
+        chat_title = await entity_cache.get_title(channel_id)
 
-        await event.respond(f"✅ **Canal de diffusion configuré (force)**\n📋 {chat_title}\n🆔 ID: {channel_id}\n\n🚀 Le bot publiera les prédictions dans ce canal\n💾 Configuration sauvegardée automatiquement")
-        print(f"Canal de diffusion configuré (force): {channel_id}")
+        await event.respond(f"✅ **Canal de diffusion configuré (force)**\n🔗 Paire: {pair.name}\n📋 {chat_title}\n🆔 ID: {channel_id}\n\n🚀 Le bot publiera les prédictions dans ce canal\n💾 Configuration sauvegardée automatiquement")
+        print(f"{pair.tag}Canal de diffusion configuré (force): {channel_id}")
 
     except Exception as e:
         print(f"Erreur dans force_set_display_channel: {e}")
         await event.respond(f"❌ Erreur: {e}")
 
-@client.on(events.NewMessage(pattern=r'/a\s*(\d+)?'))
+@commands.command('a', PAIR_PREFIX + r'(\d+)?', usage='/a [paire] [valeur]')
 async def set_a_offset(event):
     """Set or show the prediction offset value (N+a)"""
-    global a_offset
     
     try:
         if ADMIN_ID and event.sender_id != ADMIN_ID:
@@ -406,24 +502,27 @@ async def set_a_offset(event):
             return
         
         match = event.pattern_match
-        new_value = match.group(1)
+        pair = resolve_pair(match.group(1))
+        if pair is None:
+            await respond_unknown_pair(event, match.group(1))
+            return
+        new_value = match.group(2)
         
         if new_value:
-            a_offset = int(new_value)
+            pair.a_offset = int(new_value)
             save_config()
-            await event.respond(f"✅ **Décalage de prédiction mis à jour**\n\n📊 Nouvelle valeur: **a = {a_offset}**\n\n🎯 Les prédictions seront: N + {a_offset}\n💾 Configuration sauvegardée")
-            print(f"Décalage a_offset mis à jour: {a_offset}")
+            await event.respond(f"✅ **Décalage de prédiction mis à jour** (paire {pair.name})\n\n📊 Nouvelle valeur: **a = {pair.a_offset}**\n\n🎯 Les prédictions seront: N + {pair.a_offset}\n💾 Configuration sauvegardée")
+            print(f"{pair.tag}Décalage a_offset mis à jour: {pair.a_offset}")
         else:
-            await event.respond(f"📊 **Décalage actuel: a = {a_offset}**\n\n🎯 Les prédictions sont: N + {a_offset}\n\n💡 Pour modifier: `/a [valeur]`\nExemple: `/a 3` pour N+3")
+            await event.respond(f"📊 **Décalage actuel: a = {pair.a_offset}** (paire {pair.name})\n\n🎯 Les prédictions sont: N + {pair.a_offset}\n\n💡 Pour modifier: `/a [paire] [valeur]`\nExemple: `/a 3` pour N+3")
     
     except Exception as e:
         print(f"Erreur dans set_a_offset: {e}")
         await event.respond(f"❌ Erreur: {e}")
 
-@client.on(events.NewMessage(pattern=r'/r\s*(\d+)?'))
+@commands.command('r', PAIR_PREFIX + r'(\d+)?', usage='/r [paire] [valeur]')
 async def set_r_offset(event):
     """Set or show the verification offset value (r)"""
-    global r_offset
     
     try:
         if ADMIN_ID and event.sender_id != ADMIN_ID:
@@ -431,7 +530,11 @@ async def set_r_offset(event):
             return
         
         match = event.pattern_match
-        new_value = match.group(1)
+        pair = resolve_pair(match.group(1))
+        if pair is None:
+            await respond_unknown_pair(event, match.group(1))
+            return
+        new_value = match.group(2)
         
         if new_value:
             value = int(new_value)
@@ -439,16 +542,16 @@ async def set_r_offset(event):
                 await event.respond("❌ **Valeur invalide**\n\nL'offset de vérification doit être entre **0** et **10**.\n\n💡 Exemple: `/r 2` pour vérifier N+0, N+1, N+2")
                 return
             
-            r_offset = value
+            pair.r_offset = value
             save_config()
             
-            emoji_list = "\n".join([f"• N+{i}: {VERIFICATION_EMOJIS[i]}" for i in range(0, r_offset + 1)])
+            emoji_list = "\n".join([f"• N+{i}: {VERIFICATION_EMOJIS[i]}" for i in range(0, pair.r_offset + 1)])
             
             await event.respond(f"""✅ **Offset de vérification mis à jour**
 
-📊 Nouvelle valeur: **r = {r_offset}**
+📊 Nouvelle valeur: **r = {pair.r_offset}** (paire {pair.name})
 
-🎯 Vérification de N+0 à N+{r_offset}
+🎯 Vérification de N+0 à N+{pair.r_offset}
 
 **Emojis de vérification:**
 {emoji_list}
@@ -457,18 +560,18 @@ async def set_r_offset(event):
    (0 = succès au 1er essai, 1 = succès au 2ème essai, etc.)
 
 💾 Configuration sauvegardée""")
-            print(f"Offset r_offset mis à jour: {r_offset}")
+            print(f"{pair.tag}Offset r_offset mis à jour: {pair.r_offset}")
         else:
-            emoji_list = "\n".join([f"• N+{i}: {VERIFICATION_EMOJIS[i]}" for i in range(0, r_offset + 1)])
+            emoji_list = "\n".join([f"• N+{i}: {VERIFICATION_EMOJIS[i]}" for i in range(0, pair.r_offset + 1)])
             
-            await event.respond(f"""📊 **Offset de vérification actuel: r = {r_offset}**
+            await event.respond(f"""📊 **Offset de vérification actuel: r = {pair.r_offset}** (paire {pair.name})
 
-🎯 Vérification de N+0 à N+{r_offset}
+🎯 Vérification de N+0 à N+{pair.r_offset}
 
 **Emojis de vérification:**
 {emoji_list}
 
-💡 Pour modifier: `/r [valeur]` (0-10)
+💡 Pour modifier: `/r [paire] [valeur]` (0-10)
 Exemple: `/r 2` pour vérifier N+0, N+1, N+2""")
     
     except Exception as e:
@@ -476,6 +579,9 @@ Exemple: `/r 2` pour vérifier N+0, N+1, N+2""")
         await event.respond(f"❌ Erreur: {e}")
 
 # --- FONCTIONS D'ANALYSE DES MESSAGES DU CANAL SOURCE ---
+# Le message est analysé une seule fois par parse_game_message (message_parser.py);
+# les prédicats (should_skip_prediction, has_six_in_first_group, ...) lisent le GameRecord.
+# Vérification et lancement sont portés par chaque paire (ChannelPair, channel_pair.py).
 
 def extract_card_value(card: str) -> str:
     """Extrait la valeur d'une carte (A, K, Q, J, 10, 9, 8, 7, 6, 5, 4, 3, 2)"""
@@ -485,356 +591,8 @@ def extract_card_value(card: str) -> str:
             return val
     return ""
 
-def has_six_in_first_group(message_text: str) -> bool:
-    """
-    Vérifie si le premier groupe de cartes contient une carte de valeur 6.
-    Exemple: A♠️6♠️ contient un 6, mais 3♠️3♠️ ne contient pas de 6.
-    """
-    try:
-        pattern = r"[✅🔰]?\d+\(([^)]+)\)"
-        matches = re.findall(pattern, message_text)
-        if matches and len(matches) >= 1:
-            first_group = matches[0]
-            card_pattern = r'(\d+|[AKQJ])[♠️♥️♦️♣️♠♥♦♣]'
-            cards = re.findall(card_pattern, first_group)
-            for card_value in cards:
-                if card_value == '6':
-                    print(f"✅ Trouvé une carte 6 dans le premier groupe: {first_group}")
-                    return True
-            print(f"ℹ️ Pas de carte 6 dans le premier groupe: {first_group} (cartes: {cards})")
-        return False
-    except Exception as e:
-        print(f"Erreur has_six_in_first_group: {e}")
-        return False
-
-def has_six_in_both_groups(message_text: str) -> bool:
-    """
-    Vérifie si CHAQUE groupe (premier ET second) contient au moins une carte de valeur 6.
-    Retourne True si les deux groupes contiennent chacun au moins un 6.
-    """
-    try:
-        pattern = r"[✅🔰]?\d+\(([^)]+)\)"
-        matches = re.findall(pattern, message_text)
-        
-        if len(matches) < 2:
-            return False
-        
-        # Vérifier le premier groupe
-        first_group = matches[0]
-        card_pattern = r'(\d+|[AKQJ])[♠️♥️♦️♣️♠♥♦♣]'
-        first_group_cards = re.findall(card_pattern, first_group)
-        has_six_in_first = any(card_value == '6' for card_value in first_group_cards)
-        
-        # Vérifier le second groupe
-        second_group = matches[1]
-        second_group_cards = re.findall(card_pattern, second_group)
-        has_six_in_second = any(card_value == '6' for card_value in second_group_cards)
-        
-        if has_six_in_first and has_six_in_second:
-            print(f"⚠️ EXCLUSION: Premier groupe contient '6' ET second groupe contient '6'")
-            print(f"   Premier groupe: {first_group} (cartes: {first_group_cards})")
-            print(f"   Second groupe: {second_group} (cartes: {second_group_cards})")
-            return True
-        
-        return False
-    except Exception as e:
-        print(f"Erreur has_six_in_both_groups: {e}")
-        return False
-
-def count_sixes_in_groups(message_text: str) -> int:
-    """
-    Compte le nombre total de cartes de valeur 6 dans tous les groupes.
-    Retourne le nombre total de '6' trouvés.
-    """
-    try:
-        pattern = r"[✅🔰]?\d+\(([^)]+)\)"
-        matches = re.findall(pattern, message_text)
-        total_sixes = 0
-        
-        for group in matches:
-            card_pattern = r'(\d+|[AKQJ])[♠️♥️♦️♣️♠♥♦♣]'
-            cards = re.findall(card_pattern, group)
-            sixes_in_group = sum(1 for card_value in cards if card_value == '6')
-            total_sixes += sixes_in_group
-        
-        print(f"📊 Nombre total de '6' trouvés dans tous les groupes: {total_sixes}")
-        return total_sixes
-    except Exception as e:
-        print(f"Erreur count_sixes_in_groups: {e}")
-        return 0
-
-def get_first_group_total(message_text: str) -> int:
-    """Extrait le total du premier groupe (le chiffre avant les parenthèses)"""
-    try:
-        pattern = r"[✅🔰]?(\d+)\(([^)]+)\)"
-        matches = re.findall(pattern, message_text)
-        if matches and len(matches) >= 1:
-            total = int(matches[0][0])
-            print(f"📊 Total du premier groupe: {total}")
-            return total
-        return -1
-    except Exception as e:
-        print(f"Erreur get_first_group_total: {e}")
-        return -1
-
-def extract_t_value(message_text: str) -> float:
-    """Extrait la valeur #T du message"""
-    try:
-        match = re.search(r'#T(\d+(?:\.\d+)?)', message_text)
-        if match:
-            t_value = float(match.group(1))
-            print(f"📊 Valeur #T extraite: {t_value}")
-            return t_value
-        return -1
-    except Exception as e:
-        print(f"Erreur extract_t_value: {e}")
-        return -1
-
-def is_tie_game(message_text: str) -> bool:
-    """
-    Vérifie si c'est un match nul.
-    Format match nul: les deux groupes ont le même score et 🟣#X est présent
-    Exemple: #N25. 5(Q♣️6♥️5♣️) 🔰 5(3♣️9♦️3♠️) #T10 🟣#X
-    """
-    try:
-        if '🟣#X' in message_text:
-            print("🔰 Match nul détecté (🟣#X présent) - pas de prédiction")
-            return True
-        return False
-    except Exception as e:
-        print(f"Erreur is_tie_game: {e}")
-        return False
-
-def should_skip_prediction(message_text: str) -> bool:
-    """
-    Vérifie si on doit ignorer la prédiction:
-    - Match nul (🔰 entre groupes avec 🟣#X)
-    - Premier groupe total = 6 ET contient un 6 dans les cartes
-    - 2 valeurs '6' ou plus dans tous les groupes combinés
-    - Premier groupe contient un 6 ET second groupe contient un 6
-    """
-    if is_tie_game(message_text):
-        return True
-    
-    # Vérifier si les deux groupes contiennent chacun au moins un 6
-    if has_six_in_both_groups(message_text):
-        print(f"⚠️ Les deux groupes contiennent chacun une carte '6' - pas de prédiction")
-        return True
-    
-    # Vérifier s'il y a 2 valeurs '6' ou plus
-    total_sixes = count_sixes_in_groups(message_text)
-    if total_sixes >= 2:
-        print(f"⚠️ Trouvé {total_sixes} cartes '6' dans les groupes - pas de prédiction")
-        return True
-    
-    first_group_total = get_first_group_total(message_text)
-    has_six = has_six_in_first_group(message_text)
-    
-    if first_group_total == 6 and has_six:
-        print(f"⚠️ Total premier groupe = 6 ET contient un 6 - pas de prédiction")
-        return True
-    
-    return False
-
-def is_finalized_message(message_text: str) -> bool:
-    """Vérifie si le message est finalisé (✅ ou 🔰)"""
-    return '✅' in message_text or '🔰' in message_text
-
-async def verify_active_predictions(game_number: int, message_text: str):
-    """
-    Vérifie les prédictions actives basées sur les messages du canal source.
-    
-    Logique de vérification séquentielle:
-    1. Vérifie d'abord à N+0 (numéro exact prédit)
-    2. Si échec et r ≥ 1, continue à N+1
-    3. Si échec et r ≥ 2, continue à N+2
-    4. Marque ❌ si échec après tous les essais autorisés par r_offset
-    """
-    global active_predictions
-    
-    if not is_finalized_message(message_text):
-        return
-    
-    for pred_numero_str in list(active_predictions.keys()):
-        pred_numero = int(pred_numero_str)
-        pred_data = active_predictions[pred_numero_str]
-        
-        # Ignorer si déjà vérifiée
-        if pred_data.get("verified", False):
-            continue
-        
-        # Récupérer le nombre d'essais déjà effectués
-        attempts_done = pred_data.get("attempts", 0)
-        
-        # Si le jeu actuel est avant notre prédiction, ignorer
-        if game_number < pred_numero:
-            continue
-        
-        # Calculer l'offset actuel (combien de jeux après la prédiction)
-        current_offset = game_number - pred_numero
-        
-        # Si on a dépassé le nombre maximum d'essais autorisés, marquer comme échec
-        if current_offset > r_offset:
-            msg_id = pred_data.get("message_id")
-            channel_id = pred_data.get("channel_id")
-            base_text = pred_data.get("base_text", "")
-            
-            if msg_id and channel_id:
-                new_text = base_text.replace("statut :⏳", "statut :❌")
-                try:
-                    await client.edit_message(channel_id, msg_id, new_text)
-                    print(f"❌ Prédiction #{pred_numero} expirée après offset {r_offset}")
-                except Exception as e:
-                    print(f"❌ Erreur mise à jour prédiction expirée #{pred_numero}: {e}")
-            
-            pred_data["verified"] = True
-            pred_data["status"] = "❌"
-            pred_data["attempts"] = r_offset + 1
-            save_config()
-            continue
-        
-        # Vérifier seulement si c'est un offset qu'on n'a pas encore testé
-        if current_offset > attempts_done:
-            msg_id = pred_data.get("message_id")
-            channel_id = pred_data.get("channel_id")
-            expected = pred_data.get("expected", "")
-            
-            if not msg_id or not channel_id:
-                continue
-            
-            # Extraire le point du premier groupe
-            premier_groupe_point, _ = excel_manager.extract_points_and_winner(message_text)
-            
-            if premier_groupe_point is None:
-                print(f"⚠️ Impossible d'extraire le point du premier groupe du jeu #{game_number}")
-                continue
-            
-            # Vérifier si la prédiction est réussie
-            is_success = False
-            if expected == "joueur":
-                # P+6,5 : succès si point > 6.5
-                if premier_groupe_point > 6.5:
-                    is_success = True
-                    print(f"✅ Prédiction #{pred_numero} JOUEUR (P+6,5) réussie à N+{current_offset}: point={premier_groupe_point} > 6.5")
-            elif expected == "banquier":
-                # M-4,5 : succès si point < 4.5
-                if premier_groupe_point < 4.5:
-                    is_success = True
-                    print(f"✅ Prédiction #{pred_numero} BANQUIER (M-4,5) réussie à N+{current_offset}: point={premier_groupe_point} < 4.5")
-            
-            # Mettre à jour le nombre d'essais
-            pred_data["attempts"] = current_offset
-            
-            if is_success:
-                # Succès: marquer avec l'emoji approprié et arrêter
-                status_emoji = VERIFICATION_EMOJIS.get(current_offset, f"✅{current_offset}")
-                base_text = pred_data.get("base_text", "")
-                new_text = base_text.replace("statut :⏳", f"statut :{status_emoji}")
-                
-                try:
-                    await client.edit_message(channel_id, msg_id, new_text)
-                    pred_data["verified"] = True
-                    pred_data["status"] = status_emoji
-                    save_config()
-                    print(f"✅ Prédiction #{pred_numero} validée: {status_emoji} (N+{current_offset})")
-                except Exception as e:
-                    print(f"❌ Erreur mise à jour prédiction #{pred_numero}: {e}")
-            else:
-                # Échec sur cet essai
-                print(f"⏳ Prédiction #{pred_numero} échec à N+{current_offset} (essai {current_offset + 1}/{r_offset + 1})")
-                
-                # Si c'est le dernier essai autorisé, marquer comme échec définitif
-                if current_offset >= r_offset:
-                    base_text = pred_data.get("base_text", "")
-                    new_text = base_text.replace("statut :⏳", "statut :❌")
-                    
-                    try:
-                        await client.edit_message(channel_id, msg_id, new_text)
-                        pred_data["verified"] = True
-                        pred_data["status"] = "❌"
-                        save_config()
-                        print(f"❌ Prédiction #{pred_numero} échouée après tous les essais (N+0 à N+{r_offset})")
-                    except Exception as e:
-                        print(f"❌ Erreur mise à jour prédiction #{pred_numero}: {e}")
-                else:
-                    # Continuer à surveiller pour le prochain offset
-                    save_config()
-
-async def verify_excel_predictions(game_number: int, message_text: str):
-    """Fonction consolidée pour vérifier toutes les prédictions Excel en attente"""
-    for key, pred in list(excel_manager.predictions.items()):
-        # Ignorer si pas lancée ou déjà vérifiée
-        if not pred["launched"] or pred.get("verified", False):
-            continue
-
-        pred_numero = pred["numero"]
-        expected_winner = pred["victoire"]
-        current_offset = pred.get("current_offset", 0)
-        target_number = pred_numero + current_offset
-
-        # DÉTECTION DE SAUT DE NUMÉRO
-        if game_number > target_number:
-            print(f"⚠️ Numéro sauté: #{pred_numero} attendait #{target_number}, reçu #{game_number}")
-
-            while current_offset <= 2 and game_number > pred_numero + current_offset:
-                current_offset += 1
-                print(f"⏭️ Prédiction #{pred_numero}: saut à offset {current_offset}")
-
-            # Note: excel_manager.verify_excel_prediction gère maintenant la vérification d'échec > 2
-            if current_offset > 2:
-                # Marquer comme échec si l'offset dépasse 2
-                await update_prediction_status(pred, pred_numero, expected_winner, "❌", True) # MODIFIÉ : "⭕✍🏻" -> "❌"
-                continue
-            else:
-                pred["current_offset"] = current_offset
-                excel_manager.save_predictions()
-
-        # Vérification séquentielle
-        status, should_continue = excel_manager.verify_excel_prediction(
-            game_number, message_text, pred_numero, expected_winner, current_offset
-        )
-
-        if status:
-            await update_prediction_status(pred, pred_numero, expected_winner, status, True)
-        elif should_continue and game_number == pred_numero + current_offset:
-            new_offset = current_offset + 1
-            if new_offset <= 2:
-                pred["current_offset"] = new_offset
-                excel_manager.save_predictions()
-                print(f"⏭️ Prédiction #{pred_numero}: offset {new_offset}")
-            else:
-                # Échec définitif après offset 2 non réussi
-                await update_prediction_status(pred, pred_numero, expected_winner, "❌", True) # MODIFIÉ : "⭕✍🏻" -> "❌"
-
-async def update_prediction_status(pred: dict, numero: int, winner: str, status: str, verified: bool):
-    """Mise à jour unifiée du statut de prédiction"""
-    msg_id = pred.get("message_id")
-    channel_id = pred.get("channel_id")
-
-    if msg_id and channel_id:
-        # Utiliser la nouvelle fonction (qui prend numero et winner) pour obtenir le format complet (incluant statut :⏳)
-        full_base_text_with_placeholder = excel_manager.get_prediction_format(numero, winner)
-
-        # Le format complet est: 🔵{numero}:🅿️+6,5🔵statut :⏳
-        # Nous devons remplacer la fin :⏳ par :{status}
-
-        # Sépare le texte avant 'statut :⏳' et prend la première partie
-        base_format = full_base_text_with_placeholder.rsplit("statut :⏳", 1)[0]
-
-        # Reconstruit le message avec le nouveau statut
-        new_text = f"{base_format}statut :{status}"
-
-        try:
-            await client.edit_message(channel_id, msg_id, new_text)
-            pred["verified"] = verified
-            excel_manager.save_predictions()
-            print(f"✅ Prédiction #{numero} mise à jour: {status}")
-        except Exception as e:
-            print(f"❌ Erreur mise à jour #{numero}: {e}")
-
-
 # --- COMMANDES DE BASE ---
-@client.on(events.NewMessage(pattern='/start'))
+@commands.command('start')
 async def start_command(event):
     """Send welcome message when user starts the bot"""
     try:
@@ -856,7 +614,8 @@ async def start_command(event):
 **Commandes Admin** :
 • `/start` - Ce message
 • `/status` - État du bot
-• `/a [valeur]` - Définir le décalage (N+a) [actuel: {a_offset}]
+• `/a [valeur]` - Définir le décalage (N+a) [actuel: {default_pair.a_offset}]
+• `/pairs` - Paires source → diffusion
 • `/sta` - Statistiques des prédictions
 • `/reset` - Réinitialiser toutes les données
 • `/ni` - Informations système
@@ -890,7 +649,7 @@ Le bot est prêt à analyser vos jeux ! 🚀"""
         print(f"Erreur dans start_command: {e}")
 
 # --- COMMANDES ADMINISTRATIVES ---
-@client.on(events.NewMessage(pattern='/status'))
+@commands.command('status')
 async def show_status(event):
     """Show bot status (admin only)"""
     try:
@@ -898,40 +657,45 @@ async def show_status(event):
         if ADMIN_ID and event.sender_id != ADMIN_ID:
             return
 
-        # Recharger la configuration pour éviter les valeurs obsolètes
-        load_config()
-
         config_status = "✅ Sauvegardée" if os.path.exists(CONFIG_FILE) else "❌ Non sauvegardée"
         status_msg = f"""📊 **Statut du Bot**
 
-Canal statistiques: {'✅ Configuré' if detected_stat_channel else '❌ Non configuré'} ({detected_stat_channel})
-Canal diffusion: {'✅ Configuré' if detected_display_channel else '❌ Non configuré'} ({detected_display_channel})
+Canal statistiques: {'✅ Configuré' if default_pair.source_id else '❌ Non configuré'} ({default_pair.source_id})
+Canal diffusion: {'✅ Configuré' if default_pair.display_id else '❌ Non configuré'} ({default_pair.display_id})
 ⏱️ Intervalle de prédiction: {prediction_interval} minutes
 Configuration persistante: {config_status}
-Prédictions actives: {len(predictor.prediction_status)}
-Dernières prédictions: {len(predictor.last_predictions)}
+Prédictions actives: {sum(len(pair.store) for pair in channel_pairs.values())}
+En attente de vérification: {sum(pair.store.pending_count() for pair in channel_pairs.values())}
+
+🔗 **Paires** ({len(channel_pairs)}):
+{chr(10).join(f"{pair.describe()} — actives: {len(pair.store)}" for pair in channel_pairs.values())}
 """
         await event.respond(status_msg)
     except Exception as e:
         print(f"Erreur dans show_status: {e}")
 
-@client.on(events.NewMessage(pattern='/reset'))
+@commands.command('reset')
 async def reset_data(event):
     """Réinitialisation des données (admin uniquement)"""
     try:
         if event.sender_id != ADMIN_ID:
             return
 
-        # Réinitialiser les données du predictor
+        # Réinitialiser les données du predictor et les prédictions de chaque paire
+        # (journalisé: elles ne reviennent pas à la reprise suivante)
         predictor.reset()
+        for pair in channel_pairs.values():
+            pair.store.reset()
 
-        # Réinitialiser les données YAML
+        # Réinitialiser la base (YAML ou SQLite), puis y réécrire la configuration en
+        # mémoire: reset_all_data() vide aussi la table config
         db.reset_all_data()
+        save_config()
 
         msg = """🔄 **Données réinitialisées avec succès !**
 
 ✅ Prédictions en attente: vidées
-✅ Base de données YAML: réinitialisée
+✅ Base de données: réinitialisée
 ✅ Configuration: préservée
 
 Le bot est prêt pour un nouveau cycle."""
@@ -943,16 +707,16 @@ Le bot est prêt pour un nouveau cycle."""
         print(f"Erreur dans reset_data: {e}")
         await event.respond(f"❌ Erreur lors de la réinitialisation: {e}")
 
-@client.on(events.NewMessage(pattern='/ni'))
+@commands.command('ni')
 async def ni_command(event):
     """Commande /ni - Informations sur le système de prédiction"""
     try:
         # Utiliser les variables globales configurées
-        stats_channel = detected_stat_channel or 'Non configuré'
-        display_channel = detected_display_channel or 'Non configuré'
+        stats_channel = default_pair.source_id or 'Non configuré'
+        display_channel = default_pair.display_id or 'Non configuré'
 
-        # Compter les prédictions actives depuis le predictor
-        active_predictions = len([s for s in predictor.prediction_status.values() if s == '⌛'])
+        # Prédictions en attente de vérification, toutes paires confondues
+        active_predictions = sum(pair.store.pending_count() for pair in channel_pairs.values())
 
         msg = f"""🎯 **Système de Prédiction NI - Statut**
 
@@ -971,6 +735,7 @@ async def ni_command(event):
 🔧 **Commandes disponibles**:
 • `/set_stat [ID]` - Configurer canal source
 • `/set_display [ID]` - Configurer canal affichage
+• `/pairs` - Voir les paires source → diffusion
 • `/excel_status` - Voir prédictions Excel
 • `/reset` - Réinitialiser les données
 • `/deploy` - Créer package de déploiement
@@ -984,7 +749,7 @@ async def ni_command(event):
         print(f"Erreur dans ni_command: {e}")
         await event.respond(f"❌ Erreur: {e}")
 
-@client.on(events.NewMessage(pattern='/deploy'))
+@commands.command('deploy')
 async def deploy_command(event):
     """Créer un package zip de déploiement avec tous les fichiers à la racine"""
     try:
@@ -1031,7 +796,7 @@ async def deploy_command(event):
         await event.respond(f"❌ Erreur: {e}")
 
 
-@client.on(events.NewMessage(pattern='/test_invite'))
+@commands.command('test_invite')
 async def test_invite(event):
     """Test sending invitation (admin only)"""
     try:
@@ -1056,19 +821,20 @@ Ceci est un message de test pour vérifier les invitations."""
     except Exception as e:
         print(f"Erreur dans test_invite: {e}")
 
-@client.on(events.NewMessage(pattern='/sta'))
+@commands.command('sta', r'([A-Za-z][\w-]*)?', usage='/sta [paire]')
 async def show_excel_stats(event):
     """Show Excel predictions statistics"""
     try:
         if ADMIN_ID and event.sender_id != ADMIN_ID:
             return
 
-        # Recharger la configuration pour éviter les valeurs obsolètes
-        load_config()
-
-        stats = excel_manager.get_stats()
+        pair = resolve_pair(event.pattern_match.group(1))
+        if pair is None:
+            await respond_unknown_pair(event, event.pattern_match.group(1))
+            return
+        stats = pair.excel_manager.get_stats()
 
-        msg = f"""📊 **Statut des Prédictions Excel**
+        msg = f"""📊 **Statut des Prédictions Excel** (paire {pair.name})
 
 📋 **Statistiques Excel**:
 • Total prédictions: {stats['total']}
@@ -1076,8 +842,8 @@ async def show_excel_stats(event):
 • Lancées: {stats['launched']}
 
 📈 **Configuration actuelle**:
-• Canal stats configuré: {'✅' if detected_stat_channel else '❌'} ({detected_stat_channel or 'Aucun'})
-• Canal affichage configuré: {'✅' if detected_display_channel else '❌'} ({detected_display_channel or 'Aucun'})
+• Canal stats configuré: {'✅' if pair.source_id else '❌'} ({pair.source_id or 'Aucun'})
+• Canal affichage configuré: {'✅' if pair.display_id else '❌'} ({pair.display_id or 'Aucun'})
 
 🔧 **Format de prédiction**:
 • Joueur (P+6,5) : 🔵XXX:🅿️+6,5🔵statut :⏳
@@ -1092,18 +858,21 @@ async def show_excel_stats(event):
         print(f"Erreur dans show_excel_stats: {e}")
         await event.respond(f"❌ Erreur: {e}")
 
-@client.on(events.NewMessage(pattern='/excel_clear'))
+@commands.command('excel_clear', r'([A-Za-z][\w-]*)?', usage='/excel_clear [paire]')
 async def clear_excel_predictions(event):
     """Effacer toutes les prédictions Excel"""
     try:
         if ADMIN_ID and event.sender_id != ADMIN_ID:
             return
 
-        old_count = len(excel_manager.predictions)
-        excel_manager.predictions.clear()
-        excel_manager.save_predictions()
+        pair = resolve_pair(event.pattern_match.group(1))
+        if pair is None:
+            await respond_unknown_pair(event, event.pattern_match.group(1))
+            return
+        old_count = len(pair.excel_manager.predictions)
+        pair.excel_manager.clear_predictions()
 
-        msg = f"""🗑️ **Prédictions Excel effacées**
+        msg = f"""🗑️ **Prédictions Excel effacées** (paire {pair.name})
 
 ✅ {old_count} prédictions supprimées
 📋 La base est maintenant vide
@@ -1111,15 +880,127 @@ async def clear_excel_predictions(event):
 Vous pouvez importer un nouveau fichier Excel."""
 
         await event.respond(msg)
-        print(f"Prédictions Excel effacées par l'admin: {old_count} entrées")
+        print(f"{pair.tag}Prédictions Excel effacées par l'admin: {old_count} entrées")
 
     except Exception as e:
         print(f"Erreur dans clear_excel_predictions: {e}")
         await event.respond(f"❌ Erreur: {e}")
 
+@commands.command('pairs')
+async def show_pairs(event):
+    """Liste des paires source → diffusion avec file d'entrée et latence de vérification"""
+    try:
+        if ADMIN_ID and event.sender_id != ADMIN_ID:
+            return
+
+        lines = []
+        for pair in channel_pairs.values():
+            ingest = pair.ingest.get_stats()
+            lines.append(pair.describe())
+            lines.append(f"  ⏱️ Vérification: {pair.verification_latency['last_ms']} ms (max {pair.verification_latency['max_ms']} ms), attente file: {ingest['wait_avg_ms']} ms")
+
+        msg = f"""🔗 **Paires source → diffusion** ({len(channel_pairs)})
+
+{chr(10).join(lines)}
+
+💡 `/pair_add [nom] [ID source] [ID diffusion]` - Ajouter une paire
+💡 `/pair_remove [nom]` - Retirer une paire
+💡 Les commandes `/a`, `/r`, `/sta`, `/excel_clear`, `/set_stat`... acceptent le nom de la paire en premier argument"""
+
+        await event.respond(msg)
+
+    except Exception as e:
+        print(f"Erreur dans show_pairs: {e}")
+        await event.respond(f"❌ Erreur: {e}")
+
+@commands.command('pair_add', r'([A-Za-z][\w-]*)\s+(-?\d+)\s+(-?\d+)', usage='/pair_add [nom] [ID source] [ID diffusion]')
+async def add_channel_pair(event):
+    """Ajoute une paire source → diffusion (admin uniquement)"""
+    try:
+        if ADMIN_ID and event.sender_id != ADMIN_ID:
+            await event.respond("❌ Seul l'administrateur peut configurer les canaux")
+            return
+
+        match = event.pattern_match
+        name = match.group(1)
+        source_id = int(match.group(2))
+        display_id = int(match.group(3))
+
+        if not PAIR_NAME_RE.match(name) or name in channel_pairs:
+            await event.respond(f"❌ Nom de paire invalide ou déjà utilisé: **{name}**")
+            return
+        owner = source_routes.get(source_id)
+        if owner is not None:
+            await event.respond(f"❌ Ce canal est déjà la source de la paire **{owner.name}**")
+            return
+
+        pair = add_pair({'name': name, 'stat_channel': source_id, 'display_channel': display_id})
+        pair.recover()
+        pair.start()
+        register_source_handlers()
+        save_config()
+
+        await event.respond(f"✅ **Paire ajoutée: {name}**\n\n📥 Source: {source_id}\n📤 Diffusion: {display_id}\n📁 Fichiers: {pair.data_dir}\n💾 Configuration sauvegardée")
+        print(f"🔗 Paire ajoutée: {name} ({source_id} → {display_id})")
+
+    except Exception as e:
+        print(f"Erreur dans add_channel_pair: {e}")
+        await event.respond(f"❌ Erreur: {e}")
+
+@commands.command('pair_remove', r'([A-Za-z][\w-]*)', usage='/pair_remove [nom]')
+async def remove_channel_pair(event):
+    """Retire une paire (ses fichiers sont conservés) (admin uniquement)"""
+    try:
+        if ADMIN_ID and event.sender_id != ADMIN_ID:
+            await event.respond("❌ Seul l'administrateur peut configurer les canaux")
+            return
+
+        name = event.pattern_match.group(1)
+        if name == DEFAULT_PAIR:
+            await event.respond("❌ La paire principale ne peut pas être retirée")
+            return
+        pair = channel_pairs.get(name)
+        if pair is None:
+            await respond_unknown_pair(event, name)
+            return
+
+        del channel_pairs[name]
+        register_source_handlers()
+        await pair.stop()
+        pair.close()
+        save_config()
+
+        await event.respond(f"🗑️ **Paire retirée: {name}**\n\n📁 Fichiers conservés dans {pair.data_dir}\n💾 Configuration sauvegardée")
+        print(f"🔗 Paire retirée: {name}")
+
+    except Exception as e:
+        print(f"Erreur dans remove_channel_pair: {e}")
+        await event.respond(f"❌ Erreur: {e}")
+
 # Commande /report et /scheduler supprimées (non utilisées)
 
-@client.on(events.NewMessage(func=lambda e: e.is_private and e.document))
+def format_import_report(result: dict) -> str:
+    """Résumé du rapport de validation d'un import Excel (lignes invalides, débit)"""
+    lines = [f"• Lignes lues: {result.get('rows_read', 0)} ({result.get('rows_per_sec', 0):.0f} lignes/s)"]
+    error_count = result.get('error_count', 0)
+    lines.append(f"• Lignes invalides ignorées: {error_count}")
+    for error in result.get('errors', [])[:5]:
+        lines.append(f"  - Ligne {error['row']}, colonne {error['column']}: {error['reason']}")
+    if error_count > 5:
+        lines.append(f"  - ... et {error_count - 5} autres")
+    if "loop_lag_max_ms" in result:
+        lines.append(f"• Retard max de la boucle pendant l'import: {result['loop_lag_max_ms']} ms")
+    return "\n".join(lines)
+
+async def notify_admin(text: str):
+    """Message de progression à l'admin (ignoré si l'envoi échoue)"""
+    if not ADMIN_ID:
+        return
+    try:
+        await client.send_message(ADMIN_ID, text)
+    except Exception as e:
+        print(f"⚠️ Impossible d'envoyer le message à l'admin: {e}")
+
 async def handle_excel_document(event):
     """Détecte automatiquement les fichiers Excel envoyés par l'admin (sans commande)"""
     try:
@@ -1144,7 +1025,16 @@ async def handle_excel_document(event):
         if not is_excel:
             return
 
-        print(f"📥 Fichier Excel détecté via Telegram: {file_name}")
+        # Paire visée: nom donné en légende du document (paire historique sans légende).
+        # Un nom inconnu est refusé: une faute de frappe ne doit pas remplacer le plan
+        # de la paire historique.
+        caption = (event.message.message or '').strip()
+        pair = resolve_pair(caption)
+        if pair is None:
+            await respond_unknown_pair(event, caption)
+            return
+
+        print(f"📥 {pair.tag}Fichier Excel détecté via Telegram: {file_name}")
         await event.respond("📥 **Fichier Excel détecté! Téléchargement en cours...**")
 
         file_path = await event.message.download_media()
@@ -1155,25 +1045,28 @@ async def handle_excel_document(event):
 
         await event.respond("⚙️ **Importation des prédictions...**")
 
-        old_count = len(excel_manager.predictions)
-        result = excel_manager.import_excel(file_path, replace_mode=True)
+        old_count = len(pair.excel_manager.predictions)
+        result = await pair.excel_manager.import_excel_async(file_path, replace_mode=True, progress=event.respond)
 
         try:
             os.remove(file_path)
         except:
             pass
 
-        if result["success"]:
-            stats = excel_manager.get_stats()
+        if result.get("unchanged"):
+            await event.respond(f"♻️ **Fichier identique au plan actuel**: import ignoré ({result['total']} prédictions en base).")
+        elif result["success"]:
+            stats = pair.excel_manager.get_stats()
             consecutive_info = result.get('consecutive_skipped', 0)
 
-            msg = f"""📥 Import Excel via Telegram
+            msg = f"""📥 Import Excel via Telegram (paire {pair.name})
 
 ✅ Fichier Excel importé avec succès!
 • Prédictions importées: {result['imported']}
 • Anciennes remplacées: {old_count}
 • Consécutifs ignorés: {consecutive_info}
 • Total en base: {stats['total']}
+{format_import_report(result)}
 
 Le système est prêt pour les prédictions! 🎉
 
@@ -1182,7 +1075,7 @@ Le système est prêt pour les prédictions! 🎉
 • Lancées: {stats['launched']}"""
 
             await event.respond(msg)
-            print(f"✅ Import Excel via Telegram réussi: {result['imported']} prédictions")
+            print(f"✅ {pair.tag}Import Excel via Telegram réussi: {result['imported']} prédictions")
         else:
             await event.respond(f"❌ **Erreur importation Excel**: {result.get('error', 'Erreur inconnue')}")
             print(f"❌ Erreur importation Excel: {result.get('error')}")
@@ -1191,162 +1084,71 @@ Le système est prêt pour les prédictions! 🎉
         print(f"Erreur dans handle_excel_document: {e}")
         await event.respond(f"❌ **Erreur critique**: {e}")
 
-@client.on(events.NewMessage(pattern=r'/upload_excel', func=lambda e: e.is_private and e.sender_id == ADMIN_ID and e.media))
+@commands.command('upload_excel')
 async def handle_excel_upload(event):
     """Handle Excel file upload from admin in private chat (legacy command)"""
     pass
 
-# --- LOGIQUE PRINCIPALE : ÉCOUTE DU CANAL SOURCE ---
+# --- AIGUILLAGE DES MISES À JOUR ---
+@client.on(events.NewMessage(func=lambda e: e.is_private or (e.raw_text or '').startswith('/')))
+async def route_private_and_commands(event):
+    """
+    Conversations privées et commandes: une seule entrée pour tout ce qui n'est pas
+    un canal source (documents Excel de l'admin, puis table des commandes).
+    """
+    if event.chat_id in source_routes:
+        return
+    if event.is_private and event.document:
+        await handle_excel_document(event)
+        return
+    await commands.dispatch(event)
+
+def register_source_handlers():
+    """
+    (Ré)enregistre le pipeline sur les canaux source des paires configurées: les autres
+    chats ne déclenchent plus handle_new_message. À rappeler quand une paire change.
+    """
+    source_routes.clear()
+    for pair in channel_pairs.values():
+        if pair.source_id:
+            source_routes[pair.source_id] = pair
+    client.remove_event_handler(handle_new_message)
+    if not source_routes:
+        print("ℹ️ Aucun canal source configuré: pipeline inactif")
+        return
+    chats = list(source_routes)
+    client.add_event_handler(handle_new_message, events.NewMessage(chats=chats))
+    client.add_event_handler(handle_new_message, events.MessageEdited(chats=chats))
+    print(f"🔀 Pipeline branché sur {len(chats)} canaux source: {', '.join(f'{pair.name}={chat_id}' for chat_id, pair in source_routes.items())}")
+
+# --- LOGIQUE PRINCIPALE : ÉCOUTE DES CANAUX SOURCE ---
 
-@client.on(events.NewMessage())
-@client.on(events.MessageEdited())
 async def handle_new_message(event):
     """
-    Gère les nouveaux messages ET les messages édités dans le canal de statistiques.
+    Gère les nouveaux messages ET les messages édités des canaux de statistiques.
     
-    Nouvelle logique de prédiction:
+    Nouvelle logique de prédiction (voir ChannelPair.process_finalized_game):
     1. Détecte si le premier groupe contient un "6" dans les cartes
     2. Si oui, vérifie la valeur #T
     3. Si #T > 10.5 → prédit Joueur (🅿️+6,5)
     4. Si #T <= 10.5 → prédit Banquier (Ⓜ️-4,,5)
     5. Ignore les matchs nuls et les cas où total=6 ET carte=6
     """
-    global active_predictions
-    
-    if not detected_stat_channel:
-        return
-    if not (event.is_channel and event.chat_id == detected_stat_channel):
-        return
-    
-    message_text = event.raw_text
-    game_number = predictor.extract_game_number(message_text)
-    
-    if not game_number:
-        return
-    
-    print(f"📨 Message reçu du canal source - Jeu #{game_number}")
-    
-    # --- ÉTAPE 1: VÉRIFICATION DES PRÉDICTIONS ACTIVES ---
-    await verify_active_predictions(game_number, message_text)
-    
-    # --- ÉTAPE 2: NOUVELLE PRÉDICTION BASÉE SUR LA DÉTECTION DU 6 ---
-    if not detected_display_channel:
-        print(f"⚠️ Canal de diffusion non configuré - impossible de lancer des prédictions")
-        return
-    
-    # Vérifier si le message est finalisé (✅ ou 🔰)
-    if not is_finalized_message(message_text):
-        print(f"⏳ Message #{game_number} pas encore finalisé - en attente")
+    if not event.is_channel:
         return
-    
-    # Vérifier si on doit ignorer ce message
-    if should_skip_prediction(message_text):
-        print(f"⏭️ Message #{game_number} ignoré (match nul ou total=6 avec carte 6)")
+    pair = source_routes.get(event.chat_id)
+    if pair is None:
         return
-    
-    # Vérifier si le premier groupe contient un 6
-    if not has_six_in_first_group(message_text):
-        print(f"ℹ️ Pas de 6 dans le premier groupe du jeu #{game_number} - pas de prédiction")
-        return
-    
-    # Extraire la valeur #T
-    t_value = extract_t_value(message_text)
-    if t_value < 0:
-        print(f"⚠️ Impossible d'extraire #T du jeu #{game_number}")
-        return
-    
-    # Calculer le numéro de prédiction: N + a
-    predicted_numero = game_number + a_offset
-    
-    # Vérifier si une prédiction existe déjà pour ce numéro
-    if str(predicted_numero) in active_predictions:
-        print(f"ℹ️ Prédiction #{predicted_numero} déjà existante - ignorée")
-        return
-    
-    # Déterminer le type de prédiction
-    if t_value > 10.5:
-        prediction_type = "joueur"
-        prediction_text = f"🔵{predicted_numero}:🅿️+6,5🔵statut :⏳"
-        print(f"🎯 #T={t_value} > 10.5 → Prédiction JOUEUR pour #{predicted_numero}")
-    else:
-        prediction_type = "banquier"
-        prediction_text = f"🔵{predicted_numero}:Ⓜ️-4,,5🔵statut :⏳"
-        print(f"🎯 #T={t_value} <= 10.5 → Prédiction BANQUIER pour #{predicted_numero}")
-    
-    # Envoyer la prédiction
-    try:
-        sent_message = await client.send_message(detected_display_channel, prediction_text)
-        
-        # Enregistrer la prédiction active
-        active_predictions[str(predicted_numero)] = {
-            "message_id": sent_message.id,
-            "channel_id": detected_display_channel,
-            "expected": prediction_type,
-            "base_text": prediction_text,
-            "source_game": game_number,
-            "t_value": t_value,
-            "verified": False,
-            "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        }
-        save_config()
-        
-        print(f"✅ Prédiction lancée: {prediction_text} (source: #{game_number}, #T={t_value})")
-        
-    except Exception as e:
-        print(f"❌ Erreur envoi prédiction: {e}")
-
-# --- DÉTECTION AUTOMATIQUE DES FICHIERS EXCEL ---
-
-def get_excel_files_in_project():
-    """Retourne la liste des fichiers Excel dans le répertoire du projet"""
-    excel_patterns = ["*.xlsx", "*.xls"]
-    excel_files = []
-    for pattern in excel_patterns:
-        excel_files.extend(glob.glob(os.path.join(EXCEL_WATCH_DIR, pattern)))
-    return excel_files
-
-def load_processed_files():
-    """Charge la liste des fichiers déjà traités depuis un fichier de persistance"""
-    global processed_excel_files
-    try:
-        processed_file = "processed_excel_files.json"
-        if os.path.exists(processed_file):
-            with open(processed_file, 'r') as f:
-                data = json.load(f)
-                processed_excel_files = set(data.get('files', []))
-    except Exception as e:
-        print(f"⚠️ Erreur chargement fichiers traités: {e}")
-        processed_excel_files = set()
-
-def save_processed_files():
-    """Sauvegarde la liste des fichiers traités"""
-    try:
-        processed_file = "processed_excel_files.json"
-        with open(processed_file, 'w') as f:
-            json.dump({'files': list(processed_excel_files)}, f)
-    except Exception as e:
-        print(f"⚠️ Erreur sauvegarde fichiers traités: {e}")
-
-async def check_new_excel_files():
-    """Vérifie s'il y a de nouveaux fichiers Excel dans le projet"""
-    global processed_excel_files
-
-    try:
-        current_files = get_excel_files_in_project()
 
-        for file_path in current_files:
-            file_name = os.path.basename(file_path)
-            file_mtime = os.path.getmtime(file_path)
-            file_key = f"{file_name}_{file_mtime}"
+    # Copie brute avant toute analyse (sans attente: écrite par la tâche de fond)
+    if source_recorder:
+        source_recorder.record(event.chat_id, event.id, isinstance(event, events.MessageEdited.Event), event.raw_text)
+    
+    # Dépôt dans la file d'entrée de la paire: le traitement est sérialisé par partie
+    await pair.submit(event.chat_id, event.id, event.raw_text)
 
-            if file_key not in processed_excel_files:
-                print(f"📥 Nouveau fichier Excel détecté: {file_name}")
-                await auto_import_excel(file_path)
-                processed_excel_files.add(file_key)
-                save_processed_files()
 
-    except Exception as e:
-        print(f"⚠️ Erreur vérification fichiers Excel: {e}")
+# --- DÉTECTION AUTOMATIQUE DES FICHIERS EXCEL ---
 
 async def auto_import_excel(file_path: str):
     """Importe automatiquement un fichier Excel et envoie la confirmation à l'admin"""
@@ -1354,9 +1156,15 @@ async def auto_import_excel(file_path: str):
         file_name = os.path.basename(file_path)
         print(f"📥 Import Automatique: {file_name}")
 
+        # Répertoire surveillé: plan de la paire historique (les autres paires reçoivent
+        # leur fichier par Telegram, nom de la paire en légende)
+        excel_manager = default_pair.excel_manager
         old_count = len(excel_manager.predictions)
-        result = excel_manager.import_excel(file_path, replace_mode=True)
+        result = await excel_manager.import_excel_async(file_path, replace_mode=True, progress=notify_admin)
 
+        if result.get("unchanged"):
+            # Même contenu qu'au dernier import (seule la date a changé): rien à faire
+            return
         if result["success"]:
             stats = excel_manager.get_stats()
             consecutive_info = result.get('consecutive_skipped', 0)
@@ -1368,6 +1176,7 @@ async def auto_import_excel(file_path: str):
 • Anciennes remplacées: {old_count}
 • Consécutifs ignorés: {consecutive_info}
 • Total en base: {stats['total']}
+{format_import_report(result)}
 
 Le système est prêt pour la nouvelle journée! 🎉"""
 
@@ -1391,20 +1200,15 @@ Le système est prêt pour la nouvelle journée! 🎉"""
     except Exception as e:
         print(f"❌ Erreur import automatique: {e}")
 
-async def excel_file_watcher():
-    """Boucle de surveillance des fichiers Excel (toutes les 10 secondes)"""
-    load_processed_files()
-    print("👀 Surveillance des fichiers Excel activée")
+# Surveillance événementielle (inotify, sinon parcours scandir) du répertoire des plans
+excel_watcher = ExcelWatcher(EXCEL_WATCH_DIR, auto_import_excel)
 
-    while True:
-        try:
-            await check_new_excel_files()
-            await asyncio.sleep(10)
-        except asyncio.CancelledError:
-            break
-        except Exception as e:
-            print(f"⚠️ Erreur dans le watcher Excel: {e}")
-            await asyncio.sleep(30)
+async def excel_file_watcher():
+    """Surveillance des fichiers Excel: import dès qu'un fichier est entièrement écrit"""
+    try:
+        await excel_watcher.run()
+    except asyncio.CancelledError:
+        pass
 
 # --- FONCTIONS UTILITAIRES POUR LE SERVEUR WEB ---
 
@@ -1414,21 +1218,76 @@ async def health_check(request):
 
 async def bot_status(request):
     """Status endpoint for the bot"""
-    stats = excel_manager.get_stats()
     status = {
         'status': 'Running',
-        'stat_channel': detected_stat_channel,
-        'display_channel': detected_display_channel,
-        'excel_predictions': stats
+        'stat_channel': default_pair.source_id,
+        'display_channel': default_pair.display_id,
+        'persistence': write_behind.get_stats(),
+        'outbound': outbound.get_stats(),
+        'startup': startup_timings,
+        'entities': entity_cache.get_stats(),
+        'commands': commands.get_stats(),
+        'excel_watcher': excel_watcher.get_stats(),
+        'recorder': source_recorder.get_stats() if source_recorder else None,
+        # État isolé par paire: prédictions, plan Excel, file d'entrée, latence de vérification
+        'pairs': {name: pair.get_stats() for name, pair in channel_pairs.items()}
     }
     return web.json_response(status)
 
+# Retard de la boucle d'événements, exporté par /metrics
+loop_lag_monitor = LoopLagMonitor()
+
+def collect_metrics():
+    """Compteurs déjà tenus par les composants (get_stats), lus à chaque requête /metrics"""
+    outbound_stats = outbound.get_stats()
+    samples = [
+        ('bot_outbound_total', COUNTER, "Opérations de la file d'envoi par résultat", {'result': result}, outbound_stats[result])
+        for result in ('sent', 'edited', 'coalesced', 'retries', 'failed')
+    ]
+    samples += [
+        ('bot_outbound_errors_total', COUNTER, "Envois/éditions abandonnés après tous les essais", {}, outbound_stats['failed']),
+        ('bot_outbound_flood_waits_total', COUNTER, 'FloodWait reçus de Telegram', {}, outbound_stats['flood_waits']),
+        ('bot_outbound_queued', GAUGE, "Messages en attente dans la file d'envoi", {}, outbound_stats['queued']),
+        ('bot_outbound_paused_seconds', GAUGE, 'Pause FloodWait restante (secondes)', {}, outbound_stats['paused_for']),
+    ]
+    for name, pair in channel_pairs.items():
+        ingest_stats = pair.ingest.get_stats()
+        samples += [
+            ('bot_pending_predictions', GAUGE, 'Prédictions en attente de vérification', {'pair': name}, pair.store.pending_count()),
+            ('bot_excel_pending_predictions', GAUGE, 'Prédictions Excel pas encore lancées', {'pair': name}, pair.excel_manager.get_stats()['pending']),
+            ('bot_predictions_launched_total', COUNTER, 'Prédictions lancées depuis le démarrage', {'pair': name}, pair.launched),
+            ('bot_ingest_queue_depth', GAUGE, "Messages source dans la file d'entrée", {'pair': name}, ingest_stats['depth']),
+        ]
+        samples += [
+            ('bot_ingest_messages_total', COUNTER, "Messages source de la file d'entrée par résultat", {'pair': name, 'result': result}, ingest_stats[result])
+            for result in ('received', 'processed', 'coalesced', 'errors')
+        ]
+    samples += [
+        ('bot_persist_flushes_total', COUNTER, 'Écritures différées par cible', {'target': target}, count)
+        for target, count in write_behind.flush_count.items()
+    ]
+    if source_recorder:
+        recorder_stats = source_recorder.get_stats()
+        samples += [
+            ('bot_recorder_records_total', COUNTER, 'Événements source enregistrés', {}, recorder_stats['records']),
+            ('bot_recorder_dropped_total', COUNTER, 'Événements source perdus (écriture en retard)', {}, recorder_stats['dropped']),
+            ('bot_recorder_written_bytes_total', COUNTER, 'Octets compressés écrits', {}, recorder_stats['written_bytes']),
+        ]
+    return samples
+
+registry.add_collector(collect_metrics)
+
+async def metrics_endpoint(request):
+    """Métriques au format texte Prometheus"""
+    return web.Response(text=registry.render(), content_type='text/plain', charset='utf-8')
+
 async def create_web_server():
     """Create and start the aiohttp web server"""
     app = web.Application()
     app.router.add_get('/', health_check)
     app.router.add_get('/health', health_check)
     app.router.add_get('/status', bot_status)
+    app.router.add_get('/metrics', metrics_endpoint)
 
     runner = web.AppRunner(app)
     await runner.setup()
@@ -1438,6 +1297,13 @@ async def create_web_server():
     return runner
 
 # --- LANCEMENT PRINCIPAL ---
+async def graceful_disconnect():
+    """Termine les messages source en file, vide la file d'envoi (délais bornés) puis déconnecte"""
+    await asyncio.gather(*(pair.stop() for pair in channel_pairs.values()))
+    if not await outbound.drain(timeout=10):
+        print(f"⚠️ Arrêt avec {outbound.pending()} messages sortants en attente")
+    await client.disconnect()
+
 async def main():
     """Fonction principale pour démarrer le bot"""
     print("Démarrage du bot Telegram...")
@@ -1452,9 +1318,26 @@ async def main():
 
         # Démarrage du bot
         if await start_bot():
+            record_startup_timing('ready_ms')
             print("✅ Bot en ligne et en attente de messages...")
             print(f"🌐 Accès web: http://0.0.0.0:{PORT}")
 
+            # Écritures différées de la configuration et des prédictions Excel
+            write_behind.start()
+            loop_lag_monitor.start()
+            if source_recorder:
+                source_recorder.start()
+            for pair in channel_pairs.values():
+                pair.start()
+
+            # SIGTERM (redéploiement Render): déconnexion propre pour forcer la dernière écriture
+            try:
+                asyncio.get_running_loop().add_signal_handler(
+                    signal.SIGTERM, lambda: asyncio.create_task(graceful_disconnect())
+                )
+            except (NotImplementedError, RuntimeError):
+                pass
+
             # Démarrage du surveillant de fichiers Excel en arrière-plan
             excel_watcher_task = asyncio.create_task(excel_file_watcher())
 
@@ -1469,6 +1352,17 @@ async def main():
         print("\n🛑 Arrêt du bot demandé par l'utilisateur")
     except Exception as e:
         print(f"❌ Erreur critique: {e}")
+    finally:
+        # Écriture forcée de tout état encore en attente
+        await asyncio.gather(*(pair.stop() for pair in channel_pairs.values()))
+        await outbound.stop()
+        await write_behind.stop()
+        await loop_lag_monitor.stop()
+        if source_recorder:
+            await source_recorder.stop()
+        for pair in channel_pairs.values():
+            pair.close()
+        print("💾 Données sauvegardées avant l'arrêt")
 
 if __name__ == '__main__':
     try:
@@ -0,0 +1,197 @@
+import re
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional, Tuple
+
+# Motifs précompilés une seule fois au chargement du module
+GAME_NUMBER_RE = re.compile(r"#N\s*(\d+)\.?", re.IGNORECASE)
+GAME_NUMBER_ALT_RE = re.compile(r"jeu\s*#?\s*(\d+)", re.IGNORECASE)
+GROUP_RE = re.compile(r"(\d+)\(([^)]*)\)")
+CARD_RE = re.compile(r"(\d+|[AKQJ])[♠️♥️♦️♣️♠♥♦♣]")
+T_VALUE_RE = re.compile(r"#T(\d+(?:\.\d+)?)")
+
+FINAL_TAGS = ("✅", "🔰")
+EDITING_TAGS = ("⏰", "🕐")
+TIE_MARKER = "🟣#X"
+
+
+class GameRecord(NamedTuple):
+    """Enregistrement compact d'un message du canal source, produit en une seule passe"""
+    game_number: int
+    first_total: Optional[int]       # Point du premier groupe (chiffre avant la parenthèse)
+    second_total: Optional[int]      # Point du second groupe
+    first_cards: Tuple[str, ...]     # Valeurs des cartes du premier groupe ('A', '6', '10'...)
+    second_cards: Tuple[str, ...]    # Valeurs des cartes du second groupe
+    t_value: Optional[float]         # Valeur #T, None si absente
+    is_tie: bool                     # Match nul (🟣#X présent)
+    final_tag: Optional[str]         # '✅' ou '🔰' si le message est finalisé
+    editing: bool                    # ⏰ ou 🕐 présent (message en cours d'édition)
+
+    @property
+    def is_finalized(self) -> bool:
+        return self.final_tag is not None
+
+    @property
+    def first_group_sixes(self) -> int:
+        return self.first_cards.count('6')
+
+    @property
+    def second_group_sixes(self) -> int:
+        return self.second_cards.count('6')
+
+
+def find_game_number(message_text: str) -> Optional[int]:
+    """Extrait le numéro de jeu (#N123 ou 'jeu 123') sans analyser le reste du message"""
+    match = GAME_NUMBER_RE.search(message_text) or GAME_NUMBER_ALT_RE.search(message_text)
+    if match:
+        return int(match.group(1))
+    return None
+
+
+def parse_game_message(message_text: str) -> Optional[GameRecord]:
+    """
+    Analyse un message du canal source en une seule passe.
+
+    Exemple: #N25. ✅8(Q♣️6♥️) - 5(3♣️9♦️3♠️) #T10
+    Retourne None si aucun numéro de jeu n'est présent.
+    """
+    game_number = find_game_number(message_text)
+    if game_number is None:
+        return None
+
+    first_total = second_total = None
+    first_cards = second_cards = ()
+    groups = GROUP_RE.findall(message_text)
+    if groups:
+        first_total = int(groups[0][0])
+        first_cards = tuple(CARD_RE.findall(groups[0][1]))
+    if len(groups) >= 2:
+        second_total = int(groups[1][0])
+        second_cards = tuple(CARD_RE.findall(groups[1][1]))
+
+    t_match = T_VALUE_RE.search(message_text)
+    t_value = float(t_match.group(1)) if t_match else None
+
+    final_tag = None
+    for tag in FINAL_TAGS:
+        if tag in message_text:
+            final_tag = tag
+            break
+
+    return GameRecord(
+        game_number=game_number,
+        first_total=first_total,
+        second_total=second_total,
+        first_cards=first_cards,
+        second_cards=second_cards,
+        t_value=t_value,
+        is_tie=TIE_MARKER in message_text,
+        final_tag=final_tag,
+        editing=any(tag in message_text for tag in EDITING_TAGS),
+    )
+
+
+class ParseCache:
+    """
+    Cache LRU borné des analyses, indexé par (chat_id, message_id).
+
+    Le canal source édite chaque message plusieurs fois (⏰/🕐 → ✅/🔰). Une édition dont
+    le texte est identique, ou dont les champs utiles (numéro, groupes, totaux, #T, tag
+    final) n'ont pas changé, est signalée comme inchangée et peut être ignorée.
+    """
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # {(chat_id, message_id): (hash_texte, GameRecord)}
+        self.hits = 0       # Texte identique: aucune analyse
+        self.misses = 0     # Texte nouveau ou modifié: analyse effectuée
+        self.unchanged = 0  # Texte modifié mais enregistrement identique
+
+    def parse(self, chat_id: int, message_id: int, message_text: str) -> Tuple[Optional[GameRecord], bool]:
+        """Retourne (enregistrement, changed); changed=False si l'événement n'apporte rien de nouveau"""
+        key = (chat_id, message_id)
+        text_hash = hash(message_text)
+        entry = self._entries.get(key)
+
+        if entry is not None and entry[0] == text_hash:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry[1], False
+
+        self.misses += 1
+        record = parse_game_message(message_text)
+        self._entries[key] = (text_hash, record)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+        if entry is not None and entry[1] == record:
+            self.unchanged += 1
+            return record, False
+        return record, True
+
+    def clear(self):
+        self._entries.clear()
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "unchanged": self.unchanged
+        }
+
+
+# --- PRÉDICATS SUR L'ENREGISTREMENT ---
+
+def has_six_in_first_group(record: GameRecord) -> bool:
+    """Vérifie si le premier groupe de cartes contient une carte de valeur 6"""
+    return record.first_group_sixes > 0
+
+
+def has_six_in_both_groups(record: GameRecord) -> bool:
+    """Vérifie si CHAQUE groupe (premier ET second) contient au moins une carte de valeur 6"""
+    return record.first_group_sixes > 0 and record.second_group_sixes > 0
+
+
+def count_sixes_in_groups(record: GameRecord) -> int:
+    """Compte le nombre total de cartes de valeur 6 dans les deux groupes"""
+    return record.first_group_sixes + record.second_group_sixes
+
+
+def get_first_group_total(record: GameRecord) -> int:
+    """Total du premier groupe (le chiffre avant les parenthèses), -1 si absent"""
+    return record.first_total if record.first_total is not None else -1
+
+
+def extract_t_value(record: GameRecord) -> float:
+    """Valeur #T du message, -1 si absente"""
+    return record.t_value if record.t_value is not None else -1
+
+
+def is_tie_game(record: GameRecord) -> bool:
+    """Match nul: 🟣#X présent dans le message"""
+    return record.is_tie
+
+
+def is_finalized_message(record: GameRecord) -> bool:
+    """Vérifie si le message est finalisé (✅ ou 🔰)"""
+    return record.is_finalized
+
+
+def should_skip_prediction(record: GameRecord) -> bool:
+    """
+    Vérifie si on doit ignorer la prédiction:
+    - Match nul (🔰 entre groupes avec 🟣#X)
+    - Premier groupe total = 6 ET contient un 6 dans les cartes
+    - 2 valeurs '6' ou plus dans tous les groupes combinés
+    - Premier groupe contient un 6 ET second groupe contient un 6
+    """
+    if record.is_tie:
+        return True
+    if has_six_in_both_groups(record):
+        return True
+    if count_sixes_in_groups(record) >= 2:
+        return True
+    if record.first_total == 6 and record.first_group_sixes > 0:
+        return True
+    return False
@@ -0,0 +1,196 @@
+import asyncio
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Bornes des histogrammes de latence (secondes): de 100 µs (analyse) à 30 s (import Excel)
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Échantillon produit par un collecteur au moment de la lecture: (nom, type, aide, labels, valeur)
+Sample = Tuple[str, str, str, Dict[str, str], float]
+
+COUNTER = "counter"
+GAUGE = "gauge"
+HISTOGRAM = "histogram"
+
+
+def _format_labels(labels: Iterable[Tuple[str, str]]) -> str:
+    parts = []
+    for key, value in labels:
+        value = str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+        parts.append(f'{key}="{value}"')
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: int = 1):
+        self.value += amount
+
+
+class Histogram:
+    """Histogramme à bornes fixes: observe() coûte une bisection et trois additions"""
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Dernière case: au-delà de la plus grande borne
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class _Family:
+    """Métrique nommée et ses séries par combinaison de labels (créées à la demande)"""
+
+    def __init__(self, name: str, kind: str, help_text: str, label_names: Sequence[str], factory: Callable):
+        self.name = name
+        self.kind = kind
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self.factory = factory
+        self.children: Dict[Tuple[str, ...], object] = {}
+
+    def labels(self, *values, **labels):
+        """Série pour ces valeurs de labels; à garder de côté sur les chemins chauds"""
+        key = tuple(str(v) for v in values) if values else tuple(str(labels[name]) for name in self.label_names)
+        child = self.children.get(key)
+        if child is None:
+            child = self.children[key] = self.factory()
+        return child
+
+
+class MetricsRegistry:
+    """
+    Registre des métriques exposées au format texte Prometheus (/metrics).
+
+    Les compteurs et histogrammes sont mis à jour par le pipeline (coût constant, sans
+    verrou: tout tourne dans la boucle d'événements ou sous le GIL). Les valeurs déjà
+    tenues par les composants (get_stats) ne sont pas dupliquées: des collecteurs les
+    lisent au moment de la requête.
+    """
+
+    def __init__(self):
+        self.families: Dict[str, _Family] = {}
+        self.collectors: List[Callable[[], Iterable[Sample]]] = []
+
+    def counter(self, name: str, help_text: str, label_names: Sequence[str] = ()) -> _Family:
+        return self._family(name, COUNTER, help_text, label_names, Counter)
+
+    def histogram(self, name: str, help_text: str, label_names: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> _Family:
+        return self._family(name, HISTOGRAM, help_text, label_names, lambda: Histogram(buckets))
+
+    def _family(self, name, kind, help_text, label_names, factory) -> _Family:
+        family = self.families.get(name)
+        if family is None:
+            family = self.families[name] = _Family(name, kind, help_text, label_names, factory)
+        return family
+
+    def add_collector(self, collector: Callable[[], Iterable[Sample]]):
+        self.collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        for family in self.families.values():
+            lines.append(f"# HELP {family.name} {family.help}")
+            lines.append(f"# TYPE {family.name} {family.kind}")
+            for values, child in family.children.items():
+                labels = list(zip(family.label_names, values))
+                if family.kind == HISTOGRAM:
+                    cumulative = 0
+                    for bound, count in zip(list(child.buckets) + [float("inf")], child.counts):
+                        cumulative += count
+                        lines.append(f"{family.name}_bucket{_format_labels(labels + [('le', _format_value(float(bound)))])} {cumulative}")
+                    lines.append(f"{family.name}_sum{_format_labels(labels)} {_format_value(child.sum)}")
+                    lines.append(f"{family.name}_count{_format_labels(labels)} {child.count}")
+                else:
+                    lines.append(f"{family.name}{_format_labels(labels)} {_format_value(child.value)}")
+
+        described = set()
+        for collector in self.collectors:
+            try:
+                samples = list(collector())
+            except Exception as e:
+                print(f"⚠️ Erreur collecte des métriques: {e}")
+                continue
+            for name, kind, help_text, labels, value in samples:
+                if name not in described:
+                    described.add(name)
+                    lines.append(f"# HELP {name} {help_text}")
+                    lines.append(f"# TYPE {name} {kind}")
+                lines.append(f"{name}{_format_labels(labels.items())} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+# Registre du processus, partagé par tous les modules
+registry = MetricsRegistry()
+
+# Latence par étape du pipeline: parse, skip_filter, verify, verify_excel, send, edit, persist, excel_import
+STAGE_SECONDS = registry.histogram("bot_stage_seconds", "Durée des étapes du pipeline (secondes)", ("stage",))
+
+
+def stage(name: str) -> Histogram:
+    """Histogramme d'une étape (à résoudre une fois, hors du chemin chaud)"""
+    return STAGE_SECONDS.labels(name)
+
+
+class LoopLagMonitor:
+    """
+    Retard de la boucle d'événements: une tâche se réveille toutes les interval
+    secondes et mesure l'écart avec l'heure prévue (travail bloquant dans la boucle).
+    """
+
+    def __init__(self, interval: float = 0.5):
+        self.interval = interval
+        self.histogram = registry.histogram(
+            "bot_event_loop_lag_seconds", "Retard de réveil de la boucle d'événements (secondes)",
+            buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+        ).labels()
+        self.last = 0.0
+        self.max = 0.0
+        self._task: Optional[asyncio.Task] = None
+        registry.add_collector(self.collect)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.last = max(0.0, loop.time() - expected)
+            self.max = max(self.max, self.last)
+            self.histogram.observe(self.last)
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def collect(self) -> List[Sample]:
+        return [
+            ("bot_event_loop_lag_last_seconds", GAUGE, "Dernier retard mesuré de la boucle (secondes)", {}, self.last),
+            ("bot_event_loop_lag_max_seconds", GAUGE, "Retard maximal de la boucle depuis le démarrage (secondes)", {}, self.max),
+        ]
+
@@ -0,0 +1,316 @@
+import asyncio
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+from telethon.errors import FloodWaitError, MessageNotModifiedError
+
+from metrics import stage
+
+SEND = "send"
+EDIT = "edit"
+
+# Durée des appels Telegram réussis (voir metrics.py)
+SEND_STAGE = stage(SEND)
+EDIT_STAGE = stage(EDIT)
+
+
+class TokenBucket:
+    """Seau à jetons: rate jetons par seconde, au plus capacity jetons accumulés"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self) -> float:
+        """Secondes à attendre avant qu'un jeton soit disponible"""
+        self._refill(time.monotonic())
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def consume(self):
+        self._refill(time.monotonic())
+        self.tokens -= 1
+
+
+class _Job:
+    __slots__ = ("kind", "chat_id", "message_id", "key", "text", "futures", "on_sent", "attempts")
+
+    def __init__(self, kind: str, chat_id: int, text: str, message_id: Optional[int] = None,
+                 key: Optional[Hashable] = None, on_sent: Optional[Callable[[Any], None]] = None):
+        self.kind = kind
+        self.chat_id = chat_id
+        self.message_id = message_id
+        self.key = key
+        self.text = text
+        self.futures: List[asyncio.Future] = []
+        self.on_sent = on_sent
+        self.attempts = 0
+
+
+class OutboundScheduler:
+    """
+    File d'envoi centrale vers Telegram (send_message / edit_message).
+
+    Les handlers mettent en file et reviennent immédiatement; un worker par chat vide
+    sa file, limité par un seau à jetons par chat et un seau global. Les envois
+    partent dans l'ordre; les éditions de messages différents partent en parallèle
+    (au plus max_parallel_edits en vol par chat).
+    FloodWait suspend tous les envois pendant la durée demandée puis le travail est
+    rejoué; les autres erreurs sont réessayées avec un délai croissant, hors de la file:
+    le travail en échec est reprogrammé (call_later) et les messages suivants du même
+    chat partent pendant l'attente.
+
+    Regroupement des éditions: une édition d'un message dont l'édition précédente est
+    encore en file remplace simplement le texte en attente. Un message peut être
+    désigné par une clé (ex: numéro de prédiction) avant d'être envoyé: si l'envoi est
+    encore en file, l'édition remplace directement le texte à envoyer.
+    """
+
+    def __init__(self, client, per_chat_rate: float = 1.0, per_chat_burst: int = 5,
+                 global_rate: float = 25.0, max_retries: int = 5, max_sent_ids: int = 4096,
+                 max_parallel_edits: int = 4, peers=None):
+        self.client = client
+        # Résolution des chats en InputPeer (EntityCache), sans appel RPC avant l'envoi
+        self.peers = peers
+        self.per_chat_rate = per_chat_rate
+        self.per_chat_burst = per_chat_burst
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.max_retries = max_retries
+        self.max_parallel_edits = max_parallel_edits
+        self._buckets: Dict[int, TokenBucket] = {}
+        self._queues: Dict[int, deque] = {}
+        self._workers: Dict[int, asyncio.Task] = {}
+        self._queued_edits: Dict[tuple, _Job] = {}   # {(chat_id, message_id): édition en file}
+        self._queued_sends: Dict[Hashable, _Job] = {}  # {clé: envoi en file}
+        self._sent_ids = OrderedDict()                 # {clé: message_id} des derniers envois effectués
+        self.max_sent_ids = max_sent_ids
+        self._in_flight = 0
+        self._deferred: Dict[_Job, asyncio.TimerHandle] = {}  # Travaux en attente de nouvel essai
+        self._paused_until = 0.0
+        self.stats = {"sent": 0, "edited": 0, "coalesced": 0, "flood_waits": 0, "retries": 0, "failed": 0}
+
+    def send(self, chat_id: int, text: str, key: Optional[Hashable] = None,
+             on_sent: Optional[Callable[[Any], None]] = None) -> asyncio.Future:
+        """Met un envoi en file; on_sent(message) est appelé après l'envoi effectif"""
+        job = _Job(SEND, chat_id, text, key=key, on_sent=on_sent)
+        if key is not None:
+            self._queued_sends[key] = job
+        return self._enqueue(job)
+
+    def edit(self, chat_id: int, text: str, message_id: Optional[int] = None,
+             key: Optional[Hashable] = None) -> asyncio.Future:
+        """Met une édition en file (par message_id, ou par la clé donnée à send())"""
+        if message_id is None and key is not None:
+            pending_send = self._queued_sends.get(key)
+            if pending_send is not None:
+                # Message pas encore parti: il partira directement avec le dernier texte
+                pending_send.text = text
+                self.stats["coalesced"] += 1
+                return self._attach(pending_send)
+            message_id = self._sent_ids.get(key)
+        if message_id is not None:
+            queued = self._queued_edits.get((chat_id, message_id))
+            if queued is not None:
+                queued.text = text
+                self.stats["coalesced"] += 1
+                return self._attach(queued)
+        job = _Job(EDIT, chat_id, text, message_id=message_id, key=key)
+        if message_id is not None:
+            self._queued_edits[(chat_id, message_id)] = job
+        return self._enqueue(job)
+
+    def _attach(self, job: _Job) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        job.futures.append(future)
+        return future
+
+    def _enqueue(self, job: _Job) -> asyncio.Future:
+        future = self._attach(job)
+        self._queues.setdefault(job.chat_id, deque()).append(job)
+        self._ensure_worker(job.chat_id)
+        return future
+
+    def _ensure_worker(self, chat_id: int):
+        worker = self._workers.get(chat_id)
+        if worker is None or worker.done():
+            self._workers[chat_id] = asyncio.create_task(self._run_chat(chat_id))
+
+    def _bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._buckets.get(chat_id)
+        if bucket is None:
+            bucket = self._buckets[chat_id] = TokenBucket(self.per_chat_rate, self.per_chat_burst)
+        return bucket
+
+    def _unregister(self, job: _Job):
+        if job.kind == SEND and job.key is not None and self._queued_sends.get(job.key) is job:
+            del self._queued_sends[job.key]
+        elif job.kind == EDIT and self._queued_edits.get((job.chat_id, job.message_id)) is job:
+            del self._queued_edits[(job.chat_id, job.message_id)]
+
+    def _register(self, job: _Job):
+        if job.kind == SEND and job.key is not None:
+            self._queued_sends.setdefault(job.key, job)
+        elif job.kind == EDIT and job.message_id is not None:
+            self._queued_edits.setdefault((job.chat_id, job.message_id), job)
+
+    async def _run_chat(self, chat_id: int):
+        queue = self._queues[chat_id]
+        bucket = self._bucket(chat_id)
+        # Éditions en vol par message: plusieurs messages différents sont édités en parallèle,
+        # deux éditions du même message jamais
+        running: Dict[Hashable, asyncio.Task] = {}
+        slots = asyncio.Semaphore(self.max_parallel_edits)
+        while queue or running:
+            if not queue:
+                await asyncio.wait(set(running.values()), return_when=asyncio.FIRST_COMPLETED)
+                continue
+            delay = max(bucket.delay(), self.global_bucket.delay(), self._paused_until - time.monotonic())
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+            job = queue[0]
+            target = job.message_id if job.message_id is not None else ("key", job.key)
+            if job.kind == EDIT:
+                busy = running.get(target)
+                if busy is not None:
+                    await asyncio.wait({busy})
+                    continue
+                if slots.locked():
+                    await asyncio.wait(set(running.values()), return_when=asyncio.FIRST_COMPLETED)
+                    continue
+            bucket.consume()
+            self.global_bucket.consume()
+            queue.popleft()
+            # En vol: une nouvelle édition du même message repartira après celle-ci
+            self._unregister(job)
+            if job.kind == SEND:
+                # Envois exécutés dans l'ordre (une édition par clé a besoin du message_id)
+                await self._attempt(queue, job)
+                continue
+            await slots.acquire()
+            task = asyncio.create_task(self._attempt(queue, job))
+            running[target] = task
+            task.add_done_callback(lambda done, target=target: self._edit_done(running, slots, target, done))
+        del self._workers[chat_id]
+
+    @staticmethod
+    def _edit_done(running: Dict[Hashable, asyncio.Task], slots: asyncio.Semaphore, target: Hashable, task: asyncio.Task):
+        slots.release()
+        if running.get(target) is task:
+            del running[target]
+
+    async def _attempt(self, queue: deque, job: _Job):
+        """Exécute un travail; en cas d'échec, le remet en tête de file (FloodWait, erreur temporaire)"""
+        self._in_flight += 1
+        try:
+            result = await self._execute(job)
+        except FloodWaitError as e:
+            self.stats["flood_waits"] += 1
+            self._paused_until = max(self._paused_until, time.monotonic() + e.seconds)
+            print(f"⏳ FloodWait Telegram: pause de {e.seconds}s ({len(queue) + 1} messages en file pour {job.chat_id})")
+            self._requeue(queue, job)
+            return
+        except Exception as e:
+            job.attempts += 1
+            if job.attempts <= self.max_retries and not isinstance(e, LookupError):
+                self.stats["retries"] += 1
+                print(f"⚠️ Erreur {job.kind} vers {job.chat_id} (essai {job.attempts}/{self.max_retries}): {e}")
+                self._retry_later(job, min(30, 2 ** job.attempts))
+                return
+            self.stats["failed"] += 1
+            print(f"❌ Abandon {job.kind} vers {job.chat_id} après {job.attempts} essais: {e}")
+            for future in job.futures:
+                if not future.done():
+                    future.set_exception(e)
+                    # Le résultat peut ne jamais être attendu (mise en file sans attente)
+                    future.exception()
+            return
+        finally:
+            self._in_flight -= 1
+        for future in job.futures:
+            if not future.done():
+                future.set_result(result)
+
+    def _requeue(self, queue: deque, job: _Job):
+        queue.appendleft(job)
+        self._register(job)
+
+    def _retry_later(self, job: _Job, delay: float):
+        """Reprogramme un travail en échec sans bloquer le worker de son chat"""
+        # Toujours enregistré: une nouvelle édition pendant l'attente remplace son texte
+        self._register(job)
+        self._deferred[job] = asyncio.get_running_loop().call_later(delay, self._retry_now, job)
+
+    def _retry_now(self, job: _Job):
+        self._deferred.pop(job, None)
+        self._requeue(self._queues.setdefault(job.chat_id, deque()), job)
+        self._ensure_worker(job.chat_id)
+
+    async def _execute(self, job: _Job):
+        peer = self.peers.peer(job.chat_id) if self.peers is not None else job.chat_id
+        started = time.perf_counter()
+        if job.kind == SEND:
+            message = await self.client.send_message(peer, job.text)
+            SEND_STAGE.observe(time.perf_counter() - started)
+            self.stats["sent"] += 1
+            if job.key is not None:
+                self._sent_ids[job.key] = message.id
+                while len(self._sent_ids) > self.max_sent_ids:
+                    self._sent_ids.popitem(last=False)
+            if job.on_sent is not None:
+                try:
+                    job.on_sent(message)
+                except Exception as e:
+                    print(f"❌ Erreur après envoi vers {job.chat_id}: {e}")
+            return message
+        message_id = job.message_id
+        if message_id is None:
+            message_id = self._sent_ids.get(job.key)
+            if message_id is None:
+                raise LookupError(f"message inconnu pour la clé {job.key!r}")
+        try:
+            result = await self.client.edit_message(peer, message_id, job.text)
+        except MessageNotModifiedError:
+            result = None
+        EDIT_STAGE.observe(time.perf_counter() - started)
+        self.stats["edited"] += 1
+        return result
+
+    def pending(self) -> int:
+        return sum(len(queue) for queue in self._queues.values()) + self._in_flight + len(self._deferred)
+
+    async def drain(self, timeout: float = 10.0) -> bool:
+        """Attend que toutes les files soient vides (arrêt propre)"""
+        deadline = time.monotonic() + timeout
+        while self.pending() and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        return self.pending() == 0
+
+    async def stop(self):
+        for handle in self._deferred.values():
+            handle.cancel()
+        for task in list(self._workers.values()):
+            task.cancel()
+        for task in list(self._workers.values()):
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._workers.clear()
+        dropped = self.pending()
+        if dropped:
+            print(f"⚠️ {dropped} messages sortants non envoyés à l'arrêt")
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self.stats)
+        stats["queued"] = self.pending()
+        stats["paused_for"] = round(max(0.0, self._paused_until - time.monotonic()), 1)
+        return stats
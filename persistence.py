@@ -0,0 +1,133 @@
+import asyncio
+import json
+import os
+import tempfile
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+import yaml
+
+from metrics import stage
+
+# Durée de chaque écriture différée (voir metrics.py)
+PERSIST_STAGE = stage("persist")
+
+
+def atomic_write_bytes(path: str, data: bytes):
+    """Écrit dans un fichier temporaire du même répertoire puis le renomme atomiquement"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except Exception:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def atomic_write_text(path: str, text: str):
+    atomic_write_bytes(path, text.encode("utf-8"))
+
+
+def atomic_write_json(path: str, data: Any, indent: Optional[int] = 2):
+    atomic_write_text(path, json.dumps(data, indent=indent))
+
+
+def atomic_write_yaml(path: str, data: Any):
+    atomic_write_text(path, yaml.dump(data, allow_unicode=True, default_flow_style=False))
+
+
+class WriteBehind:
+    """
+    Persistance différée: les modifications marquent un état « sale », et une tâche de
+    fond écrit au plus une fois toutes les interval_ms millisecondes.
+
+    Chaque cible est enregistrée avec register(nom, fonction_d_écriture). Tant que la
+    tâche de fond n'est pas démarrée (démarrage, scripts), mark_dirty() écrit
+    immédiatement. stop() force une dernière écriture à l'arrêt.
+    """
+
+    def __init__(self, interval_ms: int = 1000):
+        self.interval = interval_ms / 1000
+        self.writers = {}   # {nom: fonction d'écriture}
+        self.dirty = set()
+        self._wakeup = None
+        self._task = None
+        self.flush_count = {}  # {nom: nombre d'écritures}
+        self.mark_count = 0
+        self.last_flush_duration = 0.0
+
+    def register(self, name: str, writer: Callable[[], None]):
+        self.writers[name] = writer
+        self.flush_count.setdefault(name, 0)
+
+    def unregister(self, name: str):
+        """Écrit une dernière fois la cible si elle est sale, puis l'oublie"""
+        self.flush([name])
+        self.writers.pop(name, None)
+        self.flush_count.pop(name, None)
+
+    def mark_dirty(self, name: str):
+        self.mark_count += 1
+        self.dirty.add(name)
+        if self._task is None or self._task.done():
+            self.flush([name])
+            return
+        self._wakeup.set()
+
+    def flush(self, names: Optional[Iterable[str]] = None):
+        """Écrit immédiatement les cibles sales (toutes par défaut)"""
+        targets = list(self.dirty if names is None else [n for n in names if n in self.dirty])
+        start = time.perf_counter()
+        for name in targets:
+            self.dirty.discard(name)
+            writer = self.writers.get(name)
+            if writer is None:
+                continue
+            try:
+                started = time.perf_counter()
+                writer()
+                PERSIST_STAGE.observe(time.perf_counter() - started)
+                self.flush_count[name] += 1
+            except Exception as e:
+                print(f"❌ Erreur écriture différée '{name}': {e}")
+                self.dirty.add(name)
+        self.last_flush_duration = time.perf_counter() - start
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+            print(f"💾 Persistance différée activée (intervalle {int(self.interval * 1000)} ms)")
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            await asyncio.sleep(self.interval)
+            self._wakeup.clear()
+            self.flush()
+
+    async def stop(self):
+        """Arrête la tâche de fond et force l'écriture de tout ce qui reste"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.flush()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "dirty": sorted(self.dirty),
+            "marks": self.mark_count,
+            "flushes": dict(self.flush_count),
+            "last_flush_ms": round(self.last_flush_duration * 1000, 2)
+        }
@@ -0,0 +1,160 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+from typing import Any, Dict, Optional
+
+from persistence import atomic_write_bytes, atomic_write_text
+
+MAGIC = b"XPLN"
+VERSION = 1
+
+# En-tête: magic, version, nombre d'entrées, taille du bloc JSON des chaînes
+HEADER = struct.Struct("<4sHII")
+# Entrée: numero, code victoire, index date_heure, drapeaux
+RECORD = struct.Struct("<iHIB")
+
+FLAG_LAUNCHED = 0x01
+
+
+def file_sha256(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Empreinte SHA-256 du contenu d'un fichier (indépendante du nom et de la date)"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def compile_plan(predictions: Dict[str, Dict[str, Any]]) -> bytes:
+    """
+    Compile un plan importé en tableau binaire compact.
+
+    Les chaînes (victoires, dates) sont dédupliquées dans une table JSON; chaque entrée
+    est un enregistrement struct de taille fixe (numero, code victoire, date, drapeaux).
+    """
+    victoires = {}
+    dates = {}
+    imported_at = None
+    records = bytearray()
+    for pred in predictions.values():
+        victoire_code = victoires.setdefault(pred["victoire"], len(victoires))
+        date_index = dates.setdefault(pred["date_heure"], len(dates))
+        flags = FLAG_LAUNCHED if pred.get("launched") else 0
+        records += RECORD.pack(pred["numero"], victoire_code, date_index, flags)
+        imported_at = imported_at or pred.get("imported_at")
+    strings = json.dumps({
+        "victoires": list(victoires),
+        "dates": list(dates),
+        "imported_at": imported_at
+    }, ensure_ascii=False).encode("utf-8")
+    return HEADER.pack(MAGIC, VERSION, len(predictions), len(strings)) + strings + bytes(records)
+
+
+def decode_plan(buffer) -> Dict[str, Dict[str, Any]]:
+    """Reconstruit {clé: prédiction} depuis un plan compilé (bytes ou mmap)"""
+    magic, version, count, strings_size = HEADER.unpack_from(buffer, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"format de plan inconnu ({magic!r} v{version})")
+    start = HEADER.size
+    strings = json.loads(bytes(buffer[start:start + strings_size]).decode("utf-8"))
+    victoires = strings["victoires"]
+    dates = strings["dates"]
+    imported_at = strings.get("imported_at")
+    start += strings_size
+    predictions = {}
+    view = memoryview(buffer)[start:start + count * RECORD.size]
+    try:
+        for numero, victoire_code, date_index, flags in RECORD.iter_unpack(view):
+            predictions[str(numero)] = {
+                "numero": numero,
+                "date_heure": dates[date_index],
+                "victoire": victoires[victoire_code],
+                "launched": bool(flags & FLAG_LAUNCHED),
+                "message_id": None,
+                "chat_id": None,
+                "imported_at": imported_at
+            }
+    finally:
+        view.release()
+    return predictions
+
+
+class PlanCache:
+    """
+    Cache des plans Excel compilés, adressé par le SHA-256 du classeur source.
+
+    Chaque plan importé est écrit dans <cache_dir>/<sha256>.plan; le fichier CURRENT
+    contient l'empreinte du plan actif. Au démarrage, le plan actif est relu par mmap
+    au lieu de re-parser excel_predictions.yaml, et un classeur identique (même
+    contenu, autre date de modification) n'est pas réimporté.
+    """
+
+    def __init__(self, cache_dir: str = "plan_cache", keep_plans: int = 10):
+        self.cache_dir = cache_dir
+        self.keep_plans = keep_plans
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def path_for(self, digest: str) -> str:
+        return os.path.join(self.cache_dir, f"{digest}.plan")
+
+    def has(self, digest: str) -> bool:
+        return os.path.exists(self.path_for(digest))
+
+    def current_digest(self) -> Optional[str]:
+        try:
+            with open(os.path.join(self.cache_dir, "CURRENT"), "r", encoding="utf-8") as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def set_current(self, digest: Optional[str]):
+        atomic_write_text(os.path.join(self.cache_dir, "CURRENT"), digest or "")
+
+    def load(self, digest: str) -> Optional[Dict[str, Dict[str, Any]]]:
+        """Charge un plan compilé par mmap (None si absent ou illisible)"""
+        path = self.path_for(digest)
+        try:
+            with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                predictions = decode_plan(mapped)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (ValueError, struct.error, IndexError) as e:
+            print(f"⚠️ Plan compilé illisible {path}: {e}")
+            self.misses += 1
+            return None
+        self.hits += 1
+        return predictions
+
+    def store(self, digest: str, compiled: bytes):
+        atomic_write_bytes(self.path_for(digest), compiled)
+        self.prune()
+
+    def prune(self):
+        """Ne garde que les keep_plans plans les plus récents (le plan actif est toujours gardé)"""
+        current = self.current_digest()
+        plans = [
+            os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir)
+            if name.endswith(".plan")
+        ]
+        plans.sort(key=os.path.getmtime, reverse=True)
+        for path in plans[self.keep_plans:]:
+            if current and os.path.basename(path) == f"{current}.plan":
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        plans = [name for name in os.listdir(self.cache_dir) if name.endswith(".plan")]
+        return {
+            "current": self.current_digest(),
+            "plans": len(plans),
+            "hits": self.hits,
+            "misses": self.misses
+        }
@@ -0,0 +1,157 @@
+import json
+import os
+from typing import Any, Callable, Dict, Optional
+
+from persistence import WriteBehind, atomic_write_text
+
+# Opérations du journal
+OP_PUT = "put"          # Nouvelle entrée complète (lancement d'une prédiction)
+OP_UPDATE = "update"    # Mise à jour de champs (essai suivant, offset, lancement Excel)
+OP_REMOVE = "remove"    # Entrée retirée de l'état vivant (vérifiée, expirée)
+OP_RESET = "reset"      # Espace de noms vidé (nouvel import Excel)
+
+
+class PredictionJournal:
+    """
+    Journal append-only des transitions d'état des prédictions, avec snapshots.
+
+    Chaque transition est une ligne JSON ajoutée au journal (O(1)); le fsync est
+    regroupé (toutes les fsync_batch lignes, ou au prochain sync() de la persistance
+    différée). Tous les snapshot_every enregistrements, l'état complet est écrit dans
+    un snapshot atomique et le journal est tronqué. Au démarrage, recover() charge le
+    dernier snapshot puis rejoue uniquement la fin du journal.
+
+    État: {espace_de_noms: {clé: données}}, par exemple {"live": {...}, "excel": {...}}.
+    """
+
+    def __init__(self, journal_file: str = "predictions.journal", snapshot_file: str = "predictions_snapshot.json",
+                 fsync_batch: int = 32, snapshot_every: int = 500, persistence: Optional[WriteBehind] = None,
+                 persistence_key: str = "journal"):
+        self.journal_file = journal_file
+        self.snapshot_file = snapshot_file
+        self.fsync_batch = fsync_batch
+        self.snapshot_every = snapshot_every
+        self.state_provider: Optional[Callable[[], Dict[str, Dict[str, Any]]]] = None
+        self.seq = 0
+        self.snapshot_seq = 0
+        self.records_since_snapshot = 0
+        self.unsynced = 0
+        self.replayed = 0
+        self._file = None
+        # Le fsync des lignes en attente est déclenché par la persistance différée
+        self.persistence = persistence
+        self.persistence_key = persistence_key
+        if persistence is not None:
+            persistence.register(persistence_key, self.sync)
+
+    def exists(self) -> bool:
+        return os.path.exists(self.snapshot_file) or os.path.exists(self.journal_file)
+
+    def recover(self) -> Dict[str, Dict[str, Any]]:
+        """Charge le dernier snapshot puis rejoue la fin du journal"""
+        state = {}
+        try:
+            if os.path.exists(self.snapshot_file):
+                with open(self.snapshot_file, "r", encoding="utf-8") as f:
+                    snapshot = json.load(f)
+                state = snapshot.get("state", {}) or {}
+                self.snapshot_seq = snapshot.get("seq", 0)
+                self.seq = self.snapshot_seq
+        except Exception as e:
+            print(f"❌ Erreur lecture snapshot {self.snapshot_file}: {e}")
+
+        self.replayed = 0
+        if os.path.exists(self.journal_file):
+            with open(self.journal_file, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # Dernière ligne tronquée par un arrêt brutal: le reste est ignoré
+                        break
+                    if record.get("seq", 0) <= self.snapshot_seq:
+                        continue
+                    self.apply(state, record)
+                    self.seq = record["seq"]
+                    self.replayed += 1
+        self.records_since_snapshot = self.replayed
+        print(f"✅ Journal des prédictions: snapshot #{self.snapshot_seq}, {self.replayed} transitions rejouées")
+        return state
+
+    @staticmethod
+    def apply(state: Dict[str, Dict[str, Any]], record: Dict[str, Any]):
+        """Applique une transition à un état {espace: {clé: données}}"""
+        namespace = state.setdefault(record["ns"], {})
+        op = record["op"]
+        key = record.get("key")
+        if op == OP_PUT:
+            namespace[key] = dict(record.get("data") or {})
+        elif op == OP_UPDATE:
+            namespace.setdefault(key, {}).update(record.get("data") or {})
+        elif op == OP_REMOVE:
+            namespace.pop(key, None)
+        elif op == OP_RESET:
+            namespace.clear()
+
+    def append(self, ns: str, op: str, key: Optional[str] = None, data: Optional[Dict[str, Any]] = None):
+        """Ajoute une transition au journal (écriture O(1), fsync regroupé)"""
+        self.seq += 1
+        record = {"seq": self.seq, "ns": ns, "op": op}
+        if key is not None:
+            record["key"] = key
+        if data is not None:
+            record["data"] = data
+        try:
+            if self._file is None:
+                self._file = open(self.journal_file, "a", encoding="utf-8")
+            self._file.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+            self.unsynced += 1
+            self.records_since_snapshot += 1
+            if self.unsynced >= self.fsync_batch:
+                self.sync()
+            elif self.persistence is not None:
+                self.persistence.mark_dirty(self.persistence_key)
+        except Exception as e:
+            print(f"❌ Erreur écriture journal: {e}")
+
+    def sync(self):
+        """Force l'écriture sur disque des transitions en attente, puis snapshot si nécessaire"""
+        if self._file is not None and self.unsynced:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self.unsynced = 0
+        if self.records_since_snapshot >= self.snapshot_every:
+            self.snapshot()
+
+    def snapshot(self, state: Optional[Dict[str, Dict[str, Any]]] = None):
+        """Écrit l'état complet atomiquement puis tronque le journal"""
+        if state is None:
+            if self.state_provider is None:
+                return
+            state = self.state_provider()
+        try:
+            atomic_write_text(self.snapshot_file, json.dumps({"seq": self.seq, "state": state}, ensure_ascii=False))
+            if self._file is not None:
+                self._file.close()
+            self._file = open(self.journal_file, "w", encoding="utf-8")
+            self.snapshot_seq = self.seq
+            self.records_since_snapshot = 0
+            self.unsynced = 0
+            print(f"📸 Snapshot des prédictions écrit (seq {self.seq})")
+        except Exception as e:
+            print(f"❌ Erreur écriture snapshot: {e}")
+
+    def close(self):
+        self.sync()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            "seq": self.seq,
+            "snapshot_seq": self.snapshot_seq,
+            "since_snapshot": self.records_since_snapshot,
+            "unsynced": self.unsynced,
+            "replayed_at_start": self.replayed
+        }
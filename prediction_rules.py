@@ -0,0 +1,68 @@
+from typing import Optional
+
+from message_parser import GameRecord, extract_t_value, has_six_in_first_group, should_skip_prediction
+
+# Types de prédiction
+JOUEUR = "joueur"      # 🅿️+6,5
+BANQUIER = "banquier"  # Ⓜ️-4,,5
+
+# Décisions de lancement pour une partie finalisée
+SKIPPED = "skipped"    # Match nul, ou total=6 avec carte 6, ou plusieurs 6
+NO_SIX = "no_six"      # Pas de 6 dans le premier groupe
+NO_T = "no_t"          # #T absent
+
+# Ordre fixe: l'indice sert de code dans les colonnes du backtest
+LAUNCH_DECISIONS = (SKIPPED, NO_SIX, NO_T, JOUEUR, BANQUIER)
+
+T_THRESHOLD = 10.5         # #T > 10.5 → Joueur, sinon Banquier
+JOUEUR_MIN_POINT = 6.5     # Joueur réussi si point du premier groupe > 6.5
+BANQUIER_MAX_POINT = 4.5   # Banquier réussi si point du premier groupe < 4.5
+
+# Emojis de vérification selon l'offset (N+0, N+1, N+2, etc.)
+# L'index correspond au nombre d'essais: 0 = 1er essai, 1 = 2ème essai, etc.
+VERIFICATION_EMOJIS = {
+    0: "✅0️⃣",  # 1er essai (N+0)
+    1: "✅1️⃣",  # 2ème essai (N+1)
+    2: "✅2️⃣",  # 3ème essai (N+2)
+    3: "✅3️⃣",  # 4ème essai (N+3)
+    4: "✅4️⃣",  # 5ème essai (N+4)
+    5: "✅5️⃣",  # 6ème essai (N+5)
+    6: "✅6️⃣",  # 7ème essai (N+6)
+    7: "✅7️⃣",  # 8ème essai (N+7)
+    8: "✅8️⃣",  # 9ème essai (N+8)
+    9: "✅9️⃣",  # 10ème essai (N+9)
+    10: "✅🔟"  # 11ème essai (N+10)
+}
+
+
+def launch_decision(record: GameRecord, t_threshold: float = T_THRESHOLD) -> str:
+    """
+    Règle de lancement d'une partie finalisée: JOUEUR, BANQUIER, ou la raison de ne
+    pas prédire. Fonction pure, partagée par le bot (ChannelPair) et le backtest.
+    """
+    if should_skip_prediction(record):
+        return SKIPPED
+    if not has_six_in_first_group(record):
+        return NO_SIX
+    t_value = extract_t_value(record)
+    if t_value < 0:
+        return NO_T
+    return JOUEUR if t_value > t_threshold else BANQUIER
+
+
+def prediction_text(numero: int, expected: str, status: str = "⏳") -> str:
+    if expected == JOUEUR:
+        return f"🔵{numero}:🅿️+6,5🔵statut :{status}"
+    return f"🔵{numero}:Ⓜ️-4,,5🔵statut :{status}"
+
+
+def is_success(expected: str, first_total: Optional[int], joueur_min_point: float = JOUEUR_MIN_POINT,
+               banquier_max_point: float = BANQUIER_MAX_POINT) -> bool:
+    """Règle de vérification d'un essai: point du premier groupe de la partie vérifiée"""
+    if first_total is None:
+        return False
+    if expected == JOUEUR:
+        return first_total > joueur_min_point
+    if expected == BANQUIER:
+        return first_total < banquier_max_point
+    return False
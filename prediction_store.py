@@ -0,0 +1,134 @@
+from bisect import bisect_left, bisect_right, insort
+from typing import Any, Dict, List, Optional, Tuple
+
+from history_store import PredictionHistory
+from prediction_journal import PredictionJournal, OP_PUT, OP_UPDATE, OP_REMOVE, OP_RESET
+
+JOURNAL_NAMESPACE = "live"
+
+
+class PredictionStore:
+    """
+    Prédictions du bot avec un index trié des prédictions NON vérifiées.
+
+    self.predictions garde le format historique de bot_config.json ({"numero": {...}}).
+    self._pending ne contient que les numéros en attente, triés: un message pour le jeu N
+    ne visite que la fenêtre [N - r_offset, N] (plus les prédictions expirées avant
+    cette fenêtre), quelle que soit la taille de l'historique.
+
+    Avec un PredictionHistory, une prédiction vérifiée quitte self.predictions et est
+    ajoutée à l'historique append-only: bot_config.json ne contient plus que les
+    prédictions en attente.
+
+    Avec un PredictionJournal, chaque transition (lancement, essai, vérification) est
+    ajoutée au journal au lieu de réécrire un fichier complet.
+    """
+
+    def __init__(self, history: Optional[PredictionHistory] = None, journal: Optional[PredictionJournal] = None):
+        self.history = history
+        self.journal = journal
+        self.predictions = {}  # {str(numero): {"message_id", "channel_id", "expected", "verified", ...}}
+        self._pending = []     # Numéros (int) non vérifiés, triés
+
+    def load(self, predictions: Dict[str, Dict[str, Any]]) -> int:
+        """
+        Remplace le contenu (chargement de la configuration) et reconstruit l'index.
+        Retourne le nombre de prédictions vérifiées déplacées vers l'historique.
+        """
+        self.predictions = dict(predictions or {})
+        migrated = 0
+        if self.history is not None:
+            verified = {numero: data for numero, data in self.predictions.items() if data.get("verified", False)}
+            if verified:
+                self.history.extend(verified)
+                for numero in verified:
+                    del self.predictions[numero]
+                migrated = len(verified)
+                print(f"📦 {migrated} prédictions vérifiées déplacées vers l'historique")
+        self._pending = sorted(
+            int(numero) for numero, data in self.predictions.items()
+            if not data.get("verified", False)
+        )
+        return migrated
+
+    def add(self, numero: int, data: Dict[str, Any]):
+        self.predictions[str(numero)] = data
+        if self.journal is not None:
+            self.journal.append(JOURNAL_NAMESPACE, OP_PUT, str(numero), data)
+        if not data.get("verified", False):
+            index = bisect_left(self._pending, numero)
+            if index == len(self._pending) or self._pending[index] != numero:
+                insort(self._pending, numero)
+
+    def get(self, numero: int):
+        return self.predictions.get(str(numero))
+
+    def update(self, numero: int, **fields):
+        """Met à jour des champs d'une prédiction (ex: attempts) et journalise la transition"""
+        data = self.predictions.get(str(numero))
+        if data is None:
+            return
+        data.update(fields)
+        if self.journal is not None:
+            self.journal.append(JOURNAL_NAMESPACE, OP_UPDATE, str(numero), fields)
+
+    def __contains__(self, numero: int) -> bool:
+        if str(numero) in self.predictions:
+            return True
+        return self.history is not None and self.history.contains(numero)
+
+    def __len__(self) -> int:
+        return len(self.predictions)
+
+    def mark_verified(self, numero: int, status: str):
+        """Marque la prédiction comme vérifiée et la retire immédiatement de l'index"""
+        data = self.predictions.get(str(numero))
+        if data is not None:
+            data["verified"] = True
+            data["status"] = status
+            if self.history is not None:
+                del self.predictions[str(numero)]
+                self.history.append(numero, data)
+                if self.journal is not None:
+                    self.journal.append(JOURNAL_NAMESPACE, OP_REMOVE, str(numero))
+            elif self.journal is not None:
+                self.journal.append(JOURNAL_NAMESPACE, OP_UPDATE, str(numero), {"verified": True, "status": status})
+        index = bisect_left(self._pending, numero)
+        if index < len(self._pending) and self._pending[index] == numero:
+            del self._pending[index]
+
+    def discard(self, numero: int):
+        """Retire une prédiction jamais publiée (envoi abandonné), sans l'archiver"""
+        if self.predictions.pop(str(numero), None) is not None and self.journal is not None:
+            self.journal.append(JOURNAL_NAMESPACE, OP_REMOVE, str(numero))
+        index = bisect_left(self._pending, numero)
+        if index < len(self._pending) and self._pending[index] == numero:
+            del self._pending[index]
+
+    def window(self, game_number: int, r_offset: int) -> Tuple[List[Tuple[int, Dict[str, Any]]], List[Tuple[int, Dict[str, Any]]]]:
+        """
+        Retourne (expirées, à_vérifier) pour le jeu game_number:
+        - expirées: en attente avec numéro < game_number - r_offset
+        - à_vérifier: en attente avec numéro dans [game_number - r_offset, game_number]
+        """
+        low = bisect_left(self._pending, game_number - r_offset)
+        high = bisect_right(self._pending, game_number, lo=low)
+        expired = [(numero, self.predictions[str(numero)]) for numero in self._pending[:low]]
+        due = [(numero, self.predictions[str(numero)]) for numero in self._pending[low:high]]
+        return expired, due
+
+    def pending_numbers(self) -> List[int]:
+        return list(self._pending)
+
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    def clear(self):
+        self.predictions = {}
+        self._pending = []
+
+    def reset(self):
+        """Vide les prédictions (/reset); le journal l'enregistre pour la prochaine reprise"""
+        self.clear()
+        if self.journal is not None:
+            self.journal.append(JOURNAL_NAMESPACE, OP_RESET)
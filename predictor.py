@@ -1,6 +1,7 @@
 import re
 import random
 from typing import Tuple, Optional, List
+from message_parser import GAME_NUMBER_RE, GAME_NUMBER_ALT_RE, parse_game_message
 
 class CardPredictor:
     """Card game prediction engine with pattern matching and result verification"""
@@ -26,14 +27,14 @@ class CardPredictor:
         """Extract game number from message using pattern #N followed by digits"""
         try:
             # Look for patterns like "#N 123", "#N123", "#N60.", etc.
-            match = re.search(r"#N\s*(\d+)\.?", message, re.IGNORECASE)
+            match = GAME_NUMBER_RE.search(message)
             if match:
                 number = int(match.group(1))
                 print(f"Numéro de jeu extrait: {number}")
                 return number
             
             # Alternative pattern matching
-            match = re.search(r"jeu\s*#?\s*(\d+)", message, re.IGNORECASE)
+            match = GAME_NUMBER_ALT_RE.search(message)
             if match:
                 number = int(match.group(1))
                 print(f"Numéro de jeu alternatif extrait: {number}")
@@ -118,38 +119,27 @@ class CardPredictor:
     def verify_prediction(self, message: str) -> Tuple[Optional[bool], Optional[int]]:
         """Verify prediction results based on verification message"""
         try:
-            # LOGIQUE ATTENTE: Si message en cours d'édition (⏰ ou 🕐), on ATTEND la finalisation
-            # Le bot recevra un événement MessageEdited quand le message sera finalisé
-            if "⏰" in message or "🕐" in message:
-                print(f"⏰/🕐 détecté - Message en cours d'édition, ATTENTE de finalisation (✅ ou 🔰)")
-                return None, None  # None = pas de décision, on attend le prochain événement
-
-            # Vérifier si le message est finalisé (uniquement avec ✅ ou 🔰)
-            if not any(tag in message for tag in ["✅", "🔰", "❌", "⭕"]):
+            # Analyse unique du message (numéro, groupes, cartes, marqueurs)
+            record = parse_game_message(message)
+            if record is None:
+                print(f"Aucun numéro de jeu trouvé dans: {message}")
                 return None, None
+            game_number = record.game_number
 
-            # Extract game number
-            game_number = self.extract_game_number(message)
-            if game_number is None:
-                print(f"Aucun numéro de jeu trouvé dans: {message}")
+            # Un seul contrôle de finalisation: ⏰/🕐 = en cours d'édition, on attend ✅ ou 🔰
+            if record.editing or not (record.is_finalized or "❌" in message or "⭕" in message):
                 return None, None
 
             print(f"Numéro de jeu du résultat: {game_number}")
 
-            # Extract symbol groups
-            groups = self.extract_symbols_from_parentheses(message)
-            if len(groups) < 2:
-                print(f"Groupes de symboles insuffisants: {groups}")
+            if record.second_total is None:
+                print(f"Groupes de symboles insuffisants dans: {message}")
                 return None, None
 
-            first_group = groups[0]
-            second_group = groups[1]
-            print(f"Groupes extraits: '{first_group}' et '{second_group}'")
-
             def is_valid_result():
                 """Check if the result has valid card distribution (2+2)"""
-                count1 = self.count_total_cards(first_group)
-                count2 = self.count_total_cards(second_group)
+                count1 = len(record.first_cards)
+                count2 = len(record.second_cards)
                 print(f"Comptage cartes: groupe1={count1}, groupe2={count2}")
                 is_valid = count1 == 2 and count2 == 2
                 print(f"Résultat valide (2+2): {is_valid}")
@@ -0,0 +1,211 @@
+import asyncio
+import json
+import os
+import time
+import zlib
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+# Segment gzip (wbits 31): lisible par gzip/zcat une fois fermé
+GZIP_WBITS = 31
+READ_CHUNK = 1 << 16
+SEGMENT_PREFIX = "source_"
+SEGMENT_SUFFIX = ".jsonl.gz"
+
+Record = Tuple[float, int, int, bool, str]  # (horodatage, chat, message, édité, texte brut)
+
+
+class SourceRecorder:
+    """
+    Enregistrement append-only et compressé du trafic brut du canal source.
+
+    record() met l'événement en mémoire et revient immédiatement; une tâche de fond
+    compresse et écrit le lot toutes les flush_interval secondes (dans un thread). Le
+    segment courant garde un seul flux zlib ouvert (Z_SYNC_FLUSH à chaque lot): la
+    compression profite de tout l'historique du segment, et un arrêt brutal ne perd que
+    le dernier lot. Au-delà de max_bytes compressés, le segment est fermé (gzip complet)
+    et un nouveau commence; seuls keep_files segments sont conservés (0 = tous).
+
+    Une ligne JSON par événement: {"ts", "chat_id", "message_id", "edited", "text"},
+    lisible par iter_records() et par backtest.py.
+    Tant que la tâche de fond n'est pas démarrée (scripts), record() écrit directement.
+    """
+
+    def __init__(self, directory: str = "recordings", max_bytes: int = 16 * 1024 * 1024, keep_files: int = 60,
+                 flush_interval: float = 2.0, max_buffer: int = 50_000, compresslevel: int = 6):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.keep_files = keep_files
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.compresslevel = compresslevel
+        # File bornée: au-delà de max_buffer, l'ajout évince le plus ancien en O(1)
+        self._buffer: Deque[Record] = deque(maxlen=max_buffer)
+        self._file = None
+        self._compressor = None
+        self.current_file: Optional[str] = None
+        self.segment_bytes = 0
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._inflight: Optional[asyncio.Future] = None
+        self.stats = {"records": 0, "dropped": 0, "raw_bytes": 0, "written_bytes": 0, "segments": 0, "errors": 0}
+        self.last_flush_ms = 0.0
+        os.makedirs(directory, exist_ok=True)
+
+    def record(self, chat_id: int, message_id: int, edited: bool, text: str):
+        """Ajoute un événement NewMessage/MessageEdited (sans attente)"""
+        if len(self._buffer) >= self.max_buffer:
+            # Écriture en retard: on ne bloque jamais l'ingestion, le plus ancien est perdu
+            self.stats["dropped"] += 1
+        self._buffer.append((time.time(), chat_id, message_id, edited, text or ""))
+        if self._task is None or self._task.done():
+            self.flush()
+        elif len(self._buffer) == 1:
+            self._wakeup.set()
+
+    def flush(self):
+        """Compresse et écrit immédiatement les événements en attente"""
+        batch, self._buffer = self._buffer, deque(maxlen=self.max_buffer)
+        if batch:
+            self._write(batch)
+
+    def _write(self, batch: Deque[Record]):
+        started = time.perf_counter()
+        try:
+            if self._file is None:
+                self._open_segment()
+            raw = "".join(
+                json.dumps({"ts": round(ts, 3), "chat_id": chat_id, "message_id": message_id,
+                            "edited": edited, "text": text}, ensure_ascii=False, separators=(",", ":")) + "\n"
+                for ts, chat_id, message_id, edited, text in batch
+            ).encode("utf-8")
+            data = self._compressor.compress(raw) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+            self._file.write(data)
+            self._file.flush()
+            self.segment_bytes += len(data)
+            self.stats["records"] += len(batch)
+            self.stats["raw_bytes"] += len(raw)
+            self.stats["written_bytes"] += len(data)
+            if self.segment_bytes >= self.max_bytes:
+                self._close_segment()
+                self._prune()
+        except Exception as e:
+            self.stats["errors"] += 1
+            print(f"❌ Erreur enregistrement du canal source: {e}")
+        self.last_flush_ms = (time.perf_counter() - started) * 1000
+
+    def _open_segment(self):
+        name = f"{SEGMENT_PREFIX}{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}{SEGMENT_SUFFIX}"
+        self.current_file = os.path.join(self.directory, name)
+        self._file = open(self.current_file, "ab")
+        self._compressor = zlib.compressobj(self.compresslevel, zlib.DEFLATED, GZIP_WBITS)
+        self.segment_bytes = 0
+        self.stats["segments"] += 1
+
+    def _close_segment(self):
+        if self._file is None:
+            return
+        self._file.write(self._compressor.flush(zlib.Z_FINISH))
+        self._file.close()
+        self._file = None
+        self._compressor = None
+
+    def _prune(self):
+        if self.keep_files <= 0:
+            return
+        segments = list_segments(self.directory)
+        for path in segments[:-self.keep_files]:
+            try:
+                os.remove(path)
+            except OSError as e:
+                print(f"⚠️ Impossible de supprimer l'enregistrement {path}: {e}")
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+            print(f"🎙️ Enregistrement du canal source activé ({self.directory})")
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            await asyncio.sleep(self.flush_interval)
+            self._wakeup.clear()
+            batch, self._buffer = self._buffer, deque(maxlen=self.max_buffer)
+            if batch:
+                # Protégée de l'annulation: stop() attend la fin de ce lot avant d'écrire
+                self._inflight = asyncio.ensure_future(asyncio.to_thread(self._write, batch))
+                await asyncio.shield(self._inflight)
+
+    async def stop(self):
+        """Écrit ce qui reste et ferme le segment (gzip complet)"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._inflight is not None:
+            await self._inflight
+            self._inflight = None
+        self.flush()
+        self._close_segment()
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self.stats)
+        stats["buffered"] = len(self._buffer)
+        stats["current_file"] = self.current_file
+        stats["ratio"] = round(stats["raw_bytes"] / stats["written_bytes"], 1) if stats["written_bytes"] else 0.0
+        stats["bytes_per_record"] = round(stats["written_bytes"] / stats["records"], 1) if stats["records"] else 0.0
+        stats["last_flush_ms"] = round(self.last_flush_ms, 2)
+        return stats
+
+
+def list_segments(directory: str) -> List[str]:
+    """Segments d'enregistrement, du plus ancien au plus récent"""
+    try:
+        names = sorted(name for name in os.listdir(directory)
+                       if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX))
+    except FileNotFoundError:
+        return []
+    return [os.path.join(directory, name) for name in names]
+
+
+def iter_lines(path: str) -> Iterator[str]:
+    """
+    Lignes d'un segment gzip, lues en continu. Tolère un segment encore ouvert ou
+    interrompu (pas de fin gzip): tout ce qui a été écrit est relu.
+    """
+    decompressor = zlib.decompressobj(GZIP_WBITS)
+    pending = b""
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(READ_CHUNK)
+            if not chunk:
+                break
+            data = decompressor.decompress(chunk)
+            while decompressor.unused_data:
+                # Plusieurs membres gzip concaténés
+                rest = decompressor.unused_data
+                decompressor = zlib.decompressobj(GZIP_WBITS)
+                data += decompressor.decompress(rest)
+            pending += data
+            *lines, pending = pending.split(b"\n")
+            for line in lines:
+                yield line.decode("utf-8")
+    if pending:
+        yield pending.decode("utf-8")
+
+
+def iter_records(path: str, chat_id: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """Événements d'un segment ou d'un répertoire d'enregistrements (dans l'ordre)"""
+    paths = list_segments(path) if os.path.isdir(path) else [path]
+    for segment in paths:
+        for line in iter_lines(segment):
+            if not line:
+                continue
+            entry = json.loads(line)
+            if chat_id is None or entry.get("chat_id") == chat_id:
+                yield entry
@@ -0,0 +1,119 @@
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+import yaml
+
+
+class SqliteDatabase:
+    """
+    Base de données SQLite (mode WAL), même interface que YamlDatabase.
+
+    Chaque set_config met à jour une seule ligne au lieu de réécrire tout le fichier.
+    Plusieurs mises à jour peuvent être regroupées dans une transaction avec
+    set_configs() ou le gestionnaire de contexte batch(). Au premier démarrage, la
+    section 'config' de l'ancien fichier YAML est migrée une seule fois.
+    """
+
+    def __init__(self, db_file: str = "bot_data.sqlite3", yaml_file: Optional[str] = "bot_data.yaml"):
+        self.db_file = db_file
+        self.yaml_file = yaml_file
+        self._lock = threading.RLock()
+        self._batch_depth = 0
+        self.conn = sqlite3.connect(db_file, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS config (key TEXT PRIMARY KEY, value TEXT)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self.migrate_from_yaml()
+        count = self.conn.execute("SELECT COUNT(*) FROM config").fetchone()[0]
+        print(f"✅ Base de données SQLite chargée: {count} entrées ({db_file})")
+
+    def migrate_from_yaml(self):
+        """Migration unique de la section 'config' du fichier YAML existant"""
+        if not self.yaml_file or not os.path.exists(self.yaml_file):
+            return
+        if self._get_meta("migrated_from_yaml"):
+            return
+        try:
+            with open(self.yaml_file, 'r', encoding='utf-8') as f:
+                data = yaml.safe_load(f) or {}
+            config = data.get('config', {}) or {}
+            with self.batch():
+                for key, value in config.items():
+                    self._upsert(key, value)
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('migrated_from_yaml', ?)",
+                    (self.yaml_file,)
+                )
+            print(f"📦 Migration YAML → SQLite: {len(config)} clés depuis {self.yaml_file}")
+        except Exception as e:
+            print(f"❌ Erreur migration YAML → SQLite: {e}")
+
+    @contextmanager
+    def batch(self):
+        """Regroupe plusieurs écritures dans une seule transaction"""
+        with self._lock:
+            if self._batch_depth == 0:
+                self.conn.execute("BEGIN")
+            self._batch_depth += 1
+            try:
+                yield self
+            except Exception:
+                self._batch_depth -= 1
+                if self._batch_depth == 0:
+                    self.conn.execute("ROLLBACK")
+                raise
+            else:
+                self._batch_depth -= 1
+                if self._batch_depth == 0:
+                    self.conn.execute("COMMIT")
+
+    def get_config(self, key: str) -> Optional[Any]:
+        """Get configuration value"""
+        with self._lock:
+            row = self.conn.execute("SELECT value FROM config WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0])
+
+    def set_config(self, key: str, value: Any):
+        """Set configuration value"""
+        try:
+            with self.batch():
+                self._upsert(key, value)
+        except Exception as e:
+            print(f"❌ Erreur sauvegarde base de données: {e}")
+
+    def set_configs(self, values: Dict[str, Any]):
+        """Set several configuration values in one transaction"""
+        try:
+            with self.batch():
+                for key, value in values.items():
+                    self._upsert(key, value)
+        except Exception as e:
+            print(f"❌ Erreur sauvegarde base de données: {e}")
+
+    def reset_all_data(self):
+        """Reset all data in the database"""
+        with self.batch():
+            self.conn.execute("DELETE FROM config")
+        print("🗑️ Base de données réinitialisée")
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+    def _upsert(self, key: str, value: Any):
+        self.conn.execute(
+            "INSERT INTO config (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, json.dumps(value))
+        )
+
+    def _get_meta(self, key: str) -> Optional[str]:
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
@@ -0,0 +1,151 @@
+import argparse
+import csv
+import itertools
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence
+
+from backtest import GameColumns, load_columns, run_backtest
+from prediction_rules import BANQUIER_MAX_POINT, JOUEUR_MIN_POINT, T_THRESHOLD
+
+# Paramètres balayés, dans l'ordre des colonnes du tableau
+PARAMETERS = ("a_offset", "r_offset", "t_threshold", "joueur_min_point", "banquier_max_point")
+
+# Colonnes partagées par les processus de travail (chargées une fois par processus)
+_columns: Optional[GameColumns] = None
+
+
+def parse_values(spec: str, cast=float) -> List[Any]:
+    """
+    Valeurs d'un paramètre: liste "1,2,5", intervalle entier "1-4" ou pas "9.5:11.5:0.5"
+    (bornes incluses).
+    """
+    values = []
+    for part in spec.split(","):
+        part = part.strip()
+        if ":" in part:
+            start, stop, step = (float(x) for x in part.split(":"))
+            count = int(round((stop - start) / step)) + 1
+            values.extend(cast(round(start + i * step, 6)) for i in range(count))
+        elif "-" in part:
+            start, stop = part.split("-", 1)
+            values.extend(cast(v) for v in range(int(start), int(stop) + 1))
+        elif part:
+            values.append(cast(part))
+    return sorted(set(values))
+
+
+def build_grid(grid: Dict[str, Sequence[Any]]) -> List[Dict[str, Any]]:
+    """Produit cartésien des valeurs, une combinaison par dictionnaire de paramètres"""
+    names = [name for name in PARAMETERS if name in grid]
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+def _init_worker(columns_path: str):
+    global _columns
+    if _columns is None:
+        _columns = GameColumns.load(columns_path)
+
+
+def _evaluate(params: Dict[str, Any]) -> Dict[str, Any]:
+    result = run_backtest(_columns, **params)
+    del result["pending_numbers"]
+    return result
+
+
+def run_sweep(columns_path: str, combinations: List[Dict[str, Any]], workers: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Évalue chaque combinaison dans un pool de processus.
+
+    Les colonnes analysées sont lues depuis leur fichier par chaque processus (une fois,
+    sans réanalyser le flux); avec fork, les processus héritent directement des colonnes
+    déjà chargées par le parent. Les résultats sont retournés dans l'ordre des
+    combinaisons.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(combinations) == 1:
+        _init_worker(columns_path)
+        return [_evaluate(params) for params in combinations]
+    try:
+        context = multiprocessing.get_context("fork")
+        # Chargées avant la création du pool: partagées en copie sur écriture
+        _init_worker(columns_path)
+    except ValueError:
+        context = None
+    chunksize = max(1, len(combinations) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=_init_worker, initargs=(columns_path,)) as executor:
+        return list(executor.map(_evaluate, combinations, chunksize=chunksize))
+
+
+def rank(results: List[Dict[str, Any]], sort_by: str = "win_rate", min_launched: int = 0) -> List[Dict[str, Any]]:
+    """Classement décroissant (à égalité: plus de réussites d'abord)"""
+    kept = [result for result in results if result["launched"] >= min_launched]
+    return sorted(kept, key=lambda result: (result[sort_by], result["wins"]), reverse=True)
+
+
+def format_table(results: List[Dict[str, Any]], top: int = 20) -> str:
+    header = f"{'#':>3} {'a':>2} {'r':>2} {'#T':>5} {'P>':>4} {'M<':>4} {'lancées':>8} {'réussites':>9} {'échecs':>7} {'taux':>7} {'attente':>7}"
+    lines = [header, "-" * len(header)]
+    for position, result in enumerate(results[:top], 1):
+        lines.append(
+            f"{position:>3} {result['a_offset']:>2} {result['r_offset']:>2} {result['t_threshold']:>5g} "
+            f"{result['joueur_min_point']:>4g} {result['banquier_max_point']:>4g} {result['launched']:>8} "
+            f"{result['wins']:>9} {result['losses']:>7} {result['win_rate'] * 100:>6.2f}% {result['pending']:>7}"
+        )
+    return "\n".join(lines)
+
+
+def write_csv(path: str, results: List[Dict[str, Any]]):
+    fields = list(PARAMETERS) + ["games", "launched", "duplicates", "wins", "losses", "expired", "win_rate", "pending"]
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=fields, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(results)
+
+
+if __name__ == "__main__":
+    # Balayage des paramètres sur un flux enregistré:
+    #   python sweep.py flux.jsonl --a 1-4 --r 0-5 --t 9.5:11.5:0.5 [--joueur 6.5] [--banquier 4.5]
+    parser = argparse.ArgumentParser(description="Balayage parallèle des paramètres de prédiction")
+    parser.add_argument("stream")
+    parser.add_argument("--a", default="1", help="valeurs de a_offset (ex: 1-4)")
+    parser.add_argument("--r", default="2", help="valeurs de r_offset (ex: 0-5)")
+    parser.add_argument("--t", default=str(T_THRESHOLD), help="seuils #T (ex: 9.5:11.5:0.5)")
+    parser.add_argument("--joueur", default=str(JOUEUR_MIN_POINT), help="point minimum Joueur (ex: 5.5,6.5)")
+    parser.add_argument("--banquier", default=str(BANQUIER_MAX_POINT), help="point maximum Banquier (ex: 3.5,4.5)")
+    parser.add_argument("--columns", help="cache des colonnes (par défaut: <flux>.cols)")
+    parser.add_argument("--chat", type=int, help="canal source à rejouer (répertoire d'enregistrements)")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--sort", default="win_rate", choices=("win_rate", "wins", "launched"))
+    parser.add_argument("--min-launched", type=int, default=0, help="ignore les combinaisons avec trop peu de prédictions")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--csv", help="écrit le classement complet en CSV")
+    args = parser.parse_args()
+
+    grid = {
+        "a_offset": parse_values(args.a, int),
+        "r_offset": parse_values(args.r, int),
+        "t_threshold": parse_values(args.t),
+        "joueur_min_point": parse_values(args.joueur),
+        "banquier_max_point": parse_values(args.banquier),
+    }
+    if any(not 0 <= r <= 10 for r in grid["r_offset"]):
+        sys.exit("❌ r doit être entre 0 et 10")
+    combinations = build_grid(grid)
+
+    columns_path = args.columns or f"{args.stream.rstrip('/')}.cols"
+    started = time.perf_counter()
+    game_count = len(load_columns(args.stream, columns_path, args.chat))
+    print(f"📥 {game_count} parties finalisées prêtes en {time.perf_counter() - started:.2f}s ({columns_path})", file=sys.stderr)
+
+    started = time.perf_counter()
+    ranked = rank(run_sweep(columns_path, combinations, args.workers), args.sort, args.min_launched)
+    elapsed = time.perf_counter() - started
+    print(f"⚙️ {len(combinations)} combinaisons évaluées en {elapsed:.2f}s", file=sys.stderr)
+    print(format_table(ranked, args.top))
+    if args.csv:
+        write_csv(args.csv, ranked)
@@ -0,0 +1,54 @@
+import os
+import re
+from typing import Union
+
+from telethon.sessions import StringSession
+
+# Fichiers laissés par les anciennes versions (un nouveau fichier à chaque démarrage)
+ORPHAN_SESSION_RE = re.compile(r"^bot_session_\d+\.session(-journal)?$")
+
+
+def build_session(session_string: str = "", session_name: str = "bot_session") -> Union[StringSession, str]:
+    """
+    Session Telegram stable, réutilisée d'un démarrage à l'autre.
+
+    Avec session_string (variable TELEGRAM_SESSION), la session est entièrement en
+    mémoire: rien n'est perdu quand le disque est éphémère (redéploiement Render).
+    Sinon, le fichier <session_name>.session est réutilisé (autorisation et cache
+    d'entités conservés).
+    """
+    if session_string:
+        return StringSession(session_string)
+    return session_name
+
+
+def session_exists(session_string: str = "", session_name: str = "bot_session") -> bool:
+    """Vrai si une session déjà autorisée est disponible (démarrage à chaud)"""
+    return bool(session_string) or os.path.exists(f"{session_name}.session")
+
+
+def cleanup_orphan_sessions(directory: str = ".") -> int:
+    """Supprime les fichiers bot_session_<timestamp>.session des anciens démarrages"""
+    removed = 0
+    for entry in os.scandir(directory):
+        if entry.is_file() and ORPHAN_SESSION_RE.match(entry.name):
+            try:
+                os.remove(entry.path)
+                removed += 1
+            except OSError as e:
+                print(f"⚠️ Impossible de supprimer {entry.name}: {e}")
+    if removed:
+        print(f"🧹 {removed} anciens fichiers de session supprimés")
+    return removed
+
+
+if __name__ == "__main__":
+    # Export de la session fichier en chaîne pour TELEGRAM_SESSION:
+    #   python telegram_session.py [nom_de_session]
+    import sys
+    from telethon.sessions import SQLiteSession
+
+    name = sys.argv[1] if len(sys.argv) > 1 else "bot_session"
+    if not os.path.exists(f"{name}.session"):
+        sys.exit(f"❌ {name}.session introuvable (démarrez le bot une fois pour le créer)")
+    print(StringSession.save(SQLiteSession(name)))
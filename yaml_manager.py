@@ -1,6 +1,7 @@
 import os
 import yaml
-from typing import Any, Optional
+from typing import Any, Dict, Optional
+from persistence import atomic_write_yaml
 
 class YamlDatabase:
     """Simple YAML-based database for storing bot configuration and data"""
@@ -27,8 +28,7 @@ class YamlDatabase:
     def save_data(self):
         """Save data to YAML file"""
         try:
-            with open(self.db_file, 'w', encoding='utf-8') as f:
-                yaml.dump(self.data, f, allow_unicode=True, default_flow_style=False)
+            atomic_write_yaml(self.db_file, self.data)
             print(f"💾 Base de données sauvegardée: {len(self.data)} entrées")
         except Exception as e:
             print(f"❌ Erreur sauvegarde base de données: {e}")
@@ -43,6 +43,15 @@ class YamlDatabase:
             self.data['config'] = {}
         self.data['config'][key] = value
         self.save_data()
+
+    def set_configs(self, values: Dict[str, Any]):
+        """Set several configuration values with a single write"""
+        if 'config' not in self.data:
+            self.data['config'] = {}
+        if all(self.data['config'].get(key) == value for key, value in values.items()):
+            return
+        self.data['config'].update(values)
+        self.save_data()
     
     def reset_all_data(self):
         """Reset all data in the database"""
@@ -53,8 +62,18 @@ class YamlDatabase:
 # Global database instance
 db = None
 
-def init_database(db_file: str = "bot_data.yaml") -> YamlDatabase:
-    """Initialize the global database instance"""
+def init_database(db_file: str = "bot_data.yaml", backend: str = "yaml"):
+    """
+    Initialize the global database instance
+
+    backend: "yaml" (YamlDatabase) ou "sqlite" (SqliteDatabase, mode WAL). Avec SQLite,
+    le fichier est <db_file sans extension>.sqlite3 et db_file est migré une seule fois.
+    """
     global db
-    db = YamlDatabase(db_file)
+    if backend == "sqlite":
+        from sqlite_manager import SqliteDatabase
+        sqlite_file = os.path.splitext(db_file)[0] + ".sqlite3"
+        db = SqliteDatabase(sqlite_file, yaml_file=db_file)
+    else:
+        db = YamlDatabase(db_file)
     return db